@@ -0,0 +1,29 @@
+"""Time to compute the rolling lookback covariances ``StockPortfolioEnv``
+reads, on 20 years x 100 assets with a one-year lookback.
+
+Usage: PYTHONPATH=. python benchmarks/bench_covariance.py [--days 5040] [--tics 100]
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+from synthetic import make_daily_frame
+
+from finrl.meta.preprocessor.covariance import lookback_covariances
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=5040)
+    parser.add_argument("--tics", type=int, default=100)
+    parser.add_argument("--lookback", type=int, default=252)
+    args = parser.parse_args()
+
+    df = make_daily_frame(args.days, args.tics, indicators=[]).reset_index(drop=True)
+    start = time.perf_counter()
+    _, covs = lookback_covariances(df, lookback=args.lookback)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{covs.shape[0]} covariances of {args.tics} assets in {elapsed:.2f} s "
+        f"({covs.nbytes / 2**20:.0f} MiB)"
+    )
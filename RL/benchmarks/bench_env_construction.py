@@ -0,0 +1,52 @@
+"""Construction time of ``StockTradingEnvCashpenalty`` and
+``StockTradingEnvStopLoss`` on 10 years x 500 tickers of daily data, and the
+cost of a single ``get_date_vector`` lookup.
+
+Usage: PYTHONPATH=. python benchmarks/bench_env_construction.py [--days 2520] [--tics 500]
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import time
+
+from synthetic import make_daily_frame
+
+from finrl.meta.env_stock_trading.env_stocktrading_cashpenalty import (
+    StockTradingEnvCashpenalty,
+)
+from finrl.meta.env_stock_trading.env_stocktrading_stoploss import (
+    StockTradingEnvStopLoss,
+)
+
+
+def construct(env_class, df, cache):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        env = env_class(df, cache_indicator_data=cache, print_verbosity=10**9)
+    return env, time.perf_counter() - start
+
+
+def lookup_time(env, cols, repeats=2000):
+    start = time.perf_counter()
+    for i in range(repeats):
+        env.get_date_vector(i % len(env.dates), cols=cols)
+    return (time.perf_counter() - start) / repeats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=2520)
+    parser.add_argument("--tics", type=int, default=500)
+    args = parser.parse_args()
+
+    df = make_daily_frame(args.days, args.tics, indicators=[]).reset_index(drop=True)
+    for env_class in (StockTradingEnvCashpenalty, StockTradingEnvStopLoss):
+        for cache in (False, True):
+            env, seconds = construct(env_class, df, cache)
+            print(
+                f"{env_class.__name__} cache={cache!s:5}: {seconds:6.2f} s to build, "
+                f"{lookup_time(env, None) * 1e6:7.1f} us/state vector, "
+                f"{lookup_time(env, ['close']) * 1e6:7.1f} us/closings"
+            )
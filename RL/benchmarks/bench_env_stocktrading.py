@@ -0,0 +1,58 @@
+"""Steps/sec of ``StockTradingEnv`` on DOW30-sized daily data.
+
+Usage: PYTHONPATH=. python benchmarks/bench_env_stocktrading.py [--days 2520] [--tics 30]
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+from synthetic import make_daily_frame
+
+from finrl.config import INDICATORS
+from finrl.meta.env_stock_trading.env_stocktrading import StockTradingEnv
+
+
+def make_env(df, n_tics, turbulence_threshold=None):
+    state_space = 1 + 2 * n_tics + len(INDICATORS) * n_tics
+    return StockTradingEnv(
+        df=df,
+        stock_dim=n_tics,
+        hmax=100,
+        initial_amount=1_000_000,
+        num_stock_shares=[0] * n_tics,
+        buy_cost_pct=[0.001] * n_tics,
+        sell_cost_pct=[0.001] * n_tics,
+        reward_scaling=1e-4,
+        state_space=state_space,
+        action_space=n_tics,
+        tech_indicator_list=INDICATORS,
+        turbulence_threshold=turbulence_threshold,
+        print_verbosity=10**9,
+    )
+
+
+def run(df, n_tics, steps, seed=0, turbulence_threshold=None):
+    env = make_env(df, n_tics, turbulence_threshold)
+    rng = np.random.default_rng(seed)
+    actions = rng.uniform(-1, 1, size=(steps, n_tics))
+    env.reset()
+    start = time.perf_counter()
+    for a in actions:
+        _, _, done, _, _ = env.step(a)
+        if done:
+            env.reset()
+    return steps / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=2520)
+    parser.add_argument("--tics", type=int, default=30)
+    parser.add_argument("--steps", type=int, default=5000)
+    args = parser.parse_args()
+
+    df = make_daily_frame(args.days, args.tics)
+    print(f"steps/sec: {run(df, args.tics, args.steps):,.0f}")
+    print(f"steps/sec (turbulence threshold): {run(df, args.tics, args.steps, turbulence_threshold=60):,.0f}")
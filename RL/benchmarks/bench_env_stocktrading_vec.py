@@ -0,0 +1,67 @@
+"""Throughput of ``StockTradingVecEnv`` versus ``DummyVecEnv`` of
+``StockTradingEnv`` as the number of parallel portfolios grows, plus PPO
+training fps on the batched env.
+
+Usage: PYTHONPATH=. python benchmarks/bench_env_stocktrading_vec.py
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+from bench_env_stocktrading import make_env
+from stable_baselines3 import PPO
+from stable_baselines3.common.vec_env import DummyVecEnv
+from synthetic import make_daily_frame
+
+from finrl.config import INDICATORS
+from finrl.meta.env_stock_trading.env_stocktrading_vec import StockTradingVecEnv
+
+
+def make_vec_env(df, n_tics, num_envs):
+    return StockTradingVecEnv(
+        df,
+        num_envs=num_envs,
+        stock_dim=n_tics,
+        hmax=100,
+        initial_amount=1_000_000,
+        num_stock_shares=[0] * n_tics,
+        buy_cost_pct=[0.001] * n_tics,
+        sell_cost_pct=[0.001] * n_tics,
+        reward_scaling=1e-4,
+        tech_indicator_list=INDICATORS,
+        random_start=True,
+    )
+
+
+def env_steps_per_sec(env, n_tics, steps):
+    rng = np.random.default_rng(0)
+    env.reset()
+    start = time.perf_counter()
+    for _ in range(steps):
+        env.step(rng.uniform(-1, 1, (env.num_envs, n_tics)).astype(np.float32))
+    return steps * env.num_envs / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=2520)
+    parser.add_argument("--tics", type=int, default=30)
+    parser.add_argument("--ppo-steps", type=int, default=20_000)
+    args = parser.parse_args()
+    df = make_daily_frame(args.days, args.tics)
+
+    for n in (1, 16, 256, 1024):
+        vec = env_steps_per_sec(make_vec_env(df, args.tics, n), args.tics, 200)
+        line = f"N={n:5d}  StockTradingVecEnv: {vec:12,.0f} env-steps/sec"
+        if n <= 16:
+            dummy = DummyVecEnv([lambda: make_env(df, args.tics) for _ in range(n)])
+            line += f"  DummyVecEnv: {env_steps_per_sec(dummy, args.tics, 200):10,.0f}"
+        print(line)
+
+    for n in (1, 64):
+        model = PPO("MlpPolicy", make_vec_env(df, args.tics, n), n_steps=256, batch_size=256, verbose=0)
+        start = time.perf_counter()
+        model.learn(total_timesteps=args.ppo_steps)
+        print(f"PPO N={n:3d}: {args.ppo_steps / (time.perf_counter() - start):,.0f} timesteps/sec")
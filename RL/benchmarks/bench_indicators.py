@@ -0,0 +1,37 @@
+"""Time to add FinRL's default technical indicators with
+``FeatureEngineer.add_technical_indicator`` on 20 years x 500 tickers.
+
+Usage: PYTHONPATH=. python benchmarks/bench_indicators.py [--days 5040] [--tics 500] [--jobs 0]
+       [--engine native]
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+from synthetic import make_daily_frame
+
+from finrl.config import INDICATORS
+from finrl.meta.preprocessor.preprocessors import FeatureEngineer
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=5040)
+    parser.add_argument("--tics", type=int, default=500)
+    parser.add_argument("--jobs", type=int, default=0, help="0: one per CPU")
+    parser.add_argument("--engine", default="stockstats", choices=["stockstats", "native"])
+    args = parser.parse_args()
+
+    df = make_daily_frame(args.days, args.tics, indicators=[]).reset_index(drop=True)
+    fe = FeatureEngineer(
+        tech_indicator_list=INDICATORS,
+        n_jobs=args.jobs or None,
+        indicator_engine=args.engine,
+    )
+    start = time.perf_counter()
+    df = fe.add_technical_indicator(df)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{len(INDICATORS)} indicators for {args.tics} tickers x {args.days} days "
+        f"({args.engine}) in {elapsed:.2f} s"
+    )
@@ -0,0 +1,72 @@
+"""Worker memory and startup time of ``StockTradingEnvCashpenalty`` copies
+with shared market arrays versus a private deepcopy per worker.
+
+Each worker process builds its env, resets it and reports its unique set
+size (USS), which is what a ``SubprocVecEnv`` worker would hold.
+
+Usage: PYTHONPATH=. python benchmarks/bench_shared_env.py
+"""
+from __future__ import annotations
+
+import argparse
+import multiprocessing as mp
+import time
+
+import psutil
+from synthetic import make_daily_frame
+
+from finrl.meta.env_stock_trading.env_stocktrading_cashpenalty import (
+    StockTradingEnvCashpenalty,
+)
+from finrl.meta.env_stock_trading.shared_arrays import make_shared_env_fns
+
+
+class Private:
+    # what get_multiproc_env(shared=False) sends to each worker
+    def __init__(self, env):
+        self.env = env
+
+    def __call__(self):
+        return self.env
+
+
+def worker(env_fn, ready, release):
+    env_fn().reset()
+    ready.put(psutil.Process().memory_full_info().uss)
+    release.wait()
+
+
+def start_workers(env_fn, n, ctx):
+    ready, release = ctx.Queue(), ctx.Event()
+    start = time.perf_counter()
+    procs = [ctx.Process(target=worker, args=(env_fn, ready, release)) for _ in range(n)]
+    for p in procs:
+        p.start()
+    uss = [ready.get() for _ in procs]
+    elapsed = time.perf_counter() - start
+    release.set()
+    for p in procs:
+        p.join()
+    return elapsed, sum(uss)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=504)
+    parser.add_argument("--tics", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--start-method", default="spawn")
+    args = parser.parse_args()
+    ctx = mp.get_context(args.start_method)
+
+    df = make_daily_frame(args.days, args.tics, indicators=[]).reset_index(drop=True)
+    env = StockTradingEnvCashpenalty(df, print_verbosity=10**9)
+
+    elapsed, uss = start_workers(Private(env), args.workers, ctx)
+    print(f"deepcopy: {elapsed:6.2f} s startup, {uss / 2**20:8.0f} MiB USS total")
+    env_fns, shared = make_shared_env_fns(env, env._market_arrays(), args.workers)
+    try:
+        elapsed, uss = start_workers(env_fns[0], args.workers, ctx)
+    finally:
+        shared.close()
+    print(f"shared:   {elapsed:6.2f} s startup, {uss / 2**20:8.0f} MiB USS total")
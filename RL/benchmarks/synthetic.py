@@ -0,0 +1,47 @@
+"""Synthetic market data shaped like the frames FinRL's processors produce.
+
+Benchmarks use these instead of downloading data so they run offline and
+are reproducible. Prices follow a geometric random walk; indicator columns
+are smooth noise of a realistic magnitude.
+"""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from finrl.config import INDICATORS
+
+
+def make_daily_frame(
+    n_days: int = 2520,
+    n_tics: int = 30,
+    indicators: list[str] = INDICATORS,
+    seed: int = 0,
+    start: str = "2010-01-01",
+) -> pd.DataFrame:
+    """Long-format daily frame sorted by ``date, tic`` and indexed by day
+    number, as returned by ``data_split``."""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(start, periods=n_days).strftime("%Y-%m-%d")
+    tics = [f"T{i:03d}" for i in range(n_tics)]
+
+    log_ret = rng.normal(0.0003, 0.015, size=(n_days, n_tics))
+    close = 50 * np.exp(np.cumsum(log_ret, axis=0)) * rng.uniform(0.5, 4, n_tics)
+    spread = np.abs(rng.normal(0, 0.01, size=close.shape)) * close
+
+    df = pd.DataFrame(
+        {
+            "date": np.repeat(dates, n_tics),
+            "tic": np.tile(tics, n_days),
+            "open": (close + rng.normal(0, 0.3, close.shape) * spread).ravel(),
+            "high": (close + spread).ravel(),
+            "low": (close - spread).ravel(),
+            "close": close.ravel(),
+            "volume": rng.integers(1e5, 1e7, size=close.size).astype(float),
+        }
+    )
+    for name in indicators:
+        df[name] = np.cumsum(rng.normal(0, 1, size=(n_days, n_tics)), axis=0).ravel()
+    df["turbulence"] = np.repeat(np.abs(rng.normal(0, 50, n_days)), n_tics)
+    df.index = np.repeat(np.arange(n_days), n_tics)
+    return df
@@ -68,13 +68,18 @@ class DRLAgent:
         stock_dim = self.price_array.shape[1]
         self.state_dim = 1 + 2 + 3 * stock_dim + self.tech_array.shape[1]
         self.action_dim = stock_dim
+        # shorter, randomly placed episodes: passed on to the env constructor,
+        # and the rollout horizon follows the episode length
+        episode_length = model_kwargs.get("episode_length")
         self.env_args = {
             "env_name": "StockEnv",
             "config": self.env_config,
             "state_dim": self.state_dim,
             "action_dim": self.action_dim,
             "if_discrete": False,
-            "max_step": self.price_array.shape[0] - 1,
+            "max_step": episode_length or self.price_array.shape[0] - 1,
+            "episode_length": episode_length,
+            "random_start": model_kwargs.get("random_start", False),
         }
 
         model = Config(agent_class=agent, env_class=env, env_args=self.env_args)
@@ -87,7 +87,11 @@ class PolicyGradient:
         # replay buffer and portfolio vector memory
         self.train_batch_size = batch_size
         self.train_buffer = ReplayBuffer(capacity=batch_size)
-        self.train_pvm = PVM(self.train_env.episode_length, env.portfolio_size)
+        self.train_pvm = PVM(
+            self.train_env.episode_length,
+            env.portfolio_size,
+            num_envs=getattr(env, "num_envs", None),
+        )
 
         # dataset and dataloader
         dataset = RLDataset(self.train_buffer)
@@ -101,6 +105,9 @@ class PolicyGradient:
         Args:
             episodes: Number of episodes to simulate.
         """
+        # a batched environment (e.g. PortfolioOptimizationBatchEnv) steps
+        # num_envs portfolios per policy forward
+        num_envs = getattr(self.train_env, "num_envs", None)
         for i in tqdm(range(1, episodes + 1)):
             obs = self.train_env.reset()  # observation
             self.train_pvm.reset()  # reset portfolio vector memory
@@ -109,28 +116,51 @@ class PolicyGradient:
             while not done:
                 # define last_action and action and update portfolio vector memory
                 last_action = self.train_pvm.retrieve()
-                obs_batch = np.expand_dims(obs, axis=0)
-                last_action_batch = np.expand_dims(last_action, axis=0)
-                action = apply_portfolio_noise(
-                    self.train_policy(obs_batch, last_action_batch), self.action_noise
-                )
+                if num_envs is None:
+                    obs_batch = np.expand_dims(obs, axis=0)
+                    last_action_batch = np.expand_dims(last_action, axis=0)
+                    action = apply_portfolio_noise(
+                        self.train_policy(obs_batch, last_action_batch),
+                        self.action_noise,
+                    )
+                else:
+                    # the memory holds one last action per portfolio
+                    obs_batch = obs
+                    last_action_batch = last_action
+                    action = np.reshape(
+                        self.train_policy(obs_batch, last_action_batch),
+                        last_action_batch.shape,
+                    )
+                    action = np.stack(
+                        [apply_portfolio_noise(a, self.action_noise) for a in action]
+                    )
                 self.train_pvm.add(action)
 
                 # run simulation step
                 next_obs, reward, done, info = self.train_env.step(action)
 
-                # add experience to replay buffer
-                exp = (obs, last_action, info["price_variation"], info["trf_mu"])
-                self.train_buffer.append(exp)
-
-                # update policy networks
-                if len(self.train_buffer) == self.train_batch_size:
-                    self._gradient_ascent()
+                # add experiences to replay buffer
+                if num_envs is None:
+                    exps = [(obs, last_action, info["price_variation"], info["trf_mu"])]
+                else:
+                    exps = zip(
+                        obs_batch,
+                        last_action_batch,
+                        info["price_variation"],
+                        info["trf_mu"],
+                    )
+                for exp in exps:
+                    self.train_buffer.append(exp)
+
+                    # update policy networks
+                    if len(self.train_buffer) == self.train_batch_size:
+                        self._gradient_ascent()
 
                 obs = next_obs
 
             # gradient ascent with episode remaining buffer data
-            self._gradient_ascent()
+            if len(self.train_buffer):
+                self._gradient_ascent()
 
             # validation step
             if self.validation_env:
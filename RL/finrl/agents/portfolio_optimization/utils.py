@@ -9,22 +9,27 @@ from torch.utils.data.dataset import IterableDataset
 
 
 class PVM:
-    def __init__(self, capacity, portfolio_size):
+    def __init__(self, capacity, portfolio_size, num_envs=None):
         """Initializes portfolio vector memory.
 
         Args:
           capacity: Max capacity of memory.
           portfolio_size: Portfolio size.
+          num_envs: Number of portfolios of a batched environment. If set,
+            every action is an array of shape (num_envs, portfolio_size + 1),
+            one row per portfolio.
         """
         # initially, memory will have the same actions
         self.capacity = capacity
         self.portfolio_size = portfolio_size
+        self.num_envs = num_envs
         self.reset()
 
     def reset(self):
-        self.memory = [np.array([1] + [0] * self.portfolio_size, dtype=np.float32)] * (
-            self.capacity + 1
-        )
+        initial_action = np.array([1] + [0] * self.portfolio_size, dtype=np.float32)
+        if self.num_envs is not None:
+            initial_action = np.tile(initial_action, (self.num_envs, 1))
+        self.memory = [initial_action] * (self.capacity + 1)
         self.index = 0  # initial index to retrieve data
 
     def retrieve(self):
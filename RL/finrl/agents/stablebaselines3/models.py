@@ -293,6 +293,7 @@ class DRLEnsembleAgent:
         self.tech_indicator_list = tech_indicator_list
         self.print_verbosity = print_verbosity
         self.train_env = None  # defined in train_validation() function
+        self._trade_env = None  # built by the first DRL_prediction() call
 
     def DRL_validation(self, model, test_data, test_env, test_obs):
         """validation process"""
@@ -303,52 +304,64 @@ class DRLEnsembleAgent:
     def DRL_prediction(
         self, model, name, last_state, iter_num, turbulence_threshold, initial
     ):
-        """make a prediction based on trained model"""
+        """make a prediction based on trained model
 
-        # trading env
-        trade_data = data_split(
-            self.df,
-            start=self.unique_trade_date[iter_num - self.rebalance_window],
-            end=self.unique_trade_date[iter_num],
-        )
-        trade_env = DummyVecEnv(
-            [
-                lambda: StockTradingEnv(
-                    df=trade_data,
-                    stock_dim=self.stock_dim,
-                    hmax=self.hmax,
-                    initial_amount=self.initial_amount,
-                    num_stock_shares=[0] * self.stock_dim,
-                    buy_cost_pct=[self.buy_cost_pct] * self.stock_dim,
-                    sell_cost_pct=[self.sell_cost_pct] * self.stock_dim,
-                    reward_scaling=self.reward_scaling,
-                    state_space=self.state_space,
-                    action_space=self.action_space,
-                    tech_indicator_list=self.tech_indicator_list,
-                    turbulence_threshold=turbulence_threshold,
-                    initial=initial,
-                    previous_state=last_state,
-                    model_name=name,
-                    mode="trade",
-                    iteration=iter_num,
-                    print_verbosity=self.print_verbosity,
-                )
-            ]
-        )
-
-        trade_obs = trade_env.reset()
+        One trade env over all trade dates is reused across windows: it is
+        moved to the dates of this window and, unless ``initial``, starts from
+        ``last_state``, the :class:`EnvSnapshot` this method returned for the
+        previous window.
+        """
+        trade_env = self._get_trade_env(name)
+        start_day = iter_num - self.rebalance_window
+        trade_env.set_window(start_day, iter_num - 1)
+        trade_env.turbulence_threshold = turbulence_threshold
+        trade_env.iteration = iter_num
+        if initial:
+            trade_obs, _ = trade_env.reset()
+        else:
+            trade_obs = trade_env.restore(last_state, day=start_day)
 
-        for i in range(len(trade_data.index.unique())):
+        n_steps = iter_num - start_day
+        for i in range(n_steps):
             action, _states = model.predict(trade_obs)
-            trade_obs, rewards, dones, info = trade_env.step(action)
-            if i == (len(trade_data.index.unique()) - 2):
-                # print(env_test.render())
-                last_state = trade_env.envs[0].render()
-
-        df_last_state = pd.DataFrame({"last_state": last_state})
-        df_last_state.to_csv(f"results/last_state_{name}_{i}.csv", index=False)
+            trade_obs, rewards, dones, truncated, info = trade_env.step(action)
+            if i == n_steps - 2:
+                last_state = trade_env.snapshot()
+                last_state_vector = trade_env.render().copy()
+
+        trade_env.sink.csv(
+            pd.DataFrame({"last_state": last_state_vector}),
+            f"results/last_state_{name}_{i}.csv",
+            index=False,
+        )
         return last_state
 
+    def _get_trade_env(self, name):
+        if self._trade_env is None:
+            # data_split drops the end date, like the per-window splits did
+            trade_data = data_split(
+                self.df,
+                start=self.unique_trade_date[0],
+                end=self.unique_trade_date[-1],
+            )
+            self._trade_env = StockTradingEnv(
+                df=trade_data,
+                stock_dim=self.stock_dim,
+                hmax=self.hmax,
+                initial_amount=self.initial_amount,
+                num_stock_shares=[0] * self.stock_dim,
+                buy_cost_pct=[self.buy_cost_pct] * self.stock_dim,
+                sell_cost_pct=[self.sell_cost_pct] * self.stock_dim,
+                reward_scaling=self.reward_scaling,
+                state_space=self.state_space,
+                action_space=self.action_space,
+                tech_indicator_list=self.tech_indicator_list,
+                model_name=name,
+                mode="trade",
+                print_verbosity=self.print_verbosity,
+            )
+        return self._trade_env
+
     def _train_window(
         self,
         model_name,
@@ -413,6 +426,8 @@ class DRLEnsembleAgent:
             test_env=val_env,
             test_obs=val_obs,
         )
+        # the validation CSV is queued on the env's sink; wait for it
+        val_env.envs[0].sink.flush()
         sharpe = self.get_validation_sharpe(i, model_name=model_name)
         print(f"{model_name} Sharpe Ratio: ", sharpe)
         sharpe_list.append(sharpe)
@@ -638,6 +653,9 @@ class DRLEnsembleAgent:
             )
             # Trading ends
 
+        # callers read the trade results CSVs once this returns
+        if self._trade_env is not None:
+            self._trade_env.sink.flush()
         end = time.time()
         print("Ensemble Strategy took: ", (end - start) / 60, " minutes")
 
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import json
+import os
+
+import numpy as np
+
+MANIFEST = "manifest.json"
+
+
+class RepeatedSeries:
+    """A coarse series (e.g. daily) read at a finer resolution (e.g. minutes)
+    without materializing the fine one.
+
+    Element ``i`` is ``base[(start + i * step) // repeat]``. Integer indexing
+    and index arrays return values, slicing returns another view, so
+    ``series[i0:i1:gap]`` stays as small as ``base``. ``np.asarray(series)``
+    materializes it.
+    """
+
+    def __init__(self, base, repeat, start=0, step=1, length=None):
+        self.base = base
+        self.repeat = int(repeat)
+        self.start = int(start)
+        self.step = int(step)
+        if length is None:
+            length = len(range(self.start, len(base) * self.repeat, self.step))
+        self.length = int(length)
+
+    @property
+    def shape(self):
+        return (self.length,) + tuple(np.shape(self.base)[1:])
+
+    @property
+    def dtype(self):
+        return self.base.dtype
+
+    def __len__(self):
+        return self.length
+
+    def _positions(self):
+        return range(self.start, self.start + self.length * self.step, self.step)
+
+    def __getitem__(self, key):
+        positions = self._positions()
+        if isinstance(key, slice):
+            r = positions[key]
+            return RepeatedSeries(self.base, self.repeat, r.start, r.step, len(r))
+        if isinstance(key, (int, np.integer)):
+            return self.base[positions[key] // self.repeat]
+        index = np.asarray(key)
+        if index.dtype == bool:
+            index = np.flatnonzero(index)
+        index = np.where(index < 0, index + self.length, index)
+        return self.base[(self.start + index * self.step) // self.repeat]
+
+    def apply(self, fn) -> RepeatedSeries:
+        """Element-wise ``fn`` applied to the coarse series only."""
+        return RepeatedSeries(
+            fn(self.base), self.repeat, self.start, self.step, self.length
+        )
+
+    def __array__(self, dtype=None, copy=None):
+        values = self[np.arange(self.length)]
+        return values if dtype is None else values.astype(dtype)
+
+
+def apply_elementwise(ary, fn):
+    """``fn(ary)``, computed on the coarse series when ``ary`` is a
+    :class:`RepeatedSeries`."""
+    if isinstance(ary, RepeatedSeries):
+        return ary.apply(fn)
+    return fn(ary)
+
+
+def save_array_store(directory, arrays, repeats=None, lengths=None, chunk_rows=65536):
+    """Write ``arrays`` as float32 ``.npy`` files plus a manifest.
+
+    Arrays are converted ``chunk_rows`` rows at a time, so an input that is
+    itself memory-mapped is never held in RAM as a whole.
+
+    Args:
+        directory: destination, created if missing.
+        arrays: name -> array.
+        repeats: name -> factor for coarse series read at a finer resolution;
+            :func:`load_array_store` returns them as :class:`RepeatedSeries`.
+        lengths: name -> length of a repeated series at the fine resolution,
+            counted from its end (its first ``len * repeat - length`` fine
+            steps are skipped). Defaults to ``len * repeat``.
+    """
+    repeats = repeats or {}
+    lengths = lengths or {}
+    os.makedirs(directory, exist_ok=True)
+    manifest = {"arrays": {}}
+    for name, array in arrays.items():
+        file = f"{name}.npy"
+        out = np.lib.format.open_memmap(
+            os.path.join(directory, file),
+            mode="w+",
+            dtype=np.float32,
+            shape=array.shape,
+        )
+        for begin in range(0, len(array), chunk_rows):
+            out[begin : begin + chunk_rows] = array[begin : begin + chunk_rows]
+        out.flush()
+        del out
+        entry = {"file": file, "dtype": "float32", "shape": list(array.shape)}
+        if name in repeats:
+            entry["repeat"] = int(repeats[name])
+            entry["length"] = int(lengths.get(name, len(array) * repeats[name]))
+        manifest["arrays"][name] = entry
+    with open(os.path.join(directory, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def has_array_store(directory) -> bool:
+    return os.path.exists(os.path.join(directory, MANIFEST))
+
+
+def load_array_store(directory) -> dict:
+    """Open the arrays written by :func:`save_array_store` read-only and
+    memory-mapped; repeated series come back as :class:`RepeatedSeries`."""
+    with open(os.path.join(directory, MANIFEST)) as f:
+        manifest = json.load(f)
+    arrays = {}
+    for name, entry in manifest["arrays"].items():
+        array = np.load(os.path.join(directory, entry["file"]), mmap_mode="r")
+        if "repeat" in entry:
+            repeat, length = entry["repeat"], entry["length"]
+            array = RepeatedSeries(
+                array, repeat, start=len(array) * repeat - length, length=length
+            )
+        arrays[name] = array
+    return arrays
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import atexit
+import os
+import threading
+import warnings
+from collections import deque
+
+from matplotlib.figure import Figure
+
+OVERFLOW_POLICIES = ("block", "drop_oldest", "drop_newest")
+
+
+def save_plot(path, *series, fmt="r", title=None, xlabel=None, ylabel=None):
+    """Plot ``series`` on a fresh figure and save it to ``path``.
+
+    Uses a standalone :class:`~matplotlib.figure.Figure` instead of pyplot's
+    global state, so it is safe to call from the sink's worker thread.
+    """
+    fig = Figure()
+    ax = fig.add_subplot()
+    for s in series:
+        if fmt is None:
+            ax.plot(s)
+        else:
+            ax.plot(s, fmt)
+    if title is not None:
+        ax.set_title(title)
+    if xlabel is not None:
+        ax.set_xlabel(xlabel)
+    if ylabel is not None:
+        ax.set_ylabel(ylabel)
+    fig.savefig(path)
+
+
+def write_csv(df, path, **kwargs):
+    df.to_csv(path, **kwargs)
+
+
+class ArtifactSink:
+    """Bounded queue of artifact jobs (plots, CSVs, reports) run off the
+    environment's step loop.
+
+    ``submit`` only enqueues; a daemon thread takes up to ``batch_size`` jobs
+    at a time and runs them in order. When ``max_pending`` jobs are waiting,
+    ``overflow`` decides what happens to a new one: ``"block"`` waits for
+    room (the default, so no result is lost), while ``"drop_oldest"``
+    discards the oldest pending job and ``"drop_newest"`` discards the new
+    one, for best-effort plots. Dropped jobs are counted in ``dropped``.
+    With ``background=False`` jobs run inline in ``submit``.
+
+    Jobs must not share mutable data with the caller: pass copies (DataFrames
+    built at submit time, ``np.array(...)`` of memory buffers), since the
+    environment keeps stepping while the job waits.
+    """
+
+    def __init__(
+        self,
+        max_pending: int = 64,
+        batch_size: int = 8,
+        overflow: str = "block",
+        background: bool = True,
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(
+                f"overflow must be one of {OVERFLOW_POLICIES}, got {overflow!r}"
+            )
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.overflow = overflow
+        self.background = background
+        self.dropped = 0
+        self.failed = 0
+        self._jobs = deque()
+        self._running = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = None
+        if background:
+            self._thread = threading.Thread(
+                target=self._worker, name="artifact-sink", daemon=True
+            )
+            self._thread.start()
+
+    def submit(self, fn, *args, **kwargs) -> bool:
+        """Queue ``fn(*args, **kwargs)``. Returns False if the job was dropped."""
+        if not self.background:
+            self._run(fn, args, kwargs)
+            return True
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("ArtifactSink is closed")
+            if len(self._jobs) >= self.max_pending:
+                if self.overflow == "drop_newest":
+                    self.dropped += 1
+                    return False
+                if self.overflow == "drop_oldest":
+                    self._jobs.popleft()
+                    self.dropped += 1
+                else:
+                    self._cond.wait_for(
+                        lambda: len(self._jobs) < self.max_pending or self._closed
+                    )
+            self._jobs.append((fn, args, kwargs))
+            self._cond.notify_all()
+        return True
+
+    def plot(self, path, *series, **kwargs) -> bool:
+        """Queue :func:`save_plot`."""
+        return self.submit(save_plot, path, *series, **kwargs)
+
+    def csv(self, df, path, **kwargs) -> bool:
+        """Queue ``df.to_csv(path, **kwargs)``."""
+        return self.submit(write_csv, df, path, **kwargs)
+
+    def flush(self, timeout=None) -> bool:
+        """Wait until every queued job has run. Returns False on timeout."""
+        if not self.background:
+            return True
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: not self._jobs and not self._running, timeout
+            )
+
+    def close(self, timeout=None):
+        """Run the remaining jobs and stop the worker thread."""
+        if self._thread is None:
+            return
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._jobs or self._closed)
+                if not self._jobs:
+                    return
+                n = min(self.batch_size, len(self._jobs))
+                batch = [self._jobs.popleft() for _ in range(n)]
+                self._running = n
+                self._cond.notify_all()
+            for fn, args, kwargs in batch:
+                self._run(fn, args, kwargs)
+            with self._cond:
+                self._running = 0
+                self._cond.notify_all()
+
+    def _run(self, fn, args, kwargs):
+        try:
+            fn(*args, **kwargs)
+        except Exception as e:
+            self.failed += 1
+            warnings.warn(f"artifact job {getattr(fn, '__name__', fn)} failed: {e!r}")
+
+
+_default_sink = None
+_default_pid = None
+_default_lock = threading.Lock()
+
+
+def get_default_sink() -> ArtifactSink:
+    """The process-wide sink shared by environments that are not given one.
+
+    It is created on first use (again in a forked child, whose copy has no
+    worker thread) and drained at interpreter exit.
+    """
+    global _default_sink, _default_pid
+    with _default_lock:
+        if _default_sink is None or _default_pid != os.getpid():
+            _default_sink = ArtifactSink()
+            _default_pid = os.getpid()
+            atexit.register(_default_sink.close)
+        return _default_sink
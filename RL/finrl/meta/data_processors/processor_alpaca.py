@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import os
 from concurrent.futures import ProcessPoolExecutor
 from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
@@ -14,9 +15,58 @@ from alpaca.data.requests import StockBarsRequest
 from alpaca.data.timeframe import TimeFrame
 from stockstats import StockDataFrame as Sdf
 
+from finrl.meta.preprocessor.streaming import LiveBars
+from finrl.meta.preprocessor.turbulence import calculate_turbulence
+
 # import alpaca_trade_api as tradeapi
 
 
+def _clean_ticker(args):
+    tic, df, times = args
+    tmp_df = pd.DataFrame(index=times)
+    tic_df = df[df.tic == tic].set_index("timestamp")
+
+    # Step 1: Merging dataframes to avoid loop
+    tmp_df = tmp_df.merge(
+        tic_df[["open", "high", "low", "close", "volume"]],
+        left_index=True,
+        right_index=True,
+        how="left",
+    )
+
+    # Step 2: Handling NaN values efficiently
+    if pd.isna(tmp_df.iloc[0]["close"]):
+        first_valid_index = tmp_df["close"].first_valid_index()
+        if first_valid_index is not None:
+            first_valid_price = tmp_df.loc[first_valid_index, "close"]
+            print(
+                f"The price of the first row for ticker {tic} is NaN. It will be filled with the first valid price."
+            )
+            tmp_df.iloc[0] = [first_valid_price] * 4 + [0.0]  # Set volume to zero
+        else:
+            print(
+                f"Missing data for ticker: {tic}. The prices are all NaN. Fill with 0."
+            )
+            tmp_df.iloc[0] = [0.0] * 5
+
+    # a missing bar repeats the previous close with zero volume
+    missing = tmp_df["close"].isna()
+    tmp_df["close"] = tmp_df["close"].ffill()
+    for column in ["open", "high", "low"]:
+        tmp_df[column] = tmp_df[column].mask(missing, tmp_df["close"])
+    tmp_df["volume"] = tmp_df["volume"].mask(missing, 0.0)
+
+    # Setting the volume for the market opening timestamp to zero - Not needed
+    # tmp_df.loc[tmp_df.index.time == pd.Timestamp("09:30:00").time(), 'volume'] = 0.0
+
+    # Step 3: Data type conversion
+    tmp_df = tmp_df.astype(float)
+
+    tmp_df["tic"] = tic
+
+    return tmp_df
+
+
 class AlpacaProcessor:
     def __init__(self, API_KEY=None, API_SECRET=None, API_BASE_URL=None, client=None):
         if client is None:
@@ -26,6 +76,7 @@ class AlpacaProcessor:
                 raise ValueError("Wrong Account Info!")
         else:
             self.client = client
+        self._live = None
 
     def _fetch_data_for_ticker(self, ticker, start_date, end_date, time_interval):
         request_params = StockBarsRequest(
@@ -135,78 +186,46 @@ class AlpacaProcessor:
 
     @staticmethod
     def clean_individual_ticker(args):
-        tic, df, times = args
-        tmp_df = pd.DataFrame(index=times)
-        tic_df = df[df.tic == tic].set_index("timestamp")
-
-        # Step 1: Merging dataframes to avoid loop
-        tmp_df = tmp_df.merge(
-            tic_df[["open", "high", "low", "close", "volume"]],
-            left_index=True,
-            right_index=True,
-            how="left",
-        )
-
-        # Step 2: Handling NaN values efficiently
-        if pd.isna(tmp_df.iloc[0]["close"]):
-            first_valid_index = tmp_df["close"].first_valid_index()
-            if first_valid_index is not None:
-                first_valid_price = tmp_df.loc[first_valid_index, "close"]
-                print(
-                    f"The price of the first row for ticker {tic} is NaN. It will be filled with the first valid price."
-                )
-                tmp_df.iloc[0] = [first_valid_price] * 4 + [0.0]  # Set volume to zero
-            else:
-                print(
-                    f"Missing data for ticker: {tic}. The prices are all NaN. Fill with 0."
-                )
-                tmp_df.iloc[0] = [0.0] * 5
+        return _clean_ticker(args)
 
-        for i in range(1, tmp_df.shape[0]):
-            if pd.isna(tmp_df.iloc[i]["close"]):
-                previous_close = tmp_df.iloc[i - 1]["close"]
-                tmp_df.iloc[i] = [previous_close] * 4 + [0.0]
-
-        # Setting the volume for the market opening timestamp to zero - Not needed
-        # tmp_df.loc[tmp_df.index.time == pd.Timestamp("09:30:00").time(), 'volume'] = 0.0
-
-        # Step 3: Data type conversion
-        tmp_df = tmp_df.astype(float)
-
-        tmp_df["tic"] = tic
-
-        return tmp_df
-
-    def clean_data(self, df):
+    def clean_data(self, df, n_jobs=1):
+        """
+        put every ticker on the full minute grid of the trading days
+        :param df: (df) pandas dataframe
+        :param n_jobs: processes cleaning tickers (1: serially, None: one per CPU)
+        :return: (df) pandas dataframe
+        """
         print("Data cleaning started")
         tic_list = np.unique(df.tic.values)
         n_tickers = len(tic_list)
 
         print("align start and end dates")
-        grouped = df.groupby("timestamp")
-        filter_mask = grouped.transform("count")["tic"] >= n_tickers
+        filter_mask = df.groupby("timestamp")["tic"].transform("count") >= n_tickers
         df = df[filter_mask]
 
-        # ... (generating 'times' series, same as in your existing code)
-
         trading_days = self.get_trading_days(start=self.start, end=self.end)
 
         # produce full timestamp index
         print("produce full timestamp index")
-        times = []
-        for day in trading_days:
-            NY = "America/New_York"
-            current_time = pd.Timestamp(day + " 09:30:00").tz_localize(NY)
-            for i in range(390):
-                times.append(current_time)
-                current_time += pd.Timedelta(minutes=1)
+        NY = "America/New_York"
+        opens = pd.DatetimeIndex(trading_days) + pd.Timedelta("09:30:00")
+        times = opens.tz_localize(NY).repeat(390) + pd.to_timedelta(
+            np.tile(np.arange(390), len(trading_days)), unit="min"
+        )
 
         print("Start processing tickers")
 
-        future_results = []
-        for tic in tic_list:
-            result = self.clean_individual_ticker((tic, df.copy(), times))
-            future_results.append(result)
+        # each task gets its own ticker's rows only
+        groups = dict(tuple(df.groupby("tic")))
+        tasks = [
+            (tic, groups.get(tic, df.iloc[:0]), times) for tic in tic_list
+        ]
+        n_jobs = n_jobs or os.cpu_count() or 1
+        if n_jobs == 1 or len(tasks) < 2:
+            future_results = [_clean_ticker(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=min(n_jobs, len(tasks))) as executor:
+                future_results = list(executor.map(_clean_ticker, tasks))
 
         print("ticker list complete")
 
@@ -313,55 +332,10 @@ class AlpacaProcessor:
 
     def calculate_turbulence(self, data, time_period=252):
         # can add other market assets
-        df = data.copy()
-        df_price_pivot = df.pivot(index="timestamp", columns="tic", values="close")
-        # use returns to calculate turbulence
-        df_price_pivot = df_price_pivot.pct_change()
-
-        unique_date = df.timestamp.unique()
-        # start after a fixed timestamp period
-        start = time_period
-        turbulence_index = [0] * start
-        # turbulence_index = [0]
-        count = 0
-        for i in range(start, len(unique_date)):
-            current_price = df_price_pivot[df_price_pivot.index == unique_date[i]]
-            # use one year rolling window to calcualte covariance
-            hist_price = df_price_pivot[
-                (df_price_pivot.index < unique_date[i])
-                & (df_price_pivot.index >= unique_date[i - time_period])
-            ]
-            # Drop tickers which has number missing values more than the "oldest" ticker
-            filtered_hist_price = hist_price.iloc[
-                hist_price.isna().sum().min() :
-            ].dropna(axis=1)
-
-            cov_temp = filtered_hist_price.cov()
-            current_temp = current_price[[x for x in filtered_hist_price]] - np.mean(
-                filtered_hist_price, axis=0
-            )
-            temp = current_temp.values.dot(np.linalg.pinv(cov_temp)).dot(
-                current_temp.values.T
-            )
-            if temp > 0:
-                count += 1
-                if count > 2:
-                    turbulence_temp = temp[0][0]
-                else:
-                    # avoid large outlier because of the calculation just begins
-                    turbulence_temp = 0
-            else:
-                turbulence_temp = 0
-            turbulence_index.append(turbulence_temp)
-
-        turbulence_index = pd.DataFrame(
-            {"timestamp": df_price_pivot.index, "turbulence": turbulence_index}
+        return calculate_turbulence(
+            data, time_period=time_period, time_col="timestamp"
         )
 
-        # print("turbulence_index\n", turbulence_index)
-
-        return turbulence_index
-
     def add_turbulence(self, data, time_period=252):
         """
         add turbulence index from a precalcualted dataframe
@@ -409,49 +383,28 @@ class AlpacaProcessor:
         return trading_days
 
     def fetch_latest_data(
-        self, ticker_list, time_interval, tech_indicator_list, limit=100
+        self,
+        ticker_list,
+        time_interval,
+        tech_indicator_list,
+        limit=100,
+        incremental=False,
     ) -> pd.DataFrame:
-        data_df = pd.DataFrame()
-        for tic in ticker_list:
-            request_params = StockBarsRequest(
-                symbol_or_symbols=[tic], timeframe=TimeFrame.Minute, limit=limit
-            )
-
-            barset = self.client.get_stock_bars(request_params).df
-            # Reorganize the dataframes to be in original alpaca_trade_api structure
-            # Rename the existing 'symbol' column if it exists
-            if "symbol" in barset.columns:
-                barset.rename(columns={"symbol": "symbol_old"}, inplace=True)
-
-            # Now reset the index
-            barset.reset_index(inplace=True)
-
-            # Set 'timestamp' as the new index
-            if "level_0" in barset.columns:
-                barset.rename(columns={"level_0": "symbol"}, inplace=True)
-            if "level_1" in bars.columns:
-                barset.rename(columns={"level_1": "timestamp"}, inplace=True)
-            barset.set_index("timestamp", inplace=True)
-
-            # Reorder and rename columns as needed
-            barset = bars[
-                [
-                    "close",
-                    "high",
-                    "low",
-                    "trade_count",
-                    "open",
-                    "volume",
-                    "vwap",
-                    "symbol",
-                ]
-            ]
-
-            barset["tic"] = tic
-            barset = barset.reset_index()
-            data_df = pd.concat([data_df, barset])
-
-        data_df = data_df.reset_index(drop=True)
+        """
+        latest prices, indicators and VIXY close of ticker_list
+        with incremental=True the indicators are kept in a LiveBars stream:
+        the first call warms it with the last limit bars, later calls only
+        download and add the bars from the stream's latest bar on
+        """
+        live = self._live
+        if incremental and live is not None and live.matches(
+            ticker_list, tech_indicator_list
+        ):
+            data_df = self._download_latest(ticker_list, start=live.last_time)
+            live.update(data_df)
+            return live.price, live.tech, self._latest_vixy()
+
+        data_df = self._download_latest(ticker_list, limit)
         start_time = data_df.timestamp.min()
         end_time = data_df.timestamp.max()
         times = []
@@ -518,6 +471,11 @@ class AlpacaProcessor:
         new_df = new_df.reset_index()
         new_df = new_df.rename(columns={"index": "timestamp"})
 
+        if incremental:
+            self._live = live = LiveBars(ticker_list, tech_indicator_list)
+            live.update(new_df)
+            return live.price, live.tech, self._latest_vixy()
+
         df = self.add_technical_indicator(new_df, tech_indicator_list)
         df["VIXY"] = 0
 
@@ -526,9 +484,60 @@ class AlpacaProcessor:
         )
         latest_price = price_array[-1]
         latest_tech = tech_array[-1]
+        latest_turb = self._latest_vixy()
+        return latest_price, latest_tech, latest_turb
+
+    def _download_latest(self, ticker_list, limit=None, start=None):
+        # the last limit minute bars of every ticker, or all of them from
+        # start on (without start Alpaca counts limit from the day's first bar)
+        data_df = pd.DataFrame()
+        for tic in ticker_list:
+            request_params = StockBarsRequest(
+                symbol_or_symbols=[tic],
+                timeframe=TimeFrame.Minute,
+                start=start,
+                limit=limit,
+            )
+
+            barset = self.client.get_stock_bars(request_params).df
+            # Reorganize the dataframes to be in original alpaca_trade_api structure
+            # Rename the existing 'symbol' column if it exists
+            if "symbol" in barset.columns:
+                barset.rename(columns={"symbol": "symbol_old"}, inplace=True)
+
+            # Now reset the index
+            barset.reset_index(inplace=True)
+
+            # Set 'timestamp' as the new index
+            if "level_0" in barset.columns:
+                barset.rename(columns={"level_0": "symbol"}, inplace=True)
+            if "level_1" in barset.columns:
+                barset.rename(columns={"level_1": "timestamp"}, inplace=True)
+            barset.set_index("timestamp", inplace=True)
+
+            # Reorder and rename columns as needed
+            barset = barset[
+                [
+                    "close",
+                    "high",
+                    "low",
+                    "trade_count",
+                    "open",
+                    "volume",
+                    "vwap",
+                    "symbol",
+                ]
+            ]
+
+            barset["tic"] = tic
+            barset = barset.reset_index()
+            data_df = pd.concat([data_df, barset])
+
+        return data_df.reset_index(drop=True)
+
+    def _latest_vixy(self):
         request_params = StockBarsRequest(
             symbol_or_symbols="VIXY", timeframe=TimeFrame.Minute, limit=1
         )
         turb_df = self.client.get_stock_bars(request_params).df
-        latest_turb = turb_df["close"].values
-        return latest_price, latest_tech, latest_turb
+        return turb_df["close"].values
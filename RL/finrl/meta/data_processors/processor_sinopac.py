@@ -9,6 +9,7 @@ from shioaji import Exchange
 from shioaji import TickSTKv1
 
 from finrl.meta.preprocessor.shioajidownloader import SinopacDownloader
+from finrl.meta.preprocessor.turbulence import calculate_turbulence
 
 
 class SinopacProcessor:
@@ -171,55 +172,10 @@ class SinopacProcessor:
 
     def calculate_turbulence(self, data, time_period=252):
         # can add other market assets
-        df = data.copy()
-        df_price_pivot = df.pivot(index="timestamp", columns="tic", values="Close")
-        # use returns to calculate turbulence
-        df_price_pivot = df_price_pivot.pct_change()
-
-        unique_date = df.timestamp.unique()
-        # start after a fixed timestamp period
-        start = time_period
-        turbulence_index = [0] * start
-        # turbulence_index = [0]
-        count = 0
-        for i in range(start, len(unique_date)):
-            current_price = df_price_pivot[df_price_pivot.index == unique_date[i]]
-            # use one year rolling window to calcualte covariance
-            hist_price = df_price_pivot[
-                (df_price_pivot.index < unique_date[i])
-                & (df_price_pivot.index >= unique_date[i - time_period])
-            ]
-            # Drop tickers which has number missing values more than the "oldest" ticker
-            filtered_hist_price = hist_price.iloc[
-                hist_price.isna().sum().min() :
-            ].dropna(axis=1)
-
-            cov_temp = filtered_hist_price.cov()
-            current_temp = current_price[[x for x in filtered_hist_price]] - np.mean(
-                filtered_hist_price, axis=0
-            )
-            temp = current_temp.values.dot(np.linalg.pinv(cov_temp)).dot(
-                current_temp.values.T
-            )
-            if temp > 0:
-                count += 1
-                if count > 2:
-                    turbulence_temp = temp[0][0]
-                else:
-                    # avoid large outlier because of the calculation just begins
-                    turbulence_temp = 0
-            else:
-                turbulence_temp = 0
-            turbulence_index.append(turbulence_temp)
-
-        turbulence_index = pd.DataFrame(
-            {"timestamp": df_price_pivot.index, "turbulence": turbulence_index}
+        return calculate_turbulence(
+            data, time_period=time_period, time_col="timestamp", price_col="Close"
         )
 
-        # print("turbulence_index\n", turbulence_index)
-
-        return turbulence_index
-
     def add_turbulence(self, data, time_period=252):
         """
         add turbulence index from a precalcualted dataframe
@@ -29,6 +29,10 @@ from selenium.webdriver.common.by import By
 from stockstats import StockDataFrame as Sdf
 from webdriver_manager.chrome import ChromeDriverManager
 
+from finrl.meta.preprocessor.indicators import indicator_frame
+from finrl.meta.preprocessor.streaming import LiveBars
+from finrl.meta.preprocessor.turbulence import calculate_turbulence
+
 ### Added by aymeric75 for scrap_data function
 
 
@@ -38,7 +42,7 @@ class YahooFinanceProcessor:
     """
 
     def __init__(self):
-        pass
+        self._live = None
 
     """
     Param
@@ -272,116 +276,99 @@ class YahooFinanceProcessor:
         return data_df
 
     def clean_data(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        put every ticker on the full timestamp grid of the trading days:
+        a missing bar repeats the previous close with volume 0, and a missing
+        first bar takes the first valid close (0 if the ticker has none)
+        :param df: (df) pandas dataframe
+        :return: (df) pandas dataframe, one block of rows per tic
+        """
         tic_list = np.unique(df.tic.values)
         NY = "America/New_York"
+        ohlcv = ["open", "high", "low", "close", "volume"]
 
         trading_days = self.get_trading_days(start=self.start, end=self.end)
+        timestamps = df["timestamp"]
+        if timestamps.dt.tz is None:
+            timestamps = timestamps.dt.tz_localize(NY)
+        else:
+            timestamps = timestamps.dt.tz_convert(NY)
         # produce full timestamp index
         if self.time_interval == "1d":
-            times = trading_days
+            times = pd.Index(trading_days)
+            keys = timestamps.dt.strftime("%Y-%m-%d")
         elif self.time_interval == "1m":
-            times = []
-            for day in trading_days:
-                #                NY = "America/New_York"
-                current_time = pd.Timestamp(day + " 09:30:00").tz_localize(NY)
-                for i in range(390):  # 390 minutes in trading day
-                    times.append(current_time)
-                    current_time += pd.Timedelta(minutes=1)
+            opens = pd.DatetimeIndex(trading_days) + pd.Timedelta("09:30:00")
+            opens = opens.tz_localize(NY)
+            # 390 minutes in trading day
+            times = opens.repeat(390) + pd.to_timedelta(
+                np.tile(np.arange(390), len(opens)), unit="min"
+            )
+            keys = timestamps
         else:
             raise ValueError(
                 "Data clean at given time interval is not supported for YahooFinance data."
             )
 
-        # create a new dataframe with full timestamp series
-        new_df = pd.DataFrame()
-        for tic in tic_list:
-            tmp_df = pd.DataFrame(
-                columns=["open", "high", "low", "close", "volume"], index=times
-            )
-            tic_df = df[
-                df.tic == tic
-            ]  # extract just the rows from downloaded data relating to this tic
-            for i in range(tic_df.shape[0]):  # fill empty DataFrame using original data
-                tmp_timestamp = tic_df.iloc[i]["timestamp"]
-                if tmp_timestamp.tzinfo is None:
-                    tmp_timestamp = tmp_timestamp.tz_localize(NY)
-                else:
-                    tmp_timestamp = tmp_timestamp.tz_convert(NY)
-                tmp_df.loc[tmp_timestamp] = tic_df.iloc[i][
-                    ["open", "high", "low", "close", "volume"]
-                ]
-            # print("(9) tmp_df\n", tmp_df.to_string()) # print ALL dataframe to check for missing rows from download
-
-            # if close on start date is NaN, fill data with first valid close
-            # and set volume to 0.
-            if str(tmp_df.iloc[0]["close"]) == "nan":
-                print("NaN data on start date, fill using first valid data.")
-                for i in range(tmp_df.shape[0]):
-                    if str(tmp_df.iloc[i]["close"]) != "nan":
-                        first_valid_close = tmp_df.iloc[i]["close"]
-                        tmp_df.iloc[0] = [
-                            first_valid_close,
-                            first_valid_close,
-                            first_valid_close,
-                            first_valid_close,
-                            0.0,
-                        ]
-                        break
-
-            # if the close price of the first row is still NaN (All the prices are NaN in this case)
-            if str(tmp_df.iloc[0]["close"]) == "nan":
+        bars = pd.DataFrame({"tic": df.tic.to_numpy(), "timestamp": keys.array})
+        bars[ohlcv] = df[ohlcv].to_numpy(dtype=float)
+        # the last bar of a timestamp wins; bars off the grid follow the grid of
+        # their ticker, in the order they first appear
+        first = ~bars.duplicated(["tic", "timestamp"])
+        off_grid = bars.loc[first & ~bars.timestamp.isin(times), ["tic", "timestamp"]]
+        bars = bars.drop_duplicates(["tic", "timestamp"], keep="last")
+        grid = pd.MultiIndex.from_product(
+            [tic_list, times], names=["tic", "timestamp"]
+        ).to_frame(index=False)
+        rows = pd.concat([grid, off_grid], ignore_index=True)
+        rows = rows.sort_values("tic", kind="stable", ignore_index=True)
+        new_df = rows.merge(bars, on=["tic", "timestamp"], how="left")
+
+        # if close on start date is NaN, fill data with first valid close
+        # and set volume to 0.
+        starts = new_df.tic.ne(new_df.tic.shift()).to_numpy()
+        first_close = new_df.groupby("tic", sort=False).close.transform("first")
+        leading = starts & new_df.close.isna().to_numpy()
+        for tic, price in zip(new_df.tic[leading], first_close[leading]):
+            print("NaN data on start date, fill using first valid data.")
+            if np.isnan(price):
+                # all the prices are NaN in this case
                 print(
                     "Missing data for ticker: ",
                     tic,
                     " . The prices are all NaN. Fill with 0.",
                 )
-                tmp_df.iloc[0] = [
-                    0.0,
-                    0.0,
-                    0.0,
-                    0.0,
-                    0.0,
-                ]
-
-            # fill NaN data with previous close and set volume to 0.
-            for i in range(tmp_df.shape[0]):
-                if str(tmp_df.iloc[i]["close"]) == "nan":
-                    previous_close = tmp_df.iloc[i - 1]["close"]
-                    if str(previous_close) == "nan":
-                        raise ValueError
-                    tmp_df.iloc[i] = [
-                        previous_close,
-                        previous_close,
-                        previous_close,
-                        previous_close,
-                        0.0,
-                    ]
-                    # print(tmp_df.iloc[i], " Filled NaN data with previous close and set volume to 0. ticker: ", tic)
-
-            # merge single ticker data to new DataFrame
-            tmp_df = tmp_df.astype(float)
-            tmp_df["tic"] = tic
-            new_df = pd.concat([new_df, tmp_df])
-
-        #            print(("Data clean for ") + tic + (" is finished."))
+        fill = first_close[leading].fillna(0.0).to_numpy()
+        new_df.loc[leading, ohlcv] = np.column_stack([fill] * 4 + [np.zeros_like(fill)])
 
-        # reset index and rename columns
-        new_df = new_df.reset_index()
-        new_df = new_df.rename(columns={"index": "timestamp"})
-
-        #        print("Data clean all finished!")
+        # fill NaN data with previous close and set volume to 0.
+        missing = new_df.close.isna().to_numpy()
+        close = new_df.close.ffill()
+        new_df["close"] = close
+        for column in ["open", "high", "low"]:
+            new_df[column] = new_df[column].where(~missing, close)
+        new_df["volume"] = new_df.volume.where(~missing, 0.0)
 
-        return new_df
+        return new_df[["timestamp"] + ohlcv + ["tic"]]
 
     def add_technical_indicator(
-        self, data: pd.DataFrame, tech_indicator_list: list[str]
+        self,
+        data: pd.DataFrame,
+        tech_indicator_list: list[str],
+        engine: str = "stockstats",
     ):
         """
         calculate technical indicators
-        use stockstats package to add technical inidactors
+        use stockstats package to add technical inidactors, or with
+        engine="native" finrl.meta.preprocessor.indicators for all tickers at once
         :param data: (df) pandas dataframe
         :return: (df) pandas dataframe
         """
+        if engine == "native":
+            df = data.sort_values(by=["tic", "timestamp"]).reset_index(drop=True)
+            indicators = indicator_frame(df, tech_indicator_list, time_col="timestamp")
+            df[tech_indicator_list] = indicators.to_numpy()
+            return df.sort_values(by=["timestamp", "tic"])
         df = data.copy()
         df = df.sort_values(by=["tic", "timestamp"])
         stock = Sdf.retype(df.copy())
@@ -434,51 +421,9 @@ class YahooFinanceProcessor:
         self, data: pd.DataFrame, time_period: int = 252
     ) -> pd.DataFrame:
         # can add other market assets
-        df = data.copy()
-        df_price_pivot = df.pivot(index="timestamp", columns="tic", values="close")
-        # use returns to calculate turbulence
-        df_price_pivot = df_price_pivot.pct_change()
-
-        unique_date = df.timestamp.unique()
-        # start after a fixed timestamp period
-        start = time_period
-        turbulence_index = [0] * start
-        # turbulence_index = [0]
-        count = 0
-        for i in range(start, len(unique_date)):
-            current_price = df_price_pivot[df_price_pivot.index == unique_date[i]]
-            # use one year rolling window to calcualte covariance
-            hist_price = df_price_pivot[
-                (df_price_pivot.index < unique_date[i])
-                & (df_price_pivot.index >= unique_date[i - time_period])
-            ]
-            # Drop tickers which has number missing values more than the "oldest" ticker
-            filtered_hist_price = hist_price.iloc[
-                hist_price.isna().sum().min() :
-            ].dropna(axis=1)
-
-            cov_temp = filtered_hist_price.cov()
-            current_temp = current_price[[x for x in filtered_hist_price]] - np.mean(
-                filtered_hist_price, axis=0
-            )
-            temp = current_temp.values.dot(np.linalg.pinv(cov_temp)).dot(
-                current_temp.values.T
-            )
-            if temp > 0:
-                count += 1
-                if count > 2:
-                    turbulence_temp = temp[0][0]
-                else:
-                    # avoid large outlier because of the calculation just begins
-                    turbulence_temp = 0
-            else:
-                turbulence_temp = 0
-            turbulence_index.append(turbulence_temp)
-
-        turbulence_index = pd.DataFrame(
-            {"timestamp": df_price_pivot.index, "turbulence": turbulence_index}
+        return calculate_turbulence(
+            data, time_period=time_period, time_col="timestamp"
         )
-        return turbulence_index
 
     def add_turbulence(
         self, data: pd.DataFrame, time_period: int = 252
@@ -534,36 +479,36 @@ class YahooFinanceProcessor:
         time_interval: str,
         tech_indicator_list: list[str],
         limit: int = 100,
+        incremental: bool = False,
     ) -> pd.DataFrame:
+        """
+        latest prices, indicators and VIXY close of ticker_list
+        with incremental=True the indicators are kept in a LiveBars stream:
+        the first call warms it with the last limit minutes, later calls only
+        download and add the minutes from the stream's latest bar on
+        """
         time_interval = self.convert_interval(time_interval)
 
         end_datetime = datetime.datetime.now()
-        start_datetime = end_datetime - datetime.timedelta(
-            minutes=limit + 1
-        )  # get the last rows up to limit
-
-        data_df = pd.DataFrame()
-        for tic in ticker_list:
-            barset = yf.download(
-                tic, start_datetime, end_datetime, interval=time_interval
-            )  # use start and end datetime to simulate the limit parameter
-            barset["tic"] = tic
-            data_df = pd.concat([data_df, barset])
-
-        data_df = data_df.reset_index().drop(
-            columns=["Adj Close"]
-        )  # Alpaca data does not have 'Adj Close'
-
-        data_df.columns = [  # convert to Alpaca column names lowercase
-            "timestamp",
-            "open",
-            "high",
-            "low",
-            "close",
-            "volume",
-            "tic",
-        ]
+        live = self._live
+        if incremental and live is not None and live.matches(
+            ticker_list, tech_indicator_list
+        ):
+            # from the latest bar on, which may have been forming, and which
+            # reaches further back than the previous call if quotes are delayed
+            data_df = self._download_latest(
+                ticker_list,
+                time_interval,
+                end_datetime,
+                start_datetime=live.last_time.to_pydatetime(),
+            )
+            live.update(data_df)
+            latest_turb = self._latest_vixy(end_datetime)
+            return live.price, live.tech, latest_turb
 
+        data_df = self._download_latest(
+            ticker_list, time_interval, end_datetime, limit
+        )
         start_time = data_df.timestamp.min()
         end_time = data_df.timestamp.max()
         times = []
@@ -630,6 +575,11 @@ class YahooFinanceProcessor:
         new_df = new_df.reset_index()
         new_df = new_df.rename(columns={"index": "timestamp"})
 
+        if incremental:
+            self._live = live = LiveBars(ticker_list, tech_indicator_list)
+            live.update(new_df)
+            return live.price, live.tech, self._latest_vixy(end_datetime)
+
         df = self.add_technical_indicator(new_df, tech_indicator_list)
         df["VIXY"] = 0
 
@@ -638,7 +588,43 @@ class YahooFinanceProcessor:
         )
         latest_price = price_array[-1]
         latest_tech = tech_array[-1]
+        latest_turb = self._latest_vixy(end_datetime)
+        return latest_price, latest_tech, latest_turb
+
+    def _download_latest(
+        self, ticker_list, time_interval, end_datetime, limit=None, start_datetime=None
+    ):
+        # the bars of the last limit minutes, or from start_datetime on, with
+        # Alpaca's column names
+        if start_datetime is None:
+            start_datetime = end_datetime - datetime.timedelta(
+                minutes=limit + 1
+            )  # get the last rows up to limit
+
+        data_df = pd.DataFrame()
+        for tic in ticker_list:
+            barset = yf.download(
+                tic, start_datetime, end_datetime, interval=time_interval
+            )  # use start and end datetime to simulate the limit parameter
+            barset["tic"] = tic
+            data_df = pd.concat([data_df, barset])
+
+        data_df = data_df.reset_index().drop(
+            columns=["Adj Close"]
+        )  # Alpaca data does not have 'Adj Close'
+
+        data_df.columns = [  # convert to Alpaca column names lowercase
+            "timestamp",
+            "open",
+            "high",
+            "low",
+            "close",
+            "volume",
+            "tic",
+        ]
+        return data_df
+
+    def _latest_vixy(self, end_datetime):
         start_datetime = end_datetime - datetime.timedelta(minutes=1)
         turb_df = yf.download("VIXY", start_datetime, limit=1)
-        latest_turb = turb_df["Close"].values
-        return latest_price, latest_tech, latest_turb
+        return turb_df["Close"].values
@@ -2,6 +2,9 @@ from __future__ import annotations
 
 import numpy as np
 
+from finrl.meta.array_store import has_array_store
+from finrl.meta.array_store import load_array_store
+
 
 class BitcoinEnv:  # custom env
     def __init__(
@@ -181,40 +184,34 @@ class BitcoinEnv:  # custom env
     def load_data(
         self, data_cwd, price_ary, tech_ary, time_frequency, start, mid1, mid2, end
     ):
+        """Keep strided views of the arrays for ``self.mode``.
+
+        Files are memory-mapped (from the manifest of
+        ``finrl.meta.array_store.save_array_store`` when ``data_cwd`` has one),
+        so only the rows an episode visits are read from disk.
+        """
         if data_cwd is not None:
             try:
-                price_ary = np.load(f"{data_cwd}/price_ary.npy")
-                tech_ary = np.load(f"{data_cwd}/tech_ary.npy")
+                if has_array_store(data_cwd):
+                    arrays = load_array_store(data_cwd)
+                    price_ary, tech_ary = arrays["price_ary"], arrays["tech_ary"]
+                else:
+                    price_ary = np.load(f"{data_cwd}/price_ary.npy", mmap_mode="r")
+                    tech_ary = np.load(f"{data_cwd}/tech_ary.npy", mmap_mode="r")
             except BaseException:
                 raise ValueError("Data files not found!")
-        else:
-            price_ary = price_ary
-            tech_ary = tech_ary
 
-        n = price_ary.shape[0]
         if self.mode == "train":
-            self.price_ary = price_ary[start:mid1]
-            self.tech_ary = tech_ary[start:mid1]
-            n = self.price_ary.shape[0]
-            x = n // int(time_frequency)
-            ind = [int(time_frequency) * i for i in range(x)]
-            self.price_ary = self.price_ary[ind]
-            self.tech_ary = self.tech_ary[ind]
+            begin, stop = start, mid1
         elif self.mode == "test":
-            self.price_ary = price_ary[mid1:mid2]
-            self.tech_ary = tech_ary[mid1:mid2]
-            n = self.price_ary.shape[0]
-            x = n // int(time_frequency)
-            ind = [int(time_frequency) * i for i in range(x)]
-            self.price_ary = self.price_ary[ind]
-            self.tech_ary = self.tech_ary[ind]
+            begin, stop = mid1, mid2
         elif self.mode == "trade":
-            self.price_ary = price_ary[mid2:end]
-            self.tech_ary = tech_ary[mid2:end]
-            n = self.price_ary.shape[0]
-            x = n // int(time_frequency)
-            ind = [int(time_frequency) * i for i in range(x)]
-            self.price_ary = self.price_ary[ind]
-            self.tech_ary = self.tech_ary[ind]
+            begin, stop = mid2, end
         else:
             raise ValueError("Invalid Mode!")
+        # every time_frequency-th row, dropping an incomplete last stride
+        step = int(time_frequency)
+        price_ary, tech_ary = price_ary[begin:stop], tech_ary[begin:stop]
+        n = price_ary.shape[0] // step * step
+        self.price_ary = price_ary[:n:step]
+        self.tech_ary = tech_ary[:n:step]
@@ -2,6 +2,9 @@ from __future__ import annotations
 
 import numpy as np
 
+from finrl.meta.env_stock_trading.step_kernel import as_kernel_actions
+from finrl.meta.env_stock_trading.step_kernel import get_step_kernel
+
 
 class CryptoEnv:  # custom env
     def __init__(
@@ -12,6 +15,7 @@ class CryptoEnv:  # custom env
         buy_cost_pct=1e-3,
         sell_cost_pct=1e-3,
         gamma=0.99,
+        step_kernel="auto",
     ):
         self.lookback = lookback
         self.initial_total_asset = initial_capital
@@ -20,6 +24,8 @@ class CryptoEnv:  # custom env
         self.sell_cost_pct = sell_cost_pct
         self.max_stock = 1
         self.gamma = gamma
+        self._trade_step, _ = get_step_kernel(step_kernel)
+        self._no_cooldown = np.empty(0, dtype=np.float32)
         self.price_array = config["price_array"]
         self.tech_array = config["tech_array"]
         self._generate_action_normalizer()
@@ -39,13 +45,20 @@ class CryptoEnv:  # custom env
 
         """env information"""
         self.env_name = "MulticryptoEnv"
-        self.state_dim = (
-            1 + (self.price_array.shape[1] + self.tech_array.shape[1]) * lookback
-        )
+        # cash, holdings, and the tech of each of the last lookback steps
+        self.state_dim = 1 + self.crypto_num + self.tech_array.shape[1] * lookback
         self.action_dim = self.price_array.shape[1]
         self.if_discrete = False
         self.target_return = 10
 
+        # lookback windows: _tech_windows[t - lookback + 1][j] is the scaled
+        # tech of time t - j, a strided view with no copy of the tech array
+        scaled_tech = np.asarray(self.tech_array * 2**-15, dtype=np.float32)
+        self._tech_windows = np.lib.stride_tricks.sliding_window_view(
+            scaled_tech, lookback, axis=0
+        )[:, :, ::-1].transpose(0, 2, 1)
+        self._state = np.empty(self.state_dim, dtype=np.float32)
+
     def reset(
         self,
         *,
@@ -66,26 +79,21 @@ class CryptoEnv:  # custom env
         self.time += 1
 
         price = self.price_array[self.time]
-        for i in range(self.action_dim):
-            norm_vector_i = self.action_norm_vector[i]
-            actions[i] = actions[i] * norm_vector_i
-
-        for index in np.where(actions < 0)[0]:  # sell_index:
-            if price[index] > 0:  # Sell only if current asset is > 0
-                sell_num_shares = min(self.stocks[index], -actions[index])
-                self.stocks[index] -= sell_num_shares
-                self.cash += price[index] * sell_num_shares * (1 - self.sell_cost_pct)
-
-        for index in np.where(actions > 0)[0]:  # buy_index:
-            if (
-                price[index] > 0
-            ):  # Buy only if the price is > 0 (no missing data in this particular date)
-                buy_num_shares = min(
-                    self.cash // (price[index] * (1 + self.buy_cost_pct)),
-                    actions[index],
-                )
-                self.stocks[index] += buy_num_shares
-                self.cash -= price[index] * buy_num_shares * (1 + self.buy_cost_pct)
+        actions *= self.action_norm_vector
+
+        # sell, then buy, capping buys by cash // (price * (1 + buy_cost_pct))
+        self.cash = self._trade_step(
+            price,
+            as_kernel_actions(actions),
+            self.stocks,
+            self._no_cooldown,
+            float(self.cash),
+            0,  # min_action
+            self.buy_cost_pct,
+            self.sell_cost_pct,
+            True,
+            False,
+        )
 
         """update time"""
         done = self.time == self.max_step
@@ -101,21 +109,22 @@ class CryptoEnv:  # custom env
         return state, reward, done, None
 
     def get_state(self):
-        state = np.hstack((self.cash * 2**-18, self.stocks * 2**-3))
-        for i in range(self.lookback):
-            tech_i = self.tech_array[self.time - i]
-            normalized_tech_i = tech_i * 2**-15
-            state = np.hstack((state, normalized_tech_i)).astype(np.float32)
-        return state
+        # [cash, stocks, tech(t), tech(t - 1), ..., tech(t - lookback + 1)]
+        state = self._state
+        state[0] = self.cash * 2**-18
+        state[1 : 1 + self.crypto_num] = self.stocks * 2**-3
+        state[1 + self.crypto_num :].reshape(self.lookback, -1)[...] = (
+            self._tech_windows[self.time - self.lookback + 1]
+        )
+        return state.copy()
 
     def close(self):
         pass
 
     def _generate_action_normalizer(self):
-        action_norm_vector = []
-        price_0 = self.price_array[0]
-        for price in price_0:
-            x = len(str(price)) - 7
-            action_norm_vector.append(1 / ((10) ** x))
-
-        self.action_norm_vector = np.asarray(action_norm_vector)
+        # scale actions so one unit trades 10**4 to 10**5 worth of each coin
+        # at its first price: 10 ** (4 - floor(log10(price))) coins
+        price_0 = np.asarray(self.price_array[0], dtype=np.float64)
+        valid = price_0 > 0
+        magnitude = np.floor(np.log10(np.where(valid, price_0, 1)))
+        self.action_norm_vector = np.where(valid, 10.0 ** (4 - magnitude), 1.0)
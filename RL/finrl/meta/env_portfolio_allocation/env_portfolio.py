@@ -2,13 +2,14 @@ from __future__ import annotations
 
 import gymnasium as gym
 import matplotlib
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 from gymnasium import spaces
 from gymnasium.utils import seeding
 from stable_baselines3.common.vec_env import DummyVecEnv
 
+from finrl.meta.artifact_sink import get_default_sink
+
 matplotlib.use("Agg")
 
 
@@ -39,6 +40,12 @@ class StockPortfolioEnv(gym.Env):
             a threshold to control risk aversion
         day: int
             an increment number to control date
+        cov_array: np.ndarray
+            ``[days, stock_dim, stock_dim]`` covariance of every day, e.g. from
+            ``lookback_covariances``; if None, read from the ``cov_list`` column
+        artifact_sink: ArtifactSink
+            where the end-of-episode plots are queued; the shared background
+            sink if None
 
     Methods
     -------
@@ -77,6 +84,8 @@ class StockPortfolioEnv(gym.Env):
         turbulence_threshold=None,
         lookback=252,
         day=0,
+        artifact_sink=None,
+        cov_array=None,
     ):
         # super(StockEnv, self).__init__()
         # money = 10 , scope = 1
@@ -91,6 +100,8 @@ class StockPortfolioEnv(gym.Env):
         self.state_space = state_space
         self.action_space = action_space
         self.tech_indicator_list = tech_indicator_list
+        self.artifact_sink = artifact_sink
+        self.cov_array = cov_array
 
         # action_space normalization and shape is self.stock_dim
         self.action_space = spaces.Box(low=0, high=1, shape=(self.action_space,))
@@ -104,7 +115,7 @@ class StockPortfolioEnv(gym.Env):
 
         # load data from a pandas dataframe
         self.data = self.df.loc[self.day, :]
-        self.covs = self.data["cov_list"].values[0]
+        self.covs = self._get_covs()
         self.state = np.append(
             np.array(self.covs),
             [self.data[tech].values.tolist() for tech in self.tech_indicator_list],
@@ -128,15 +139,10 @@ class StockPortfolioEnv(gym.Env):
         # print(actions)
 
         if self.terminal:
-            df = pd.DataFrame(self.portfolio_return_memory)
-            df.columns = ["daily_return"]
-            plt.plot(df.daily_return.cumsum(), "r")
-            plt.savefig("results/cumulative_reward.png")
-            plt.close()
-
-            plt.plot(self.portfolio_return_memory, "r")
-            plt.savefig("results/rewards.png")
-            plt.close()
+            returns = np.array(self.portfolio_return_memory)
+            sink = self.artifact_sink or get_default_sink()
+            sink.plot("results/cumulative_reward.png", returns.cumsum())
+            sink.plot("results/rewards.png", returns)
 
             print("=================================")
             print(f"begin_total_asset:{self.asset_memory[0]}")
@@ -172,7 +178,7 @@ class StockPortfolioEnv(gym.Env):
             # load next state
             self.day += 1
             self.data = self.df.loc[self.day, :]
-            self.covs = self.data["cov_list"].values[0]
+            self.covs = self._get_covs()
             self.state = np.append(
                 np.array(self.covs),
                 [self.data[tech].values.tolist() for tech in self.tech_indicator_list],
@@ -210,7 +216,7 @@ class StockPortfolioEnv(gym.Env):
         self.day = 0
         self.data = self.df.loc[self.day, :]
         # load states
-        self.covs = self.data["cov_list"].values[0]
+        self.covs = self._get_covs()
         self.state = np.append(
             np.array(self.covs),
             [self.data[tech].values.tolist() for tech in self.tech_indicator_list],
@@ -225,6 +231,11 @@ class StockPortfolioEnv(gym.Env):
         self.date_memory = [self.data.date.unique()[0]]
         return self.state, {}
 
+    def _get_covs(self):
+        if self.cov_array is not None:
+            return self.cov_array[self.day]
+        return self.data["cov_list"].values[0]
+
     def render(self, mode="human"):
         return self.state
 
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import numpy as np
+
+
+def trf_mu_batch(weights, last_weights, comission_fee_pct, tol=1e-10):
+    """Transaction remainder factor of B portfolios at once.
+
+    Runs the fixed-point iteration of ``PortfolioOptimizationEnv.step`` for
+    every row together. Each row keeps iterating until its own ``mu`` moves by
+    at most ``tol``; converged rows are masked out, so each one goes through
+    the same sequence of values as the scalar loop.
+
+    Args:
+        weights: New portfolio weights, shape (B, 1 + portfolio_size). Column 0
+            is cash.
+        last_weights: Portfolio weights at the end of the last step, same shape.
+        comission_fee_pct: Commission fee percentage, between 0 and 1.
+        tol: Convergence tolerance.
+
+    Returns:
+        Array of shape (B,) with the transaction remainder factor of each row.
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    last_weights = np.asarray(last_weights, dtype=np.float64)
+    c = comission_fee_pct
+    last_mu = np.ones(len(weights))
+    mu = np.full(len(weights), 1 - 2 * c + c**2)
+    active = np.abs(mu - last_mu) > tol
+    while active.any():
+        rows = np.flatnonzero(active)
+        w, lw, m = weights[rows], last_weights[rows], mu[rows]
+        new_mu = (
+            1
+            - c * w[:, 0]
+            - (2 * c - c**2)
+            * np.sum(np.maximum(lw[:, 1:] - m[:, np.newaxis] * w[:, 1:], 0), axis=1)
+        ) / (1 - c * w[:, 0])
+        last_mu[rows] = m
+        mu[rows] = new_mu
+        active[rows] = np.abs(new_mu - m) > tol
+    return mu
+
+
+def wvm_batch(weights, last_weights, portfolio_value):
+    """Weights vector modifier commission model for B portfolios at once.
+
+    Fees are the traded stock value. Rows whose cash weight cannot pay them
+    keep their last weights; the others pay the fees from cash.
+
+    Args:
+        weights: New portfolio weights, shape (B, 1 + portfolio_size).
+        last_weights: Portfolio weights at the end of the last step, same shape.
+        portfolio_value: Portfolio values, shape (B,).
+
+    Returns:
+        Tuple (weights, portfolio_value) after fees.
+    """
+    delta_assets = (weights - last_weights)[:, 1:]
+    fees = np.sum(np.abs(delta_assets * portfolio_value[:, np.newaxis]), axis=1)
+    unaffordable = fees > weights[:, 0] * portfolio_value
+    portfolio = weights * portfolio_value[:, np.newaxis]
+    portfolio[:, 0] -= fees
+    new_value = np.sum(portfolio, axis=1)
+    new_weights = portfolio / new_value[:, np.newaxis]
+    new_weights[unaffordable] = last_weights[unaffordable]
+    new_value[unaffordable] = portfolio_value[unaffordable]
+    return new_weights, new_value
@@ -11,8 +11,10 @@ import pandas as pd
 from gym import spaces
 from gym.utils import seeding
 
+from finrl.meta.artifact_sink import get_default_sink
+from finrl.meta.env_stock_trading.market_cube import MarketCube
+
 matplotlib.use("Agg")
-import matplotlib.pyplot as plt
 from stable_baselines3.common.vec_env import DummyVecEnv
 from pathlib import Path
 
@@ -89,6 +91,8 @@ class PortfolioOptimizationEnv(gym.Env):
         time_window=1,
         cwd="./",
         new_gym_api=False,
+        artifact_sink=None,
+        data_in_info=False,
     ):
         """Initializes environment's instance.
 
@@ -122,6 +126,13 @@ class PortfolioOptimizationEnv(gym.Env):
             cwd: Local repository in which resulting graphs will be saved.
             new_gym_api: If True, the environment will use the new gym api standard for
                 step and reset methods.
+            artifact_sink: ArtifactSink that writes the end-of-episode graphs and
+                QuantStats snapshot in the background (the snapshot itself is
+                rendered on the calling thread). If None, the shared sink
+                returned by get_default_sink() is used.
+            data_in_info: If True, the info dict of every step also contains, under
+                "data", the dataframe rows of the current time window. Building it
+                costs a dataframe filter per step, so it is off by default.
         """
         self._time_window = time_window
         self._time_index = time_window - 1
@@ -138,6 +149,8 @@ class PortfolioOptimizationEnv(gym.Env):
         self._valuation_feature = valuation_feature
         self._cwd = Path(cwd)
         self._new_gym_api = new_gym_api
+        self._artifact_sink = artifact_sink
+        self._data_in_info = data_in_info
 
         # results file
         self._results_file = self._cwd / "results" / "rl"
@@ -162,6 +175,11 @@ class PortfolioOptimizationEnv(gym.Env):
         self._sorted_times = sorted(set(self._df[time_column]))
         self.episode_length = len(self._sorted_times) - time_window + 1
 
+        # dense market data, built once: observations are sliding-window views
+        # of a [features, tics, times] array and price variations are rows of a
+        # [times, 1 + portfolio_size] matrix (first column is cash)
+        self._build_arrays()
+
         # define action space
         self.action_space = spaces.Box(low=0, high=1, shape=(action_space,))
 
@@ -235,26 +253,29 @@ class PortfolioOptimizationEnv(gym.Env):
             )
             metrics_df.set_index("date", inplace=True)
 
-            plt.plot(metrics_df["portfolio_values"], "r")
-            plt.title("Portfolio Value Over Time")
-            plt.xlabel("Time")
-            plt.ylabel("Portfolio value")
-            plt.savefig(self._results_file / "portfolio_value.png")
-            plt.close()
-
-            plt.plot(self._portfolio_reward_memory, "r")
-            plt.title("Reward Over Time")
-            plt.xlabel("Time")
-            plt.ylabel("Reward")
-            plt.savefig(self._results_file / "reward.png")
-            plt.close()
-
-            plt.plot(self._actions_memory)
-            plt.title("Actions performed")
-            plt.xlabel("Time")
-            plt.ylabel("Weight")
-            plt.savefig(self._results_file / "actions.png")
-            plt.close()
+            sink = self._artifact_sink or get_default_sink()
+            sink.plot(
+                self._results_file / "portfolio_value.png",
+                metrics_df["portfolio_values"],
+                title="Portfolio Value Over Time",
+                xlabel="Time",
+                ylabel="Portfolio value",
+            )
+            sink.plot(
+                self._results_file / "reward.png",
+                np.array(self._portfolio_reward_memory),
+                title="Reward Over Time",
+                xlabel="Time",
+                ylabel="Reward",
+            )
+            sink.plot(
+                self._results_file / "actions.png",
+                np.array(self._actions_memory),
+                fmt=None,
+                title="Actions performed",
+                xlabel="Time",
+                ylabel="Weight",
+            )
 
             print("=================================")
             print("Initial portfolio value:{}".format(self._asset_memory["final"][0]))
@@ -272,11 +293,10 @@ class PortfolioOptimizationEnv(gym.Env):
             print("Sharpe ratio: {}".format(qs.stats.sharpe(metrics_df["returns"])))
             print("=================================")
 
-            qs.plots.snapshot(
-                metrics_df["returns"],
-                show=False,
-                savefig=self._results_file / "portfolio_summary.png",
-            )
+            # quantstats draws through pyplot, which is not thread safe: the
+            # figure is rendered here and only written out by the sink
+            summary = qs.plots.snapshot(metrics_df["returns"], show=False)
+            sink.submit(summary.savefig, self._results_file / "portfolio_summary.png")
 
             if self._new_gym_api:
                 return self._state, self._reward, self._terminal, False, self._info
@@ -427,45 +447,75 @@ class PortfolioOptimizationEnv(gym.Env):
                 "start_time_index": Index of start time of current time window,
                 "end_time": End time of current time window,
                 "end_time_index": Index of end time of current time window,
-                "data": Data related to the current time window,
-                "price_variation": Price variation of current time step
+                "price_variation": Price variation of current time step,
+                "data": Data related to the current time window (only if the
+                    environment was created with "data_in_info" set to True)
                 }
         """
         # returns state in form (channels, tics, timesteps)
         end_time = self._sorted_times[time_index]
         start_time = self._sorted_times[time_index - (self._time_window - 1)]
 
-        # define data to be used in this time step
-        self._data = self._df[
-            (self._df[self._time_column] >= start_time)
-            & (self._df[self._time_column] <= end_time)
-        ][[self._time_column, self._tic_column] + self._features]
-
         # define price variation of this time_step
-        self._price_variation = self._df_price_variation[
-            self._df_price_variation[self._time_column] == end_time
-        ][self._valuation_feature].to_numpy()
-        self._price_variation = np.insert(self._price_variation, 0, 1)
-
-        # define state to be returned
-        state = None
-        for tic in self._tic_list:
-            tic_data = self._data[self._data[self._tic_column] == tic]
-            tic_data = tic_data[self._features].to_numpy().T
-            tic_data = tic_data[..., np.newaxis]
-            state = tic_data if state is None else np.append(state, tic_data, axis=2)
-        state = state.transpose((0, 2, 1))
+        self._price_variation = self._price_variations[time_index]
+
+        # define state to be returned (a view, no copy)
+        state = self._windows[:, :, time_index - (self._time_window - 1)]
         info = {
             "tics": self._tic_list,
             "start_time": start_time,
             "start_time_index": time_index - (self._time_window - 1),
             "end_time": end_time,
             "end_time_index": time_index,
-            "data": self._data,
             "price_variation": self._price_variation,
         }
+        if self._data_in_info:
+            info["data"] = self._window_data(start_time, end_time)
         return self._standardize_state(state), info
 
+    def _build_arrays(self):
+        """Materializes the features and price variations as arrays, so that a
+        simulation step only needs to slice them.
+
+        Creates "_windows", a read-only sliding-window view of shape
+        (features, tics, episode_length, time_window) over a contiguous float32
+        (features, tics, times) array, and "_price_variations", a
+        (times, 1 + portfolio_size) float32 matrix.
+        """
+        features = MarketCube.pivot(
+            self._df,
+            self._features,
+            self._time_column,
+            self._tic_column,
+            dates=self._sorted_times,
+            tics=self._tic_list,
+            dtype=np.float32,
+        )
+        self._feature_array = np.ascontiguousarray(features.data.transpose(2, 1, 0))
+        self._windows = np.lib.stride_tricks.sliding_window_view(
+            self._feature_array, self._time_window, axis=2
+        )
+
+        portfolio_tics = self._df_price_variation[self._tic_column].unique()
+        variation = MarketCube.pivot(
+            self._df_price_variation,
+            [self._valuation_feature],
+            self._time_column,
+            self._tic_column,
+            dates=self._sorted_times,
+            tics=portfolio_tics,
+            dtype=np.float32,
+        )
+        self._price_variations = np.insert(variation.data[:, :, 0], 0, 1, axis=1)
+        self._price_variations.flags.writeable = False
+
+    def _window_data(self, start_time, end_time):
+        """Dataframe rows of the time window between start_time and end_time."""
+        return self._df[
+            (self._df[self._time_column] >= start_time)
+            & (self._df[self._time_column] <= end_time)
+        ][[self._time_column, self._tic_column] + self._features]
+
     def render(self, mode="human"):
         """Renders the environment.
 
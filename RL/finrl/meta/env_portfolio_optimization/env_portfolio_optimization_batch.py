@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import numpy as np
+
+from finrl.meta.env_portfolio_optimization.commission import trf_mu_batch
+from finrl.meta.env_portfolio_optimization.commission import wvm_batch
+from finrl.meta.env_portfolio_optimization.env_portfolio_optimization import (
+    PortfolioOptimizationEnv,
+)
+
+
+class PortfolioOptimizationBatchEnv:
+    """B portfolios of a PortfolioOptimizationEnv stepped together.
+
+    All portfolios share one clock and one market: the observation window and
+    the price variation matrix of a single PortfolioOptimizationEnv built from
+    the same arguments. Only the portfolio values and weights are kept per
+    portfolio, as (B,) and (B, 1 + portfolio_size) arrays, and commission fees
+    are applied to all of them at once (see ``commission.py``). Each portfolio
+    follows the same rules as PortfolioOptimizationEnv, in the same float32
+    precision for weights and values.
+
+    The interface follows the old gym API of PortfolioOptimizationEnv, batched:
+    ``reset()`` returns observations of shape (B, f, n, t) (or a Dict of batched
+    "state" and "last_action" with return_last_action), and ``step(actions)``
+    takes actions of shape (B, 1 + portfolio_size) and returns
+    ``(state, rewards, terminal, info)`` with rewards of shape (B,) and a single
+    terminal flag. ``info["price_variation"]`` has shape (B, 1 + portfolio_size)
+    and ``info["trf_mu"]`` shape (B,). Since every portfolio sees the same
+    market, the observations are read-only broadcast views.
+
+    Attributes:
+        num_envs: Number of portfolios (B).
+        env: PortfolioOptimizationEnv that holds the market data.
+        episode_length: Number of timesteps of an episode.
+        portfolio_size: Number of stocks in the portfolio.
+        portfolio_values: (episode_length, B) array with the final portfolio
+            value of every step of the current episode.
+    """
+
+    def __init__(self, df, num_envs, **env_kwargs):
+        """Initializes the batched environment.
+
+        Args:
+            df: Dataframe with market information over a period of time.
+            num_envs: Number of portfolios to simulate at once.
+            env_kwargs: Arguments of PortfolioOptimizationEnv.
+        """
+        self.env = PortfolioOptimizationEnv(df, **env_kwargs)
+        self.num_envs = num_envs
+        self.episode_length = self.env.episode_length
+        self.portfolio_size = self.env.portfolio_size
+        self.action_space = self.env.action_space
+        self.observation_space = self.env.observation_space
+        self.portfolio_values = np.zeros((self.episode_length, num_envs), np.float32)
+
+    def reset(self):
+        """Resets every portfolio to the initial state (all money in cash).
+
+        Returns:
+            Batched initial state.
+        """
+        env = self.env
+        self._time_index = env._time_window - 1
+        self._step = 0
+        self._portfolio_value = np.full(self.num_envs, env._initial_amount, np.float32)
+        self._weights = np.zeros((self.num_envs, self.portfolio_size + 1), np.float32)
+        self._weights[:, 0] = 1
+        self._final_weights = self._weights.copy()
+        self._reward = np.zeros(self.num_envs)
+        self._terminal = False
+        self.portfolio_values[0] = self._portfolio_value
+        self._state, self._info = self._get_state_and_info()
+        return self._state
+
+    def step(self, actions):
+        """Performs a simulation step for every portfolio.
+
+        Args:
+            actions: Array of shape (B, 1 + portfolio_size) with the new
+                portfolio weights of each portfolio.
+
+        Returns:
+            A tuple (state, rewards, terminal, info).
+        """
+        env = self.env
+        self._terminal = self._time_index >= len(env._sorted_times) - 1
+        if self._terminal:
+            return self._state, self._reward, self._terminal, self._info
+
+        weights = self._normalize(np.asarray(actions, dtype=np.float32))
+        self._weights = weights
+        last_weights = self._final_weights
+
+        # load next state
+        self._time_index += 1
+        self._state, self._info = self._get_state_and_info()
+
+        if env._comission_fee_model == "wvm":
+            weights, self._portfolio_value = wvm_batch(
+                weights, last_weights, self._portfolio_value
+            )
+        elif env._comission_fee_model == "trf":
+            mu = trf_mu_batch(weights, last_weights, env._comission_fee_pct)
+            self._info["trf_mu"] = mu
+            self._portfolio_value = (mu * self._portfolio_value).astype(np.float32)
+
+        # time passes and time variation changes the portfolio distribution
+        portfolio = self._portfolio_value[:, np.newaxis] * (
+            weights * env._price_variations[self._time_index]
+        )
+        last_value = self.portfolio_values[self._step]
+        self._portfolio_value = np.sum(portfolio, axis=1)
+        self._final_weights = portfolio / self._portfolio_value[:, np.newaxis]
+        self._step += 1
+        self.portfolio_values[self._step] = self._portfolio_value
+
+        self._reward = np.log(self._portfolio_value / last_value) * env._reward_scaling
+        return self._state, self._reward, self._terminal, self._info
+
+    def _normalize(self, actions):
+        # rows that are already portfolio vectors are kept, the others go
+        # through a softmax, as in PortfolioOptimizationEnv.step
+        valid = (np.abs(actions.sum(axis=1) - 1) <= 1e-6) & (actions.min(axis=1) >= 0)
+        if valid.all():
+            return actions
+        exp = np.exp(actions)
+        softmax = exp / np.sum(exp, axis=1, keepdims=True)
+        return np.where(valid[:, np.newaxis], actions, softmax)
+
+    def _get_state_and_info(self):
+        env = self.env
+        time_index = self._time_index
+        start_index = time_index - (env._time_window - 1)
+        window = env._windows[:, :, start_index]
+        state = np.broadcast_to(window, (self.num_envs,) + window.shape)
+        price_variation = np.broadcast_to(
+            env._price_variations[time_index], self._weights.shape
+        )
+        info = {
+            "tics": env._tic_list,
+            "start_time": env._sorted_times[start_index],
+            "start_time_index": start_index,
+            "end_time": env._sorted_times[time_index],
+            "end_time_index": time_index,
+            "price_variation": price_variation,
+        }
+        if env._return_last_action:
+            state = {"state": state, "last_action": self._weights}
+        return state, info
@@ -1,11 +1,16 @@
 from __future__ import annotations
 
-import os
-
 import gym
 import numpy as np
 from numpy import random as rd
 
+from finrl.meta.array_store import apply_elementwise
+from finrl.meta.array_store import has_array_store
+from finrl.meta.array_store import load_array_store
+from finrl.meta.array_store import RepeatedSeries
+from finrl.meta.env_stock_trading.step_kernel import as_kernel_actions
+from finrl.meta.env_stock_trading.step_kernel import get_step_kernel
+
 gym.logger.set_level(
     40
 )  # Block warning: 'WARN: Box bound precision lowered by casting to float32'
@@ -32,15 +37,18 @@ class StockEnvNAS100:
         initial_stocks=None,
         if_eval=False,
         if_trade=False,
+        step_kernel="auto",
     ):
         self.min_stock_rate = min_stock_rate
         beg_i, mid_i, end_i = 0, int(211210), int(422420)
 
         (i0, i1) = (beg_i, mid_i) if if_eval else (mid_i, end_i)
+        # memory-mapped arrays and a lazily repeated turbulence series: slicing
+        # below only makes views, rows are read from disk as the episode visits them
         data_arrays = (
-            self.load_data(cwd) if cwd is not None else price_ary,
-            tech_ary,
-            turbulence_ary,
+            self.load_data(cwd)
+            if cwd is not None
+            else (price_ary, tech_ary, turbulence_ary)
         )
         if not if_trade:
             data_arrays = [ary[i0:i1:data_gap] for ary in data_arrays]
@@ -50,11 +58,16 @@ class StockEnvNAS100:
             ]
         self.price_ary, self.tech_ary, turbulence_ary = data_arrays
 
-        self.tech_ary = self.tech_ary * 2**-7
-        self.turbulence_bool = (turbulence_ary > turbulence_thresh).astype(np.float32)
-        self.turbulence_ary = (
-            self.sigmoid_sign(turbulence_ary, turbulence_thresh) * 2**-5
-        ).astype(np.float32)
+        self.tech_scale = np.float32(2**-7)
+        self.turbulence_bool = apply_elementwise(
+            turbulence_ary, lambda ary: (ary > turbulence_thresh).astype(np.float32)
+        )
+        self.turbulence_ary = apply_elementwise(
+            turbulence_ary,
+            lambda ary: (self.sigmoid_sign(ary, turbulence_thresh) * 2**-5).astype(
+                np.float32
+            ),
+        )
 
         stock_dim = self.price_ary.shape[1]
         self.gamma = gamma
@@ -63,6 +76,7 @@ class StockEnvNAS100:
         self.sell_cost_pct = sell_cost_pct
         self.reward_scaling = reward_scaling
         self.initial_capital = initial_capital
+        self._trade_step, _ = get_step_kernel(step_kernel)
         self.initial_stocks = (
             np.zeros(stock_dim, dtype=np.float32)
             if initial_stocks is None
@@ -97,7 +111,7 @@ class StockEnvNAS100:
         options=None,
     ):
         self.day = 0
-        price = self.price_ary[self.day]
+        price = self.get_price(self.day)
 
         self.stocks = (
             self.initial_stocks + rd.randint(0, 64, size=self.initial_stocks.shape)
@@ -116,34 +130,22 @@ class StockEnvNAS100:
         actions = (actions * self.max_stock).astype(int)
 
         self.day += 1
-        price = self.price_ary[self.day]
+        price = self.get_price(self.day)
         self.stocks_cd += 1
 
-        if self.turbulence_bool[self.day] == 0:
-            min_action = int(self.max_stock * self.min_stock_rate)  # stock_cd
-            for index in np.where(actions < -min_action)[0]:  # sell_index:
-                if price[index] > 0:  # Sell only if current asset is > 0
-                    sell_num_shares = min(self.stocks[index], -actions[index])
-                    self.stocks[index] -= sell_num_shares
-                    self.amount += (
-                        price[index] * sell_num_shares * (1 - self.sell_cost_pct)
-                    )
-                    self.stocks_cd[index] = 0
-            for index in np.where(actions > min_action)[0]:  # buy_index:
-                if (
-                    price[index] > 0
-                ):  # Buy only if the price is > 0 (no missing data in this particular date)
-                    buy_num_shares = min(self.amount // price[index], actions[index])
-                    self.stocks[index] += buy_num_shares
-                    self.amount -= (
-                        price[index] * buy_num_shares * (1 + self.buy_cost_pct)
-                    )
-                    self.stocks_cd[index] = 0
-
-        else:  # sell all when turbulence
-            self.amount += (self.stocks * price).sum() * (1 - self.sell_cost_pct)
-            self.stocks[:] = 0
-            self.stocks_cd[:] = 0
+        # sell, then buy; sell all when turbulence
+        self.amount = self._trade_step(
+            price,
+            as_kernel_actions(actions),
+            self.stocks,
+            self.stocks_cd,
+            float(self.amount),
+            int(self.max_stock * self.min_stock_rate),  # min_action
+            self.buy_cost_pct,
+            self.sell_cost_pct,
+            False,
+            self.turbulence_bool[self.day] != 0,
+        )
 
         state = self.get_state(price)
         total_asset = self.amount + (self.stocks * price).sum()
@@ -169,11 +171,27 @@ class StockEnvNAS100:
                 price * scale,
                 self.stocks * scale,
                 self.stocks_cd,
-                self.tech_ary[self.day],
+                np.asarray(self.tech_ary[self.day], dtype=np.float32)
+                * self.tech_scale,
             )
         )  # state.astype(np.float32)
 
+    def get_price(self, day):
+        return np.array(self.price_ary[day], dtype=np.float32)
+
     def load_data(self, cwd):
+        """Open the minute arrays of ``cwd`` without reading them into RAM.
+
+        A directory written by ``finrl.meta.array_store.save_array_store`` (with
+        arrays ``price_ary``, ``tech_ary`` and a daily ``turb_ary`` with
+        ``repeat=390``) is opened from its manifest; otherwise the ``.npy`` files
+        are memory-mapped as they are. The daily turbulence is broadcast to minute
+        resolution on access instead of being repeated.
+        """
+        if has_array_store(cwd):
+            arrays = load_array_store(cwd)
+            return arrays["price_ary"], arrays["tech_ary"], arrays["turb_ary"]
+
         data_path_price_array = f"{cwd}/price_ary.npy"
         data_path_tech_array = f"{cwd}/tech_ary.npy"
         data_path_turb_array = f"{cwd}/turb_ary.npy"
@@ -181,14 +199,13 @@ class StockEnvNAS100:
         turbulence_ary = np.load(
             data_path_turb_array
         )  # turbulence_ary.shape = (1358, ). std, min, max = 3, 0, 65.2
-        turbulence_ary = turbulence_ary.repeat(390)  # 13580*390 = 529620
-        turbulence_ary = turbulence_ary[-528026:]  # 15926 + 528026 = 528026
-
-        if os.path.exists(data_path_price_array):
-            price_ary = np.load(data_path_price_array).astype(np.float32)
-            tech_ary = np.load(data_path_tech_array).astype(np.float32)
-            # turbulence_ary = load_dict['turbulence_ary'].astype(np.float32)
+        # the last 528026 minutes of turbulence_ary.repeat(390): 1358*390 = 529620
+        turbulence_ary = RepeatedSeries(
+            turbulence_ary, 390, start=len(turbulence_ary) * 390 - 528026, length=528026
+        )
 
+        price_ary = np.load(data_path_price_array, mmap_mode="r")
+        tech_ary = np.load(data_path_tech_array, mmap_mode="r")
         return price_ary, tech_ary, turbulence_ary
 
     def draw_cumulative_return(self, args, _torch) -> list:
@@ -215,9 +232,7 @@ class StockEnvNAS100:
                 )  # not need detach(), because with torch.no_grad() outside
                 state, reward, done, _ = self.step(action)
 
-                total_asset = (
-                    self.amount + (self.price_ary[self.day] * self.stocks).sum()
-                )
+                total_asset = self.amount + (self.get_price(self.day) * self.stocks).sum()
                 episode_return = total_asset / self.initial_total_asset
                 episode_returns.append(episode_return)
                 if done:
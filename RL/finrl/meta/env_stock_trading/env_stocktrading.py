@@ -1,23 +1,61 @@
 from __future__ import annotations
 
 from typing import List
+from typing import NamedTuple
 
 import gymnasium as gym
 import matplotlib
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 from gymnasium import spaces
 from gymnasium.utils import seeding
 from stable_baselines3.common.vec_env import DummyVecEnv
 
+from finrl.meta.artifact_sink import get_default_sink
+from finrl.meta.env_stock_trading.execution import execute_trades
+from finrl.meta.env_stock_trading.market_cube import MarketCube
+from finrl.meta.env_stock_trading.recorder import EpisodeRecorder
+
 matplotlib.use("Agg")
 
 # from stable_baselines3.common.logger import Logger, KVWriter, CSVOutputFormat
 
 
+class EnvSnapshot(NamedTuple):
+    """Portfolio and clock of a :class:`StockTradingEnv`, see ``snapshot()``."""
+
+    cash: float
+    holdings: np.ndarray
+    day: int
+    turbulence: float
+    cost: float
+    trades: int
+    rng_state: dict
+
+
 class StockTradingEnv(gym.Env):
-    """A stock trading environment for OpenAI gym"""
+    """A stock trading environment for OpenAI gym
+
+    Close prices, technical indicators and the risk indicator are read once
+    into a dense ``[days, tickers, features]`` :class:`MarketCube` at
+    construction; steps slice the cube instead of querying ``df``. The cube is
+    float64 by default so observations match the DataFrame exactly; pass
+    ``cube_dtype=np.float32`` to halve its memory.
+
+    Episode history goes to an :class:`EpisodeRecorder`. ``record_level``
+    ``"full"`` (the default) keeps everything ``save_*_memory`` reports;
+    training envs can pass ``"summary"`` (account values only) or ``"none"``
+    to skip recording. CSV and PNG artifacts are only written when
+    ``model_name`` and ``mode`` are set, or ``make_plots`` for the plot, and
+    go through ``artifact_sink`` (the shared background
+    :class:`~finrl.meta.artifact_sink.ArtifactSink` by default), so ``step``
+    does not wait for the files.
+
+    ``set_window`` restricts episodes to a range of days of the cube, and
+    ``snapshot`` / ``restore`` save and load the portfolio (cash, holdings,
+    day, RNG) as an :class:`EnvSnapshot`, so a walk-forward loop can move one
+    env from window to window instead of building a new one each time.
+    """
 
     metadata = {"render.modes": ["human"]}
 
@@ -44,6 +82,9 @@ class StockTradingEnv(gym.Env):
         model_name="",
         mode="",
         iteration="",
+        cube_dtype=np.float64,
+        record_level="full",
+        artifact_sink=None,
     ):
         self.day = day
         self.df = df
@@ -61,7 +102,6 @@ class StockTradingEnv(gym.Env):
         self.observation_space = spaces.Box(
             low=-np.inf, high=np.inf, shape=(self.state_space,)
         )
-        self.data = self.df.loc[self.day, :]
         self.terminal = False
         self.make_plots = make_plots
         self.print_verbosity = print_verbosity
@@ -72,6 +112,15 @@ class StockTradingEnv(gym.Env):
         self.model_name = model_name
         self.mode = mode
         self.iteration = iteration
+        self.artifact_sink = artifact_sink
+        # dense market data, built once
+        cube_columns = ["close"] + list(self.tech_indicator_list)
+        if self.risk_indicator_col in self.df.columns:
+            cube_columns.append(self.risk_indicator_col)
+        self.cube = MarketCube.from_df(self.df, cube_columns, dtype=cube_dtype)
+        self._tech_slice = slice(1, 1 + len(self.tech_indicator_list))
+        self.start_day = 0
+        self.end_day = self.cube.n_days - 1
         # initalize state
         self.state = self._initiate_state()
 
@@ -82,19 +131,17 @@ class StockTradingEnv(gym.Env):
         self.trades = 0
         self.episode = 0
         # memorize all the total balance change
-        self.asset_memory = [
+        self.recorder = EpisodeRecorder(
+            record_level, self.cube.n_days, self.stock_dim, len(self.state)
+        )
+        self.recorder.reset(
             self.initial_amount
             + np.sum(
                 np.array(self.num_stock_shares)
                 * np.array(self.state[1 : 1 + self.stock_dim])
-            )
-        ]  # the initial total asset is calculated by cash + sum (num_share_stock_i * price_stock_i)
-        self.rewards_memory = []
-        self.actions_memory = []
-        self.state_memory = (
-            []
-        )  # we need sometimes to preserve the state in the middle of trading process
-        self.date_memory = [self._get_date()]
+            ),
+            self._get_date(),
+        )  # the initial total asset is calculated by cash + sum (num_share_stock_i * price_stock_i)
         #         self.logger = Logger('results',[CSVOutputFormat])
         # self.reset()
         self._seed()
@@ -212,13 +259,83 @@ class StockTradingEnv(gym.Env):
 
         return buy_num_shares
 
+    def _execute_trades(self, actions):
+        # vectorized equivalent of calling _sell_stock for every sell order
+        # and then _buy_stock for every buy order; updates actions in place
+        n = self.stock_dim
+        liquidate = (
+            self.turbulence_threshold is not None
+            and self.turbulence >= self.turbulence_threshold
+        )
+        self.state[0], self.cost, trades = execute_trades(
+            actions,
+            price=self.state[1 : n + 1],
+            holdings=self.state[n + 1 : 2 * n + 1],
+            cash=self.state[0],
+            cost=self.cost,
+            disabled=self.state[2 * n + 1 : 3 * n + 1] == True,  # noqa: E712
+            buy_cost_pct=self.buy_cost_pct,
+            sell_cost_pct=self.sell_cost_pct,
+            liquidate=liquidate,
+        )
+        self.trades += trades
+
+    @property
+    def asset_memory(self):
+        return self.recorder.assets
+
+    @property
+    def rewards_memory(self):
+        return self.recorder.rewards
+
+    @property
+    def actions_memory(self):
+        return self.recorder.actions
+
+    @property
+    def state_memory(self):
+        return self.recorder.states
+
+    @property
+    def date_memory(self):
+        return self.recorder.dates
+
+    def save_artifacts(self, path="results"):
+        """Queue the episode's actions, account value and rewards CSVs and the
+        account value plot for writing to ``path``. Needs
+        ``record_level="full"``."""
+        suffix = f"{self.mode}_{self.model_name}_{self.iteration}"
+        df_total_value = self.save_asset_memory()
+        df_total_value["daily_return"] = df_total_value["account_value"].pct_change(1)
+        df_rewards = pd.DataFrame(
+            {"account_rewards": self.rewards_memory, "date": self.date_memory[:-1]}
+        )
+        sink = self.sink
+        sink.csv(self.save_action_memory(), f"{path}/actions_{suffix}.csv")
+        sink.csv(
+            df_total_value[["account_value", "date", "daily_return"]],
+            f"{path}/account_value_{suffix}.csv",
+            index=False,
+        )
+        sink.csv(df_rewards, f"{path}/account_rewards_{suffix}.csv", index=False)
+        sink.plot(f"{path}/account_value_{suffix}.png", np.array(self.asset_memory))
+
+    @property
+    def sink(self):
+        """The ArtifactSink this env writes through (``artifact_sink``, or the
+        shared default sink)."""
+        if self.artifact_sink is None:
+            return get_default_sink()
+        return self.artifact_sink
+
     def _make_plot(self):
-        plt.plot(self.asset_memory, "r")
-        plt.savefig(f"results/account_value_trade_{self.episode}.png")
-        plt.close()
+        self.sink.plot(
+            f"results/account_value_trade_{self.episode}.png",
+            np.array(self.asset_memory),
+        )
 
     def step(self, actions):
-        self.terminal = self.day >= len(self.df.index.unique()) - 1
+        self.terminal = self.day >= self.end_day
         if self.terminal:
             # print(f"Episode: {self.episode}")
             if self.make_plots:
@@ -227,68 +344,23 @@ class StockTradingEnv(gym.Env):
                 np.array(self.state[1 : (self.stock_dim + 1)])
                 * np.array(self.state[(self.stock_dim + 1) : (self.stock_dim * 2 + 1)])
             )
-            df_total_value = pd.DataFrame(self.asset_memory)
             tot_reward = (
-                self.state[0]
-                + sum(
-                    np.array(self.state[1 : (self.stock_dim + 1)])
-                    * np.array(
-                        self.state[(self.stock_dim + 1) : (self.stock_dim * 2 + 1)]
-                    )
-                )
-                - self.asset_memory[0]
+                end_total_asset - self.recorder.initial_asset
             )  # initial_amount is only cash part of our initial asset
-            df_total_value.columns = ["account_value"]
-            df_total_value["date"] = self.date_memory
-            df_total_value["daily_return"] = df_total_value["account_value"].pct_change(
-                1
-            )
-            if df_total_value["daily_return"].std() != 0:
-                sharpe = (
-                    (252**0.5)
-                    * df_total_value["daily_return"].mean()
-                    / df_total_value["daily_return"].std()
-                )
-            df_rewards = pd.DataFrame(self.rewards_memory)
-            df_rewards.columns = ["account_rewards"]
-            df_rewards["date"] = self.date_memory[:-1]
             if self.episode % self.print_verbosity == 0:
+                sharpe = self.recorder.sharpe()
                 print(f"day: {self.day}, episode: {self.episode}")
-                print(f"begin_total_asset: {self.asset_memory[0]:0.2f}")
+                print(f"begin_total_asset: {self.recorder.initial_asset:0.2f}")
                 print(f"end_total_asset: {end_total_asset:0.2f}")
                 print(f"total_reward: {tot_reward:0.2f}")
                 print(f"total_cost: {self.cost:0.2f}")
                 print(f"total_trades: {self.trades}")
-                if df_total_value["daily_return"].std() != 0:
+                if sharpe is not None:
                     print(f"Sharpe: {sharpe:0.3f}")
                 print("=================================")
 
             if (self.model_name != "") and (self.mode != ""):
-                df_actions = self.save_action_memory()
-                df_actions.to_csv(
-                    "results/actions_{}_{}_{}.csv".format(
-                        self.mode, self.model_name, self.iteration
-                    )
-                )
-                df_total_value.to_csv(
-                    "results/account_value_{}_{}_{}.csv".format(
-                        self.mode, self.model_name, self.iteration
-                    ),
-                    index=False,
-                )
-                df_rewards.to_csv(
-                    "results/account_rewards_{}_{}_{}.csv".format(
-                        self.mode, self.model_name, self.iteration
-                    ),
-                    index=False,
-                )
-                plt.plot(self.asset_memory, "r")
-                plt.savefig(
-                    "results/account_value_{}_{}_{}.png".format(
-                        self.mode, self.model_name, self.iteration
-                    )
-                )
-                plt.close()
+                self.save_artifacts()
 
             # Add outputs to logger interface
             # logger.record("environment/portfolio_value", end_total_asset)
@@ -297,7 +369,7 @@ class StockTradingEnv(gym.Env):
             # logger.record("environment/total_cost", self.cost)
             # logger.record("environment/total_trades", self.trades)
 
-            return self.state, self.reward, self.terminal, False, {}
+            return self.state.copy(), self.reward, self.terminal, False, {}
 
         else:
             actions = actions * self.hmax  # actions initially is scaled between 0 to 1
@@ -313,47 +385,25 @@ class StockTradingEnv(gym.Env):
             )
             # print("begin_total_asset:{}".format(begin_total_asset))
 
-            argsort_actions = np.argsort(actions)
-            sell_index = argsort_actions[: np.where(actions < 0)[0].shape[0]]
-            buy_index = argsort_actions[::-1][: np.where(actions > 0)[0].shape[0]]
-
-            for index in sell_index:
-                # print(f"Num shares before: {self.state[index+self.stock_dim+1]}")
-                # print(f'take sell action before : {actions[index]}')
-                actions[index] = self._sell_stock(index, actions[index]) * (-1)
-                # print(f'take sell action after : {actions[index]}')
-                # print(f"Num shares after: {self.state[index+self.stock_dim+1]}")
-
-            for index in buy_index:
-                # print('take buy action: {}'.format(actions[index]))
-                actions[index] = self._buy_stock(index, actions[index])
-
-            self.actions_memory.append(actions)
+            self._execute_trades(actions)
 
             # state: s -> s+1
             self.day += 1
-            self.data = self.df.loc[self.day, :]
             if self.turbulence_threshold is not None:
-                if len(self.df.tic.unique()) == 1:
-                    self.turbulence = self.data[self.risk_indicator_col]
-                elif len(self.df.tic.unique()) > 1:
-                    self.turbulence = self.data[self.risk_indicator_col].values[0]
-            self.state = self._update_state()
+                self.turbulence = self._risk_indicator(self.day)
+            self._update_state()
 
             end_total_asset = self.state[0] + sum(
                 np.array(self.state[1 : (self.stock_dim + 1)])
                 * np.array(self.state[(self.stock_dim + 1) : (self.stock_dim * 2 + 1)])
             )
-            self.asset_memory.append(end_total_asset)
-            self.date_memory.append(self._get_date())
             self.reward = end_total_asset - begin_total_asset
-            self.rewards_memory.append(self.reward)
-            self.reward = self.reward * self.reward_scaling
-            self.state_memory.append(
-                self.state
+            self.recorder.record(
+                end_total_asset, self._get_date(), self.reward, actions, self.state
             )  # add current state in state_recorder for each step
+            self.reward = self.reward * self.reward_scaling
 
-        return self.state, self.reward, self.terminal, False, {}
+        return self.state.copy(), self.reward, self.terminal, False, {}
 
     def reset(
         self,
@@ -362,135 +412,148 @@ class StockTradingEnv(gym.Env):
         options=None,
     ):
         # initiate state
-        self.day = 0
-        self.data = self.df.loc[self.day, :]
+        self.day = self.start_day
         self.state = self._initiate_state()
 
         if self.initial:
-            self.asset_memory = [
-                self.initial_amount
-                + np.sum(
-                    np.array(self.num_stock_shares)
-                    * np.array(self.state[1 : 1 + self.stock_dim])
-                )
-            ]
+            initial_total_asset = self.initial_amount + np.sum(
+                np.array(self.num_stock_shares)
+                * np.array(self.state[1 : 1 + self.stock_dim])
+            )
         else:
-            previous_total_asset = self.previous_state[0] + sum(
+            initial_total_asset = self.previous_state[0] + sum(
                 np.array(self.state[1 : (self.stock_dim + 1)])
                 * np.array(
                     self.previous_state[(self.stock_dim + 1) : (self.stock_dim * 2 + 1)]
                 )
             )
-            self.asset_memory = [previous_total_asset]
+        self.recorder.reset(initial_total_asset, self._get_date())
 
         self.turbulence = 0
         self.cost = 0
         self.trades = 0
         self.terminal = False
         # self.iteration=self.iteration
-        self.rewards_memory = []
-        self.actions_memory = []
-        self.date_memory = [self._get_date()]
 
         self.episode += 1
 
-        return self.state, {}
+        return self.state.copy(), {}
 
     def render(self, mode="human", close=False):
         return self.state
 
+    def set_window(self, start_day, end_day):
+        """Run episodes from ``start_day`` to ``end_day`` (inclusive day
+        numbers of the cube) from the next ``reset`` or ``restore`` on."""
+        if not 0 <= start_day < end_day < self.cube.n_days:
+            raise ValueError(
+                f"window must satisfy 0 <= start_day < end_day < {self.cube.n_days}, "
+                f"got ({start_day}, {end_day})"
+            )
+        self.start_day = start_day
+        self.end_day = end_day
+
+    def snapshot(self) -> EnvSnapshot:
+        """Current cash, holdings, day, counters and RNG state."""
+        n = self.stock_dim
+        return EnvSnapshot(
+            cash=float(self.state[0]),
+            holdings=self.state[n + 1 : 2 * n + 1].copy(),
+            day=self.day,
+            turbulence=float(self.turbulence),
+            cost=float(self.cost),
+            trades=int(self.trades),
+            rng_state=self.np_random.bit_generator.state,
+        )
+
+    def restore(self, snapshot: EnvSnapshot, day=None):
+        """Start an episode from ``snapshot``'s portfolio.
+
+        The episode starts on ``day`` (the snapshot's day by default), with
+        that day's prices and indicators, and the episode history restarts
+        there. Restoring on the snapshot's own day resumes it exactly; on the
+        first day of the next window it hands the portfolio over the way
+        ``previous_state`` does, with cost and trade counts starting from 0,
+        except that the risk indicator of that day applies from the first
+        step on.
+
+        Returns:
+            The state on ``day``.
+        """
+        self.day = snapshot.day if day is None else day
+        n = self.stock_dim
+        self.state[0] = snapshot.cash
+        self.state[n + 1 : 2 * n + 1] = snapshot.holdings
+        self._update_state()
+        if self.day == snapshot.day or self.turbulence_threshold is None:
+            self.turbulence = snapshot.turbulence
+        else:
+            self.turbulence = self._risk_indicator(self.day)
+        if self.day == snapshot.day:
+            self.cost = snapshot.cost
+            self.trades = snapshot.trades
+        else:
+            # a new window counts its own costs and trades, as after reset
+            self.cost = 0
+            self.trades = 0
+        self.np_random.bit_generator.state = snapshot.rng_state
+        self.terminal = False
+        total_asset = self.state[0] + sum(
+            np.array(self.state[1 : (n + 1)]) * np.array(self.state[(n + 1) : (n * 2 + 1)])
+        )
+        self.recorder.reset(total_asset, self._get_date())
+        self.episode += 1
+        return self.state.copy()
+
+    @property
+    def data(self):
+        """Rows of ``df`` for the current day (built on demand)."""
+        return self.df.loc[self.day, :]
+
     def _initiate_state(self):
+        # state layout: [cash, close * n, holdings * stock_dim, tech-major indicators]
+        n_tics = self.cube.n_tics
         if self.initial:
-            # For Initial State
-            if len(self.df.tic.unique()) > 1:
-                # for multiple stock
-                state = (
-                    [self.initial_amount]
-                    + self.data.close.values.tolist()
-                    + self.num_stock_shares
-                    + sum(
-                        (
-                            self.data[tech].values.tolist()
-                            for tech in self.tech_indicator_list
-                        ),
-                        [],
-                    )
-                )  # append initial stocks_share to initial state, instead of all zero
+            cash = self.initial_amount
+            if n_tics > 1:
+                # append initial stocks_share to initial state, instead of all zero
+                holdings = self.num_stock_shares
             else:
-                # for single stock
-                state = (
-                    [self.initial_amount]
-                    + [self.data.close]
-                    + [0] * self.stock_dim
-                    + sum(([self.data[tech]] for tech in self.tech_indicator_list), [])
-                )
+                holdings = [0] * self.stock_dim
         else:
             # Using Previous State
-            if len(self.df.tic.unique()) > 1:
-                # for multiple stock
-                state = (
-                    [self.previous_state[0]]
-                    + self.data.close.values.tolist()
-                    + self.previous_state[
-                        (self.stock_dim + 1) : (self.stock_dim * 2 + 1)
-                    ]
-                    + sum(
-                        (
-                            self.data[tech].values.tolist()
-                            for tech in self.tech_indicator_list
-                        ),
-                        [],
-                    )
-                )
-            else:
-                # for single stock
-                state = (
-                    [self.previous_state[0]]
-                    + [self.data.close]
-                    + self.previous_state[
-                        (self.stock_dim + 1) : (self.stock_dim * 2 + 1)
-                    ]
-                    + sum(([self.data[tech]] for tech in self.tech_indicator_list), [])
-                )
+            previous_state = np.asarray(self.previous_state, dtype=np.float64)
+            cash = previous_state[0]
+            holdings = previous_state[(self.stock_dim + 1) : (self.stock_dim * 2 + 1)]
+
+        state = np.empty(
+            1 + n_tics + len(holdings) + len(self.tech_indicator_list) * n_tics,
+            dtype=np.float64,
+        )
+        state[0] = cash
+        state[1 + n_tics : 1 + n_tics + len(holdings)] = holdings
+        self.state = state
+        self._update_state()
         return state
 
     def _update_state(self):
-        if len(self.df.tic.unique()) > 1:
-            # for multiple stock
-            state = (
-                [self.state[0]]
-                + self.data.close.values.tolist()
-                + list(self.state[(self.stock_dim + 1) : (self.stock_dim * 2 + 1)])
-                + sum(
-                    (
-                        self.data[tech].values.tolist()
-                        for tech in self.tech_indicator_list
-                    ),
-                    [],
-                )
-            )
-
-        else:
-            # for single stock
-            state = (
-                [self.state[0]]
-                + [self.data.close]
-                + list(self.state[(self.stock_dim + 1) : (self.stock_dim * 2 + 1)])
-                + sum(([self.data[tech]] for tech in self.tech_indicator_list), [])
-            )
-
-        return state
+        # write the current day's prices and indicators into the state buffer
+        n_tics = self.cube.n_tics
+        row = self.cube.data[self.day]
+        self.state[1 : 1 + n_tics] = row[:, 0]
+        tech_start = len(self.state) - len(self.tech_indicator_list) * n_tics
+        self.state[tech_start:].reshape(-1, n_tics)[...] = row[:, self._tech_slice].T
+        return self.state
 
     def _get_date(self):
-        if len(self.df.tic.unique()) > 1:
-            date = self.data.date.unique()[0]
-        else:
-            date = self.data.date
-        return date
+        return self.cube.dates[self.day]
+
+    def _risk_indicator(self, day):
+        return self.cube.data[day, 0, self.cube.col(self.risk_indicator_col)]
 
     # add save_state_memory to preserve state in the trading process
     def save_state_memory(self):
-        if len(self.df.tic.unique()) > 1:
+        if self.cube.n_tics > 1:
             # date and close price length must match actions length
             date_list = self.date_memory[:-1]
             df_date = pd.DataFrame(date_list)
@@ -513,7 +576,7 @@ class StockTradingEnv(gym.Env):
             # df_actions = pd.DataFrame({'date':date_list,'actions':action_list})
         else:
             date_list = self.date_memory[:-1]
-            state_list = self.state_memory
+            state_list = list(self.state_memory)
             df_states = pd.DataFrame({"date": date_list, "states": state_list})
         # print(df_states)
         return df_states
@@ -529,7 +592,7 @@ class StockTradingEnv(gym.Env):
         return df_account_value
 
     def save_action_memory(self):
-        if len(self.df.tic.unique()) > 1:
+        if self.cube.n_tics > 1:
             # date and close price length must match actions length
             date_list = self.date_memory[:-1]
             df_date = pd.DataFrame(date_list)
@@ -537,12 +600,12 @@ class StockTradingEnv(gym.Env):
 
             action_list = self.actions_memory
             df_actions = pd.DataFrame(action_list)
-            df_actions.columns = self.data.tic.values
+            df_actions.columns = self.cube.tics
             df_actions.index = df_date.date
             # df_actions = pd.DataFrame({'date':date_list,'actions':action_list})
         else:
             date_list = self.date_memory[:-1]
-            action_list = self.actions_memory
+            action_list = list(self.actions_memory)
             df_actions = pd.DataFrame({"date": date_list, "actions": action_list})
         return df_actions
 
@@ -2,7 +2,9 @@ from __future__ import annotations
 
 import gymnasium as gym
 import numpy as np
-from numpy import random as rd
+
+from finrl.meta.env_stock_trading.step_kernel import as_kernel_actions
+from finrl.meta.env_stock_trading.step_kernel import get_step_kernel
 
 
 class StockTradingEnv(gym.Env):
@@ -19,7 +21,18 @@ class StockTradingEnv(gym.Env):
         sell_cost_pct=1e-3,
         reward_scaling=2**-11,
         initial_stocks=None,
+        step_kernel="auto",
+        episode_length=None,
+        random_start=False,
     ):
+        """
+        Args:
+            episode_length: truncate training episodes after this many steps,
+                reported through the ``truncated`` flag of ``step``. None runs
+                them to the last day.
+            random_start: start each training episode on a random day (from
+                the env's seeded ``np_random``) instead of day 0.
+        """
         price_ary = config["price_array"]
         tech_ary = config["tech_array"]
         turbulence_ary = config["turbulence_array"]
@@ -42,6 +55,7 @@ class StockTradingEnv(gym.Env):
         self.sell_cost_pct = sell_cost_pct
         self.reward_scaling = reward_scaling
         self.initial_capital = initial_capital
+        self._trade_step, _ = get_step_kernel(step_kernel)
         self.initial_stocks = (
             np.zeros(stock_dim, dtype=np.float32)
             if initial_stocks is None
@@ -66,6 +80,14 @@ class StockTradingEnv(gym.Env):
         self.action_dim = stock_dim
         self.max_step = self.price_ary.shape[0] - 1
         self.if_train = if_train
+        if episode_length is not None and not 0 < episode_length <= self.max_step:
+            raise ValueError(
+                f"episode_length must be between 1 and {self.max_step}, got {episode_length}"
+            )
+        self.episode_length = episode_length
+        self.random_start = random_start
+        self.start_day = 0
+        self.end_day = self.max_step
         self.if_discrete = False
         self.target_return = 10.0
         self.episode_return = 0.0
@@ -83,16 +105,23 @@ class StockTradingEnv(gym.Env):
         seed=None,
         options=None,
     ):
-        self.day = 0
+        """Start an episode; ``options={"start_day": day}`` fixes its first day."""
+        super().reset(seed=seed)
+        self.start_day = self._sample_start_day(options)
+        self.end_day = self.max_step
+        if self.if_train and self.episode_length is not None:
+            self.end_day = min(self.start_day + self.episode_length, self.max_step)
+        self.day = self.start_day
         price = self.price_ary[self.day]
 
         if self.if_train:
             self.stocks = (
-                self.initial_stocks + rd.randint(0, 64, size=self.initial_stocks.shape)
+                self.initial_stocks
+                + self.np_random.integers(0, 64, size=self.initial_stocks.shape)
             ).astype(np.float32)
             self.stocks_cool_down = np.zeros_like(self.stocks)
             self.amount = (
-                self.initial_capital * rd.uniform(0.95, 1.05)
+                self.initial_capital * self.np_random.uniform(0.95, 1.05)
                 - (self.stocks * price).sum()
             )
         else:
@@ -112,31 +141,19 @@ class StockTradingEnv(gym.Env):
         price = self.price_ary[self.day]
         self.stocks_cool_down += 1
 
-        if self.turbulence_bool[self.day] == 0:
-            min_action = int(self.max_stock * self.min_stock_rate)  # stock_cd
-            for index in np.where(actions < -min_action)[0]:  # sell_index:
-                if price[index] > 0:  # Sell only if current asset is > 0
-                    sell_num_shares = min(self.stocks[index], -actions[index])
-                    self.stocks[index] -= sell_num_shares
-                    self.amount += (
-                        price[index] * sell_num_shares * (1 - self.sell_cost_pct)
-                    )
-                    self.stocks_cool_down[index] = 0
-            for index in np.where(actions > min_action)[0]:  # buy_index:
-                if (
-                    price[index] > 0
-                ):  # Buy only if the price is > 0 (no missing data in this particular date)
-                    buy_num_shares = min(self.amount // price[index], actions[index])
-                    self.stocks[index] += buy_num_shares
-                    self.amount -= (
-                        price[index] * buy_num_shares * (1 + self.buy_cost_pct)
-                    )
-                    self.stocks_cool_down[index] = 0
-
-        else:  # sell all when turbulence
-            self.amount += (self.stocks * price).sum() * (1 - self.sell_cost_pct)
-            self.stocks[:] = 0
-            self.stocks_cool_down[:] = 0
+        # sell, then buy; sell all when turbulence
+        self.amount = self._trade_step(
+            price,
+            as_kernel_actions(actions),
+            self.stocks,
+            self.stocks_cool_down,
+            float(self.amount),
+            int(self.max_stock * self.min_stock_rate),  # min_action
+            self.buy_cost_pct,
+            self.sell_cost_pct,
+            False,
+            self.turbulence_bool[self.day] != 0,
+        )
 
         state = self.get_state(price)
         total_asset = self.amount + (self.stocks * price).sum()
@@ -144,12 +161,22 @@ class StockTradingEnv(gym.Env):
         self.total_asset = total_asset
 
         self.gamma_reward = self.gamma_reward * self.gamma + reward
-        done = self.day == self.max_step
-        if done:
+        terminated = self.day == self.max_step
+        truncated = not terminated and self.day == self.end_day
+        if terminated or truncated:
             reward = self.gamma_reward
             self.episode_return = total_asset / self.initial_total_asset
 
-        return state, reward, done, False, dict()
+        return state, reward, terminated, truncated, dict()
+
+    def _sample_start_day(self, options):
+        if options and "start_day" in options:
+            return int(options["start_day"])
+        if not (self.if_train and self.random_start):
+            return 0
+        # leave room for a full episode, or at least one step
+        length = self.episode_length or 1
+        return int(self.np_random.integers(0, self.max_step - length + 1))
 
     def get_state(self, price):
         amount = np.array(self.amount * (2**-12), dtype=np.float32)
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import gymnasium as gym
+import numpy as np
+import pandas as pd
+from gymnasium import spaces
+from stable_baselines3.common.vec_env import DummyVecEnv
+
+from finrl.meta.env_stock_trading.execution import execute_trades
+from finrl.meta.env_stock_trading.market_cube import SparseMarket
+from finrl.meta.env_stock_trading.recorder import EpisodeRecorder
+
+
+class StockTradingSparseEnv(gym.Env):
+    """A stock trading environment over a universe whose members change.
+
+    Market data is a :class:`SparseMarket`: only the tickers listed on a day
+    are stored and stepped, so the cost of a step follows the number of active
+    tickers, not the size of the whole universe. The observation and action
+    spaces have ``max_active`` (K) slots; on each day slot ``j`` is the
+    ``j``-th active ticker (in ticker order, see ``active_tics``) and the
+    unused slots are zero with a mask of 0.
+
+    State layout, of size ``1 + (3 + len(tech_indicator_list)) * K``::
+
+        [cash, close * K, holdings * K, tech-major indicators * K, mask * K]
+
+    Orders follow :class:`StockTradingEnv` (see ``execution.execute_trades``);
+    actions of unused slots are ignored. Shares of a ticker that is not
+    listed on the next day are sold at its last close, paying the sell
+    commission.
+
+    Attributes
+    ----------
+        market: SparseMarket
+            CSR index of the daily members and their features
+        holdings: np.ndarray
+            shares held of every ticker of the universe
+        max_active: int
+            number of ticker slots K
+    """
+
+    metadata = {"render.modes": ["human"]}
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        hmax: int,
+        initial_amount: int,
+        buy_cost_pct: float,
+        sell_cost_pct: float,
+        reward_scaling: float,
+        tech_indicator_list: list[str],
+        max_active: int | None = None,
+        turbulence_threshold=None,
+        risk_indicator_col="turbulence",
+        print_verbosity=10,
+        record_level="summary",
+        market: SparseMarket | None = None,
+        market_dtype=np.float64,
+    ):
+        if market is None:
+            columns = ["close"] + list(tech_indicator_list)
+            if risk_indicator_col in df.columns:
+                columns.append(risk_indicator_col)
+            market = SparseMarket.from_df(df, columns, dtype=market_dtype)
+        self.market = market
+        self.hmax = hmax
+        self.initial_amount = initial_amount
+        self.reward_scaling = reward_scaling
+        self.tech_indicator_list = tech_indicator_list
+        self.turbulence_threshold = turbulence_threshold
+        self.risk_indicator_col = risk_indicator_col
+        self.print_verbosity = print_verbosity
+        self.max_active = market.max_active if max_active is None else max_active
+        if self.max_active < market.max_active:
+            raise ValueError(
+                f"max_active must be at least {market.max_active}, the largest "
+                f"number of tickers active on one day, got {self.max_active}"
+            )
+
+        k = self.max_active
+        self._tech = np.array([market.col(t) for t in tech_indicator_list], np.intp)
+        self._risk = (
+            market.col(risk_indicator_col)
+            if risk_indicator_col in market.columns
+            else None
+        )
+        self._buy_cost_pct = np.full(k, buy_cost_pct, dtype=np.float64)
+        self._sell_cost_pct = np.full(k, sell_cost_pct, dtype=np.float64)
+        self._disabled = np.zeros(k, dtype=bool)
+
+        self.state_dim = 1 + (3 + len(tech_indicator_list)) * k
+        self.action_space = spaces.Box(low=-1, high=1, shape=(k,))
+        self.observation_space = spaces.Box(
+            low=-np.inf, high=np.inf, shape=(self.state_dim,)
+        )
+        self.state = np.zeros(self.state_dim, dtype=np.float64)
+        self.holdings = np.zeros(market.n_tics, dtype=np.float64)
+        self.recorder = EpisodeRecorder(record_level, market.n_days, k, self.state_dim)
+        self.episode = 0
+        self.reset()
+
+    @property
+    def active_tics(self) -> np.ndarray:
+        """Tickers of the occupied slots on the current day."""
+        return self.market.tics[self._ids]
+
+    @property
+    def asset_memory(self):
+        return self.recorder.assets
+
+    def reset(
+        self,
+        *,
+        seed=None,
+        options=None,
+    ):
+        super().reset(seed=seed)
+        self.day = 0
+        self.cash = float(self.initial_amount)
+        self.holdings[:] = 0
+        self.cost = 0
+        self.trades = 0
+        self.turbulence = 0
+        self.reward = 0
+        self.terminal = False
+        self._load_day()
+        self._write_state()
+        self.recorder.reset(self._total_asset(), self.market.dates[self.day])
+        self.episode += 1
+        return self.state, {}
+
+    def step(self, actions):
+        self.terminal = self.day >= self.market.n_days - 1
+        if self.terminal:
+            if self.episode % self.print_verbosity == 0:
+                end_total_asset = self._total_asset()
+                print(f"day: {self.day}, episode: {self.episode}")
+                print(f"begin_total_asset: {self.recorder.initial_asset:0.2f}")
+                print(f"end_total_asset: {end_total_asset:0.2f}")
+                print(f"total_cost: {self.cost:0.2f}")
+                print(f"total_trades: {self.trades}")
+                print("=================================")
+            return self.state, self.reward, self.terminal, False, {}
+
+        ids, price = self._ids, self._price
+        n = len(ids)
+        begin_total_asset = self._total_asset()
+        liquidate = (
+            self.turbulence_threshold is not None
+            and self.turbulence >= self.turbulence_threshold
+        )
+        executed = np.zeros(self.max_active, dtype=int)
+        executed[:n] = (np.asarray(actions)[:n] * self.hmax).astype(int)
+        if liquidate:
+            executed[:n] = -self.hmax
+        holdings = self.holdings[ids]
+        self.cash, self.cost, trades = execute_trades(
+            executed[:n],
+            price=price,
+            holdings=holdings,
+            cash=self.cash,
+            cost=self.cost,
+            disabled=self._disabled[:n],
+            buy_cost_pct=self._buy_cost_pct[:n],
+            sell_cost_pct=self._sell_cost_pct[:n],
+            liquidate=liquidate,
+        )
+        self.holdings[ids] = holdings
+        self.trades += trades
+
+        # state: s -> s+1
+        self.day += 1
+        self._load_day()
+        if self.turbulence_threshold is not None and self._risk is not None:
+            self.turbulence = self._values[0, self._risk] if len(self._ids) else 0
+        self._sell_delisted(ids, price)
+        self._write_state()
+
+        end_total_asset = self._total_asset()
+        self.reward = end_total_asset - begin_total_asset
+        self.recorder.record(
+            end_total_asset,
+            self.market.dates[self.day],
+            self.reward,
+            executed,
+            self.state,
+        )
+        self.reward = self.reward * self.reward_scaling
+        return self.state, self.reward, self.terminal, False, {}
+
+    def render(self, mode="human", close=False):
+        return self.state
+
+    def _load_day(self):
+        self._ids, values = self.market.day(self.day)
+        self._price = values[:, 0]
+        self._values = values
+
+    def _sell_delisted(self, last_ids, last_price):
+        # positions in tickers that left the universe go back to cash
+        gone = ~np.isin(last_ids, self._ids, assume_unique=True)
+        gone &= self.holdings[last_ids] > 0
+        if gone.any():
+            gross = last_price[gone] * self.holdings[last_ids[gone]]
+            self.cash += np.sum(gross * (1 - self._sell_cost_pct[: len(gross)]))
+            self.cost += np.sum(gross * self._sell_cost_pct[: len(gross)])
+            self.holdings[last_ids[gone]] = 0
+            self.trades += int(gone.sum())
+
+    def _write_state(self):
+        k, n = self.max_active, len(self._ids)
+        slots = self.state[1:].reshape(-1, k)  # close, holdings, tech..., mask
+        slots[:, n:] = 0
+        slots[0, :n] = self._price
+        slots[1, :n] = self.holdings[self._ids]
+        slots[2:-1, :n] = self._values[:, self._tech].T
+        slots[-1, :n] = 1
+        self.state[0] = self.cash
+
+    def _total_asset(self):
+        return self.cash + np.dot(self.holdings[self._ids], self._price)
+
+    def get_sb_env(self):
+        e = DummyVecEnv([lambda: self])
+        obs = e.reset()
+        return e, obs
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import random
 import time
+import weakref
 from copy import deepcopy
 
 import gym
@@ -13,6 +14,9 @@ from stable_baselines3.common import logger
 from stable_baselines3.common.vec_env import DummyVecEnv
 from stable_baselines3.common.vec_env import SubprocVecEnv
 
+from finrl.meta.env_stock_trading.market_cube import MarketCube
+from finrl.meta.env_stock_trading.shared_arrays import make_shared_env_fns
+
 matplotlib.use("Agg")
 
 
@@ -48,6 +52,9 @@ class StockTradingEnvStopLoss(gym.Env):
         print_verbosity(int): When iterating (step), how often to print stats about state of env
         initial_amount: (int, float): Amount of cash initially available
         daily_information_columns (list(str)): Columns to use when building state space from the dataframe. It could be OHLC columns or any other variables such as technical indicators and turbulence index
+        cache_indicator_data (bool): keep the state vector of every date as a ready list. Either way market data
+            is read once into ``market``, a [dates, assets, columns] MarketCube, so any column subset for a date
+            is a slice
         cash_penalty_proportion (int, float): Penalty to apply if the algorithm runs out of cash
         patient (bool): option to choose whether end the cycle when we're running out of cash or just don't buy anything until we got additional cash
     action space: <share_dollar_purchases>
@@ -60,6 +67,8 @@ class StockTradingEnvStopLoss(gym.Env):
     """
 
     metadata = {"render.modes": ["human"]}
+    # attributes get_multiproc_env workers get from shared memory instead
+    shared_exclude = ("df", "cached_data", "market")
 
     def __init__(
         self,
@@ -101,6 +110,15 @@ class StockTradingEnvStopLoss(gym.Env):
         self.min_profit_penalty = 1 + profit_loss_ratio * (1 - self.stoploss_penalty)
         self.turbulence_threshold = turbulence_threshold
         self.daily_information_cols = daily_information_cols
+        # [dates, assets, columns] array of every column a step reads
+        cube_columns = list(daily_information_cols) + ["close", "turbulence"]
+        self.cube_columns = [
+            c for c in dict.fromkeys(cube_columns) if c in df.columns
+        ]
+        self.market = MarketCube.pivot(
+            df, self.cube_columns, date_col_name, self.stock_col, self.dates, self.assets
+        )
+        self._info_cols = self.market.cols(self.daily_information_cols)
         self.state_space = (
             1 + len(self.assets) + len(self.assets) * len(self.daily_information_cols)
         )
@@ -117,9 +135,8 @@ class StockTradingEnvStopLoss(gym.Env):
         self.cash_penalty_proportion = cash_penalty_proportion
         if self.cache_indicator_data:
             print("caching data")
-            self.cached_data = [
-                self.get_date_vector(i) for i, _ in enumerate(self.dates)
-            ]
+            info = self.market.data[:, :, self._info_cols]
+            self.cached_data = info.reshape(len(self.dates), -1).tolist()
             print("data cached!")
 
     def seed(self, seed=None):
@@ -173,16 +190,9 @@ class StockTradingEnvStopLoss(gym.Env):
         if (cols is None) and (self.cached_data is not None):
             return self.cached_data[date]
         else:
-            date = self.dates[date]
-            if cols is None:
-                cols = self.daily_information_cols
-            trunc_df = self.df.loc[[date]]
-            v = []
-            for a in self.assets:
-                subset = trunc_df[trunc_df[self.stock_col] == a]
-                v += subset.loc[date, cols].tolist()
-            assert len(v) == len(self.assets) * len(cols)
-            return v
+            # asset-major: cols of the first asset, then of the second, ...
+            index = self._info_cols if cols is None else self.market.cols(cols)
+            return self.market.data[date][:, index].ravel().tolist()
 
     def return_terminal(self, reason="Last Date", reward=0):
         state = self.state_memory[-1]
@@ -454,14 +464,49 @@ class StockTradingEnvStopLoss(gym.Env):
         obs = e.reset()
         return e, obs
 
-    def get_multiproc_env(self, n=10):
-        def get_self():
-            return deepcopy(self)
+    def get_multiproc_env(self, n=10, shared=True, path=None, start_method="fork"):
+        """Run ``n`` copies of this env in subprocesses.
+
+        With ``shared=True`` the read-only market arrays are placed once in
+        shared memory (or in a memory-mapped file at ``path``) and every
+        worker attaches to them zero-copy; only the per-episode portfolio
+        state is private. With ``shared=False`` each worker gets a deepcopy of
+        the whole env, DataFrame included. The shared block is released when
+        the returned VecEnv is garbage collected, or via
+        ``e.shared_market.close()``.
+        """
+        if shared:
+            env_fns, shared_market = make_shared_env_fns(
+                self, self._market_arrays(), n, path=path
+            )
+        else:
+
+            def get_self():
+                return deepcopy(self)
 
-        e = SubprocVecEnv([get_self for _ in range(n)], start_method="fork")
+            env_fns, shared_market = [get_self for _ in range(n)], None
+
+        e = SubprocVecEnv(env_fns, start_method=start_method)
+        if shared_market is not None:
+            e.shared_market = shared_market
+            weakref.finalize(e, shared_market.close)
         obs = e.reset()
         return e, obs
 
+    def _market_arrays(self):
+        # the read-only arrays a worker needs to step without the DataFrame
+        return {"market": self.market.data}
+
+    def _attach_market(self, arrays):
+        # worker side of get_multiproc_env: step from the shared cube alone.
+        # The dict holds the shared buffer the cube views, so it is kept too.
+        self._market = arrays
+        self.market = MarketCube(
+            arrays["market"], self.dates, self.assets, self.cube_columns
+        )
+        self.cached_data = None
+        self.df = None
+
     def save_asset_memory(self):
         if self.current_step == 0:
             return None
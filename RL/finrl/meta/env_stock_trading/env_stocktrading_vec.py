@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+from gymnasium import spaces
+from stable_baselines3.common.vec_env import VecEnv
+
+from finrl.meta.env_stock_trading.execution import execute_trades_batch
+from finrl.meta.env_stock_trading.market_cube import MarketCube
+
+
+class StockTradingVecEnv(VecEnv):
+    """N stock trading portfolios stepped together in one process.
+
+    Implements the Stable Baselines3 ``VecEnv`` interface directly, so it can
+    be passed to ``DRLAgent(env=...)`` in place of ``StockTradingEnv.get_sb_env()``.
+    Every portfolio follows the same rules as :class:`StockTradingEnv`
+    (``initial=True``): the same observation layout, trade execution, reward
+    and terminal step. Portfolios are held as ``[N, tickers]`` arrays over one
+    shared :class:`MarketCube`, and each one resets on its own when done.
+
+    With ``random_start=True`` every episode starts on a random day, drawn
+    from the env's own generator (see ``seed``).
+
+    Attributes
+    ----------
+        cube: MarketCube
+            shared read-only market data
+        day: np.ndarray
+            current day index per portfolio, ``[N]``
+        cash: np.ndarray
+            cash per portfolio, ``[N]``
+        holdings: np.ndarray
+            shares held, ``[N, stock_dim]``
+    """
+
+    render_mode = None
+
+    def __init__(
+        self,
+        df: pd.DataFrame | None,
+        num_envs: int,
+        stock_dim: int,
+        hmax: int,
+        initial_amount: int,
+        num_stock_shares: list[int],
+        buy_cost_pct: list[float],
+        sell_cost_pct: list[float],
+        reward_scaling: float,
+        tech_indicator_list: list[str],
+        turbulence_threshold=None,
+        risk_indicator_col="turbulence",
+        random_start=False,
+        cube: MarketCube | None = None,
+        cube_dtype=np.float64,
+    ):
+        if cube is None:
+            cube_columns = ["close"] + list(tech_indicator_list)
+            if risk_indicator_col in df.columns:
+                cube_columns.append(risk_indicator_col)
+            cube = MarketCube.from_df(df, cube_columns, dtype=cube_dtype)
+        self.cube = cube
+        self.stock_dim = stock_dim
+        self.hmax = hmax
+        self.initial_amount = initial_amount
+        self.num_stock_shares = num_stock_shares
+        self.buy_cost_pct = np.asarray(buy_cost_pct, dtype=np.float64)
+        self.sell_cost_pct = np.asarray(sell_cost_pct, dtype=np.float64)
+        self.reward_scaling = reward_scaling
+        self.tech_indicator_list = tech_indicator_list
+        self.turbulence_threshold = turbulence_threshold
+        self.risk_indicator_col = risk_indicator_col
+        self.random_start = random_start
+
+        # prices and indicators per day in observation order: close, then tech-major
+        n_tics = cube.n_tics
+        tech = [cube.col(t) for t in tech_indicator_list]
+        self._close = cube.column("close")
+        self._tech = cube.data[:, :, tech].transpose(0, 2, 1).reshape(cube.n_days, -1)
+        self._risk = (
+            cube.column(risk_indicator_col)[:, 0]
+            if risk_indicator_col in cube.columns
+            else None
+        )
+        self._initial_holdings = (
+            np.asarray(num_stock_shares, dtype=np.float64)
+            if n_tics > 1
+            else np.zeros(stock_dim)
+        )
+        self.state_dim = 1 + n_tics + stock_dim + len(tech) * n_tics
+
+        super().__init__(
+            num_envs,
+            spaces.Box(low=-np.inf, high=np.inf, shape=(self.state_dim,)),
+            spaces.Box(low=-1, high=1, shape=(stock_dim,)),
+        )
+        self._rng = np.random.default_rng()
+        self.day = np.zeros(num_envs, dtype=np.int64)
+        self.cash = np.zeros(num_envs)
+        self.holdings = np.zeros((num_envs, stock_dim))
+        self.turbulence = np.zeros(num_envs)
+        self.cost = np.zeros(num_envs)
+        self.trades = np.zeros(num_envs, dtype=np.int64)
+        self.reward = np.zeros(num_envs)
+        self.episode = np.zeros(num_envs, dtype=np.int64)
+        self._actions = None
+
+    def _reset_envs(self, mask):
+        n = int(mask.sum())
+        if self.random_start:
+            self.day[mask] = self._rng.integers(0, self.cube.n_days - 1, n)
+        else:
+            self.day[mask] = 0
+        self.cash[mask] = self.initial_amount
+        self.holdings[mask] = self._initial_holdings
+        self.turbulence[mask] = 0
+        self.cost[mask] = 0
+        self.trades[mask] = 0
+        self.reward[mask] = 0
+        self.episode[mask] += 1
+
+    def _get_obs(self):
+        n_tics = self.cube.n_tics
+        obs = np.empty((self.num_envs, self.state_dim), dtype=np.float32)
+        obs[:, 0] = self.cash
+        obs[:, 1 : 1 + n_tics] = self._close[self.day]
+        obs[:, 1 + n_tics : 1 + n_tics + self.stock_dim] = self.holdings
+        obs[:, 1 + n_tics + self.stock_dim :] = self._tech[self.day]
+        return obs
+
+    def _total_asset(self):
+        # summed left to right, like StockTradingEnv
+        value = np.cumsum(self._close[self.day] * self.holdings, axis=1)[:, -1]
+        return self.cash + value
+
+    def reset(self):
+        if self._seeds[0] is not None:
+            self._rng = np.random.default_rng(self._seeds[0])
+        self._reset_seeds()
+        self._reset_options()
+        self._reset_envs(np.ones(self.num_envs, dtype=bool))
+        return self._get_obs()
+
+    def step_async(self, actions):
+        self._actions = actions
+
+    def step_wait(self):
+        terminal = self.day >= self.cube.n_days - 1
+        live = ~terminal
+
+        actions = (np.asarray(self._actions) * self.hmax).astype(int)
+        liquidate = np.zeros(self.num_envs, dtype=bool)
+        if self.turbulence_threshold is not None:
+            liquidate = self.turbulence >= self.turbulence_threshold
+            actions[liquidate] = -self.hmax
+        actions[terminal] = 0
+
+        begin_total_asset = self._total_asset()
+        n_tics = self.cube.n_tics
+        if self.tech_indicator_list:
+            # the first indicator doubles as a "cannot trade" flag, as in StockTradingEnv
+            disabled = self._tech[self.day, :n_tics] == True  # noqa: E712
+        else:
+            disabled = np.zeros_like(actions, dtype=bool)
+        trades = execute_trades_batch(
+            actions,
+            price=self._close[self.day],
+            holdings=self.holdings,
+            cash=self.cash,
+            cost=self.cost,
+            disabled=disabled,
+            buy_cost_pct=self.buy_cost_pct,
+            sell_cost_pct=self.sell_cost_pct,
+            liquidate=liquidate,
+        )
+        self.trades += trades
+
+        # state: s -> s+1 for portfolios still running
+        self.day[live] += 1
+        if self.turbulence_threshold is not None:
+            self.turbulence[live] = self._risk[self.day[live]]
+        end_total_asset = self._total_asset()
+        self.reward[live] = (end_total_asset - begin_total_asset)[live] * self.reward_scaling
+
+        obs = self._get_obs()
+        rewards = self.reward.astype(np.float32)
+        infos = [{} for _ in range(self.num_envs)]
+        if terminal.any():
+            for i in np.flatnonzero(terminal):
+                infos[i] = {
+                    "terminal_observation": obs[i].copy(),
+                    "TimeLimit.truncated": False,
+                    "episode_cost": self.cost[i],
+                    "episode_trades": int(self.trades[i]),
+                }
+            self._reset_envs(terminal)
+            obs[terminal] = self._get_obs()[terminal]
+        return obs, rewards, terminal.copy(), infos
+
+    def close(self):
+        pass
+
+    def _indices(self, indices):
+        if indices is None:
+            return range(self.num_envs)
+        if isinstance(indices, int):
+            return [indices]
+        return indices
+
+    def get_attr(self, attr_name, indices=None):
+        value = getattr(self, attr_name)
+        return [value for _ in self._indices(indices)]
+
+    def set_attr(self, attr_name, value, indices=None):
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        method = getattr(self, method_name)
+        return [method(*method_args, **method_kwargs) for _ in self._indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False for _ in self._indices(indices)]
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import numpy as np
+
+
+def _running_sum(start, values):
+    # left-to-right sum, so rounding matches a Python ``+=`` loop exactly
+    if len(values) == 0:
+        return start
+    return np.cumsum(np.concatenate(([start], values)))[-1]
+
+
+def execute_trades(
+    actions,
+    price,
+    holdings,
+    cash,
+    cost,
+    disabled,
+    buy_cost_pct,
+    sell_cost_pct,
+    liquidate=False,
+):
+    """Apply one step of integer share orders with ``StockTradingEnv`` semantics.
+
+    Sells are processed first, most negative action first, then buys, largest
+    action first. Each buy is capped by the cash left after the previous ones
+    (``cash // (price * (1 + buy_cost_pct))``). With ``liquidate`` (turbulence
+    at or above the threshold) every held position with a positive price is
+    sold in full and no buys happen.
+
+    ``actions`` and ``holdings`` are updated in place: actions become the
+    executed share counts (negative for sells).
+
+    Args:
+        actions: int array of desired share changes, one per ticker.
+        price: close prices.
+        holdings: shares held, float array.
+        cash: cash before trading.
+        cost: accumulated transaction cost before trading.
+        disabled: bool mask of tickers that cannot be traded this step.
+        buy_cost_pct: per-ticker buy commission rates.
+        sell_cost_pct: per-ticker sell commission rates.
+        liquidate: sell everything, ignoring ``disabled``.
+
+    Returns:
+        ``(cash, cost, trades)`` after execution, where ``trades`` counts the
+        orders executed in this step.
+    """
+    buy_cost_pct = np.asarray(buy_cost_pct, dtype=np.float64)
+    sell_cost_pct = np.asarray(sell_cost_pct, dtype=np.float64)
+
+    order = np.argsort(actions)
+    sell_index = order[: np.count_nonzero(actions < 0)]
+    buy_index = order[::-1][: np.count_nonzero(actions > 0)]
+
+    # sells: independent per ticker, applied in one masked operation
+    held = holdings[sell_index]
+    sell_price = price[sell_index]
+    if liquidate:
+        active = (sell_price > 0) & (held > 0)
+        shares = np.where(active, held, 0)
+    else:
+        active = ~disabled[sell_index] & (held > 0)
+        shares = np.where(active, np.minimum(np.abs(actions[sell_index]), held), 0)
+    actions[sell_index] = -shares
+    sold = sell_index[active]
+    gross = sell_price[active] * shares[active]
+    if liquidate:
+        holdings[sold] = 0
+    else:
+        holdings[sold] -= shares[active]
+    cash = _running_sum(cash, gross * (1 - sell_cost_pct[sold]))
+    costs = [gross * sell_cost_pct[sold]]
+    trades = len(sold)
+
+    # buys: sequential allocation of the remaining cash in priority order
+    if not liquidate and len(buy_index):
+        actions[buy_index[disabled[buy_index]]] = 0
+        bought = buy_index[~disabled[buy_index]]
+        want = actions[bought]
+        buy_price = price[bought]
+        unit = buy_price * (1 + buy_cost_pct[bought])
+        shares = np.empty(len(bought))
+        start = 0
+        while start < len(bought):
+            # fill every order in full up to the first one cash can't cover
+            full = buy_price[start:] * want[start:] * (1 + buy_cost_pct[bought[start:]])
+            cash_before = np.cumsum(np.concatenate(([cash], -full)))
+            avail = cash_before[:-1] // unit[start:]
+            short = np.flatnonzero(avail < want[start:])
+            k = short[0] if len(short) else len(full)
+            shares[start : start + k] = want[start : start + k]
+            cash = cash_before[k]
+            start += k
+            if start == len(bought):
+                break
+            # the constrained order takes what it can afford
+            shares[start] = avail[k]
+            cash = cash - buy_price[start] * shares[start] * (
+                1 + buy_cost_pct[bought[start]]
+            )
+            start += 1
+            # orders that can't afford a single share leave cash untouched
+            afford = cash // unit[start:]
+            nonzero = np.flatnonzero(afford != 0)
+            skip = nonzero[0] if len(nonzero) else len(afford)
+            shares[start : start + skip] = afford[:skip]
+            start += skip
+        actions[bought] = shares
+        holdings[bought] += shares
+        costs.append(buy_price * shares * buy_cost_pct[bought])
+        trades += len(bought)
+
+    cost = _running_sum(cost, np.concatenate(costs))
+    return cash, cost, trades
+
+
+def execute_trades_batch(
+    actions,
+    price,
+    holdings,
+    cash,
+    cost,
+    disabled,
+    buy_cost_pct,
+    sell_cost_pct,
+    liquidate,
+):
+    """Batched :func:`execute_trades` over ``N`` independent portfolios.
+
+    All per-ticker arguments are ``[N, tickers]`` arrays, ``cash``, ``cost``
+    and ``liquidate`` are ``[N]``. Each row gets exactly the result
+    :func:`execute_trades` would give it. Sells are one masked operation over
+    the whole batch; buys loop over priority rank (at most ``tickers``
+    iterations), each one vectorized across portfolios, so the Python
+    overhead per step does not grow with ``N``.
+
+    ``actions``, ``holdings``, ``cash`` and ``cost`` are updated in place.
+
+    Returns:
+        ``[N]`` int array with the number of orders executed per portfolio.
+    """
+    buy_cost_pct = np.asarray(buy_cost_pct, dtype=np.float64)
+    sell_cost_pct = np.asarray(sell_cost_pct, dtype=np.float64)
+    rows = np.arange(actions.shape[0])[:, None]
+    liquidate = np.asarray(liquidate, dtype=bool)[:, None]
+
+    order = np.argsort(actions, axis=1)
+    want = np.take_along_axis(actions, order, axis=1)
+    p = np.take_along_axis(price, order, axis=1)
+    held = np.take_along_axis(holdings, order, axis=1)
+    off = np.take_along_axis(disabled, order, axis=1)
+    sc = sell_cost_pct[order]
+
+    # sells, most negative first; inactive entries add exact zeros below
+    active = (want < 0) & np.where(liquidate, p > 0, ~off) & (held > 0)
+    shares = np.where(
+        active, np.where(liquidate, held, np.minimum(np.abs(want), held)), 0
+    )
+    gross = np.where(active, p * shares, 0)
+    cash[:] = np.cumsum(np.concatenate((cash[:, None], gross * (1 - sc)), axis=1), axis=1)[:, -1]
+    cost[:] = np.cumsum(np.concatenate((cost[:, None], gross * sc), axis=1), axis=1)[:, -1]
+    sold = np.where(liquidate, 0, held - shares)
+    np.put_along_axis(holdings, order, np.where(active, sold, held), axis=1)
+    np.put_along_axis(
+        actions, order, np.where(want < 0, -shares, want).astype(actions.dtype), axis=1
+    )
+    trades = active.sum(axis=1)
+
+    # buys, largest first; cash is spent sequentially within each row
+    order = order[:, ::-1]
+    n_buy = (want > 0).sum(axis=1)
+    for rank in range(int(n_buy.max(initial=0))):
+        idx = order[:, rank]
+        a = actions[rows[:, 0], idx]
+        valid = (a > 0) & ~liquidate[:, 0]
+        go = valid & ~disabled[rows[:, 0], idx]
+        p = price[rows[:, 0], idx]
+        bc = buy_cost_pct[idx]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            avail = cash // (p * (1 + bc))
+        n = np.where(a < avail, a, avail)
+        cash[:] = np.where(go, cash - p * n * (1 + bc), cash)
+        cost[:] = np.where(go, cost + p * n * bc, cost)
+        holdings[rows[:, 0], idx] += np.where(go, n, 0)
+        actions[rows[:, 0], idx] = np.where(go, n, np.where(valid, 0, a))
+        trades += go
+    return trades
@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+
+class MarketCube:
+    """Dense ``[days, tickers, features]`` array built once from a long-format
+    market DataFrame (one row per day and ticker).
+
+    Row ``k`` of day ``d`` in the frame becomes ``data[d, k]``, so the ticker
+    order inside a day is exactly the order ``df.loc[day, :]`` returns. Every
+    day must hold the same number of rows.
+
+    Attributes:
+        data: contiguous array of shape ``[days, tickers, features]``.
+        dates: object array with the date of each day (first row of the day).
+        tics: ticker names in the order of the first day.
+        columns: feature names, in the order of the last axis of ``data``.
+    """
+
+    def __init__(self, data, dates, tics, columns):
+        self.data = data
+        self.dates = dates
+        self.tics = tics
+        self.columns = list(columns)
+        self._col_index = {c: i for i, c in enumerate(self.columns)}
+
+    @classmethod
+    def from_df(
+        cls,
+        df: pd.DataFrame,
+        columns: list[str],
+        day_col: str | None = None,
+        date_col: str = "date",
+        dtype=np.float64,
+    ) -> MarketCube:
+        """Build a cube from ``df``.
+
+        Days are the sorted unique index labels, or the sorted unique values of
+        ``day_col`` when given.
+        """
+        keys = df.index if day_col is None else df[day_col]
+        codes, _ = pd.factorize(keys, sort=True)
+        n_days = codes.max() + 1 if len(codes) else 0
+        counts = np.bincount(codes, minlength=n_days)
+        if len(counts) and not (counts == counts[0]).all():
+            raise ValueError(
+                "every day must have the same number of tickers to build a "
+                f"market cube, got between {counts.min()} and {counts.max()}"
+            )
+        n_tics = int(counts[0]) if len(counts) else 0
+
+        order = np.argsort(codes, kind="stable")
+        values = df[list(columns)].to_numpy(dtype=dtype)[order]
+        data = np.ascontiguousarray(values.reshape(n_days, n_tics, len(columns)))
+
+        first = order[::n_tics] if n_tics else order
+        dates = (
+            np.asarray(list(df[date_col].iloc[first]), dtype=object)
+            if date_col in df.columns
+            else np.arange(n_days).astype(object)
+        )
+        tics = (
+            df["tic"].iloc[order[:n_tics]].to_numpy()
+            if "tic" in df.columns
+            else np.arange(n_tics)
+        )
+        return cls(data, dates, tics, columns)
+
+    @classmethod
+    def pivot(
+        cls,
+        df: pd.DataFrame,
+        columns: list[str],
+        date_col: str = "date",
+        tic_col: str = "tic",
+        dates=None,
+        tics=None,
+        dtype=np.float64,
+    ) -> MarketCube:
+        """Build a cube by pivoting ``df`` on its date and ticker columns.
+
+        Unlike :meth:`from_df`, rows may come in any order and the ticker axis
+        follows ``tics`` (default: order of first appearance). ``dates``
+        defaults to the sorted unique dates. Every ``(date, ticker)`` pair
+        must appear exactly once.
+        """
+        if dates is None:
+            dates = np.sort(df[date_col].unique())
+        if tics is None:
+            tics = df[tic_col].unique()
+        date_codes = pd.Index(dates).get_indexer(df[date_col])
+        tic_codes = pd.Index(tics).get_indexer(df[tic_col])
+        n_cells = len(dates) * len(tics)
+        flat = date_codes * len(tics) + tic_codes
+        if (
+            len(df) != n_cells
+            or (date_codes < 0).any()
+            or (tic_codes < 0).any()
+            or len(np.unique(flat)) != n_cells
+        ):
+            raise ValueError(
+                "every date must have exactly one row per ticker to build a "
+                f"market cube, got {len(df)} rows for {len(dates)} dates x "
+                f"{len(tics)} tickers"
+            )
+        data = np.empty((len(dates), len(tics), len(columns)), dtype=dtype)
+        data.reshape(n_cells, -1)[flat] = df[list(columns)].to_numpy(dtype=dtype)
+        return cls(data, np.asarray(dates), np.asarray(tics), columns)
+
+    @property
+    def n_days(self) -> int:
+        return self.data.shape[0]
+
+    @property
+    def n_tics(self) -> int:
+        return self.data.shape[1]
+
+    def col(self, name: str) -> int:
+        """Position of feature ``name`` on the last axis."""
+        return self._col_index[name]
+
+    def cols(self, names: list[str]) -> np.ndarray:
+        """Positions of features ``names`` on the last axis."""
+        return np.array([self._col_index[n] for n in names], dtype=np.intp)
+
+    def column(self, name: str) -> np.ndarray:
+        """``[days, tickers]`` view of a single feature."""
+        return self.data[:, :, self._col_index[name]]
+
+
+class SparseMarket:
+    """Ragged market data in CSR form, for universes whose members change.
+
+    The tickers active on day ``d`` are ``tic_ids[indptr[d]:indptr[d + 1]]``
+    (sorted ticker numbers into ``tics``) and their features the same rows of
+    ``values``. Only listed ``(date, ticker)`` pairs are stored, so nothing is
+    zero-filled for names that are not (or no longer) trading.
+
+    Attributes:
+        indptr: int array of shape ``[days + 1]``.
+        tic_ids: int array of shape ``[rows]``.
+        values: contiguous array of shape ``[rows, features]``.
+        dates: sorted unique dates.
+        tics: sorted unique ticker names.
+        columns: feature names, in the order of the last axis of ``values``.
+    """
+
+    def __init__(self, indptr, tic_ids, values, dates, tics, columns):
+        self.indptr = indptr
+        self.tic_ids = tic_ids
+        self.values = values
+        self.dates = dates
+        self.tics = tics
+        self.columns = list(columns)
+        self._col_index = {c: i for i, c in enumerate(self.columns)}
+
+    @classmethod
+    def from_df(
+        cls,
+        df: pd.DataFrame,
+        columns: list[str],
+        date_col: str = "date",
+        tic_col: str = "tic",
+        dtype=np.float64,
+    ) -> SparseMarket:
+        """Build the index from the rows of ``df``, in any order. Each
+        ``(date, ticker)`` pair may appear at most once."""
+        date_codes, dates = pd.factorize(df[date_col], sort=True)
+        tic_codes, tics = pd.factorize(df[tic_col], sort=True)
+        order = np.lexsort((tic_codes, date_codes))
+        date_codes, tic_codes = date_codes[order], tic_codes[order]
+        repeated = (date_codes[1:] == date_codes[:-1]) & (
+            tic_codes[1:] == tic_codes[:-1]
+        )
+        if repeated.any():
+            raise ValueError(
+                "every (date, ticker) pair must appear at most once, got "
+                f"{int(repeated.sum())} repeated rows"
+            )
+        indptr = np.zeros(len(dates) + 1, dtype=np.intp)
+        np.cumsum(np.bincount(date_codes, minlength=len(dates)), out=indptr[1:])
+        values = np.ascontiguousarray(df[list(columns)].to_numpy(dtype=dtype)[order])
+        return cls(
+            indptr,
+            tic_codes.astype(np.intp),
+            values,
+            np.asarray(dates),
+            np.asarray(tics),
+            columns,
+        )
+
+    @property
+    def n_days(self) -> int:
+        return len(self.indptr) - 1
+
+    @property
+    def n_tics(self) -> int:
+        return len(self.tics)
+
+    @property
+    def max_active(self) -> int:
+        """Largest number of tickers active on a single day."""
+        return int(np.diff(self.indptr).max(initial=0))
+
+    def day(self, d: int) -> tuple[np.ndarray, np.ndarray]:
+        """``(tic_ids, values)`` views of the tickers active on day ``d``."""
+        rows = slice(self.indptr[d], self.indptr[d + 1])
+        return self.tic_ids[rows], self.values[rows]
+
+    def col(self, name: str) -> int:
+        """Position of feature ``name`` on the last axis."""
+        return self._col_index[name]
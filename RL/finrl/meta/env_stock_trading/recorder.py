@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import numpy as np
+
+RECORD_LEVELS = ("none", "summary", "full")
+
+
+class EpisodeRecorder:
+    """Per-episode history kept in preallocated NumPy buffers.
+
+    ``level`` sets what is kept:
+
+    * ``"none"``: only the initial and latest account value.
+    * ``"summary"``: the account value after every step, enough for the
+      episode Sharpe ratio.
+    * ``"full"``: account values plus dates, unscaled rewards, executed
+      actions and states, i.e. everything ``save_*_memory`` reports.
+
+    Buffers are sized to ``capacity`` account values (one per day of the
+    episode) and double if an episode turns out longer. Accessors return views
+    of the filled part, valid until the next :meth:`reset`.
+    """
+
+    def __init__(self, level: str, capacity: int, action_dim: int, state_dim: int):
+        if level not in RECORD_LEVELS:
+            raise ValueError(f"level must be one of {RECORD_LEVELS}, got {level!r}")
+        self.level = level
+        self.capacity = max(int(capacity), 1)
+        self.action_dim = action_dim
+        self.state_dim = state_dim
+        self.n_steps = 0
+        self.initial_asset = 0.0
+        self.last_asset = 0.0
+        self._assets = self._dates = self._rewards = None
+        self._actions = self._states = None
+        self._allocate(self.capacity)
+
+    def _allocate(self, capacity):
+        if self.level == "none":
+            return
+        self._assets = np.empty(capacity, dtype=np.float64)
+        if self.level == "full":
+            self._dates = np.empty(capacity, dtype=object)
+            self._rewards = np.empty(capacity - 1, dtype=np.float64)
+            self._actions = np.empty((capacity - 1, self.action_dim), dtype=np.int64)
+            self._states = np.empty((capacity - 1, self.state_dim), dtype=np.float64)
+
+    def _grow(self):
+        n = self.n_steps
+        old = (self._assets, self._dates, self._rewards, self._actions, self._states)
+        self.capacity *= 2
+        self._allocate(self.capacity)
+        self._assets[: n + 1] = old[0][: n + 1]
+        if self.level == "full":
+            self._dates[: n + 1] = old[1][: n + 1]
+            self._rewards[:n] = old[2][:n]
+            self._actions[:n] = old[3][:n]
+            self._states[:n] = old[4][:n]
+
+    def reset(self, asset, date=None):
+        """Start a new episode at account value ``asset`` on ``date``."""
+        self.n_steps = 0
+        self.initial_asset = self.last_asset = asset
+        if self._assets is not None:
+            self._assets[0] = asset
+        if self._dates is not None:
+            self._dates[0] = date
+
+    def record(self, asset, date=None, reward=None, action=None, state=None):
+        """Append one step; arguments the level does not keep are ignored."""
+        self.last_asset = asset
+        if self.level == "none":
+            self.n_steps += 1
+            return
+        if self.n_steps + 1 >= self.capacity:
+            self._grow()
+        n = self.n_steps
+        self._assets[n + 1] = asset
+        if self.level == "full":
+            self._dates[n + 1] = date
+            self._rewards[n] = reward
+            self._actions[n] = action
+            self._states[n] = state
+        self.n_steps = n + 1
+
+    @property
+    def assets(self) -> np.ndarray:
+        if self._assets is None:
+            return np.array([self.initial_asset])
+        return self._assets[: self.n_steps + 1]
+
+    @property
+    def dates(self) -> np.ndarray:
+        self._require_full("dates")
+        return self._dates[: self.n_steps + 1]
+
+    @property
+    def rewards(self) -> np.ndarray:
+        self._require_full("rewards")
+        return self._rewards[: self.n_steps]
+
+    @property
+    def actions(self) -> np.ndarray:
+        self._require_full("actions")
+        return self._actions[: self.n_steps]
+
+    @property
+    def states(self) -> np.ndarray:
+        self._require_full("states")
+        return self._states[: self.n_steps]
+
+    def _require_full(self, name):
+        if self.level != "full":
+            raise ValueError(f"{name} are only recorded at level 'full'")
+
+    def sharpe(self, periods: int = 252):
+        """Annualized Sharpe ratio of daily returns, or ``None`` when the level
+        keeps no history or returns have zero (or undefined) spread."""
+        if self.level == "none" or self.n_steps < 2:
+            return None
+        assets = self.assets
+        returns = assets[1:] / assets[:-1] - 1
+        std = returns.std(ddof=1)
+        if not std > 0:
+            return None
+        return periods**0.5 * returns.mean() / std
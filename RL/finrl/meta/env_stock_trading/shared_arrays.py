@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import copy
+from multiprocessing import shared_memory
+
+import numpy as np
+
+_ALIGN = 64
+
+
+class SharedArrays:
+    """Named read-only arrays copied once into a single shared block.
+
+    The block is POSIX shared memory by default, or a memory-mapped file when
+    ``path`` is given. ``handle`` is a small picklable description of the
+    layout; any process can turn it back into zero-copy views with
+    :func:`attach_arrays`. The creating process owns the block and should call
+    :meth:`close` once every worker is done with it.
+    """
+
+    def __init__(self, arrays: dict[str, np.ndarray], path: str | None = None):
+        layout = []
+        offset = 0
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            offset = -(-offset // _ALIGN) * _ALIGN
+            layout.append((name, array.dtype.str, array.shape, offset))
+            offset += array.nbytes
+        size = max(offset, 1)
+
+        self._shm = None
+        if path is None:
+            self._shm = shared_memory.SharedMemory(create=True, size=size)
+            buffer = self._shm.buf
+            location = self._shm.name
+        else:
+            buffer = np.memmap(path, dtype=np.uint8, mode="w+", shape=(size,))
+            location = path
+        for (name, dtype, shape, start), array in zip(layout, arrays.values()):
+            view = np.ndarray(shape, dtype=dtype, buffer=buffer, offset=start)
+            view[...] = array
+        if path is not None:
+            buffer.flush()
+        self.handle = {
+            "location": location,
+            "memmap": path is not None,
+            "size": size,
+            "layout": layout,
+        }
+        self.arrays = attach_arrays(self.handle, _keep=buffer)
+
+    def close(self):
+        """Release and remove the shared block (owner process only)."""
+        self.arrays = None
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+
+def attach_arrays(handle: dict, _keep=None) -> dict[str, np.ndarray]:
+    """Map the block described by ``handle`` and return read-only views.
+
+    The returned dict keeps a reference to the underlying buffer under the
+    ``"__buffer__"`` key so the mapping lives as long as the views do.
+    """
+    if _keep is not None:
+        buffer = _keep
+    elif handle["memmap"]:
+        buffer = np.memmap(
+            handle["location"], dtype=np.uint8, mode="r", shape=(handle["size"],)
+        )
+    else:
+        try:
+            buffer = shared_memory.SharedMemory(name=handle["location"], track=False)
+        except TypeError:
+            # Python < 3.13 registers every attach with the resource tracker.
+            # Worker processes share the owner's tracker, so the duplicate
+            # registration is harmless and must not be undone here.
+            buffer = shared_memory.SharedMemory(name=handle["location"])
+    raw = buffer.buf if isinstance(buffer, shared_memory.SharedMemory) else buffer
+
+    arrays = {"__buffer__": buffer}
+    for name, dtype, shape, start in handle["layout"]:
+        view = np.ndarray(shape, dtype=dtype, buffer=raw, offset=start)
+        view.flags.writeable = False
+        arrays[name] = view
+    return arrays
+
+
+class SharedEnvFactory:
+    """Picklable env constructor for ``SubprocVecEnv`` workers.
+
+    Rebuilds an env from a template's small attributes plus the shared market
+    arrays, without a DataFrame. ``env._attach_market(arrays)`` must install
+    the arrays on the new instance.
+    """
+
+    def __init__(self, env, handle: dict, exclude: tuple[str, ...]):
+        self.env_class = type(env)
+        self.attributes = copy.deepcopy(
+            {k: v for k, v in env.__dict__.items() if k not in exclude}
+        )
+        self.handle = handle
+
+    def __call__(self):
+        env = self.env_class.__new__(self.env_class)
+        env.__dict__.update(copy.deepcopy(self.attributes))
+        env._attach_market(attach_arrays(self.handle))
+        return env
+
+
+def make_shared_env_fns(
+    env,
+    arrays: dict[str, np.ndarray],
+    n: int,
+    path: str | None = None,
+    exclude: tuple[str, ...] | None = None,
+):
+    """Place ``arrays`` in shared memory once and return ``n`` env factories
+    that attach to it, plus the owning :class:`SharedArrays`.
+
+    The template env's attributes named in ``exclude`` (default: the env's
+    ``shared_exclude``, or its DataFrame and cached data) are left out of the
+    factories; only per-episode state is private to each worker.
+    """
+    if exclude is None:
+        exclude = getattr(env, "shared_exclude", ("df", "cached_data"))
+    shared = SharedArrays(arrays, path=path)
+    factory = SharedEnvFactory(env, shared.handle, exclude=exclude)
+    return [factory for _ in range(n)], shared
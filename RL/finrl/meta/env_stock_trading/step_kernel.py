@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+STEP_KERNELS = ("auto", "numba", "numpy")
+
+
+def _trade_step(
+    price,
+    actions,
+    stocks,
+    cooldown,
+    amount,
+    min_action,
+    buy_cost_pct,
+    sell_cost_pct,
+    cap_with_cost,
+    liquidate,
+):
+    """One step of the share orders of the NumPy stock env family.
+
+    Sells every ticker with ``actions < -min_action`` and a positive price
+    (at most the shares held), then buys every ticker with
+    ``actions > min_action`` and a positive price (at most what ``amount``
+    covers at ``price``, or at ``price * (1 + buy_cost_pct)`` with
+    ``cap_with_cost``), both in ticker order. With ``liquidate`` (turbulence)
+    every position is sold instead. Traded tickers get a ``cooldown`` of 0;
+    pass an empty ``cooldown`` to keep none.
+
+    Cash is carried in float64 and every product is taken in float64 (with
+    explicit ``np.float64`` casts: under numba ``float()`` keeps float32), so
+    the compiled and the interpreted kernel give the same bits.
+
+    ``stocks`` and ``cooldown`` are updated in place.
+
+    Returns:
+        The cash after trading, as a float from either kernel.
+    """
+    n = price.shape[0]
+    keep_cooldown = cooldown.shape[0] == n
+    if liquidate:
+        total = np.float64(0.0)
+        for i in range(n):
+            total += np.float64(stocks[i]) * np.float64(price[i])
+        amount += total * (1.0 - sell_cost_pct)
+        for i in range(n):
+            stocks[i] = 0
+        for i in range(cooldown.shape[0]):
+            cooldown[i] = 0
+        return float(amount)
+
+    for i in range(n):
+        p = np.float64(price[i])
+        if actions[i] < -min_action and p > 0:
+            shares = min(np.float64(stocks[i]), -np.float64(actions[i]))
+            stocks[i] = np.float64(stocks[i]) - shares
+            amount += p * shares * (1.0 - sell_cost_pct)
+            if keep_cooldown:
+                cooldown[i] = 0
+    for i in range(n):
+        p = np.float64(price[i])
+        if actions[i] > min_action and p > 0:
+            unit = p * (1.0 + buy_cost_pct) if cap_with_cost else p
+            shares = min(amount // unit, np.float64(actions[i]))
+            stocks[i] = np.float64(stocks[i]) + shares
+            amount -= p * shares * (1.0 + buy_cost_pct)
+            if keep_cooldown:
+                cooldown[i] = 0
+    return float(amount)
+
+
+def _make_batch(step, prange):
+    def trade_step_batch(
+        price,
+        actions,
+        stocks,
+        cooldown,
+        amount,
+        min_action,
+        buy_cost_pct,
+        sell_cost_pct,
+        cap_with_cost,
+        liquidate,
+    ):
+        for i in prange(amount.shape[0]):
+            amount[i] = step(
+                price[i],
+                actions[i],
+                stocks[i],
+                cooldown[i],
+                amount[i],
+                min_action,
+                buy_cost_pct,
+                sell_cost_pct,
+                cap_with_cost,
+                liquidate[i],
+            )
+
+    trade_step_batch.__doc__ = """Batched trade step over ``N`` envs.
+
+    ``price``, ``actions``, ``stocks`` and ``cooldown`` are ``[N, tickers]``
+    (``cooldown`` may be ``[N, 0]``), ``amount`` and ``liquidate`` are
+    ``[N]``. Each row gets exactly the result of the single-env kernel;
+    ``stocks``, ``cooldown`` and ``amount`` are updated in place.
+    """
+    return trade_step_batch
+
+
+_KERNELS = {"numpy": (_trade_step, _make_batch(_trade_step, range))}
+
+
+def get_step_kernel(kernel="auto"):
+    """``(trade_step, trade_step_batch)`` of a backend.
+
+    Args:
+        kernel: "numba" for the compiled kernels (numba must be installed),
+            "numpy" for the interpreted ones, or "auto" for numba when it is
+            installed and numpy otherwise.
+    """
+    if kernel not in STEP_KERNELS:
+        raise ValueError(f"kernel must be one of {STEP_KERNELS}, got {kernel!r}")
+    if kernel == "auto":
+        kernel = "numpy" if numba is None else "numba"
+    if kernel == "numba" and kernel not in _KERNELS:
+        if numba is None:
+            raise ImportError("the numba step kernel needs numba installed")
+        step = numba.njit(cache=True)(_trade_step)
+        batch = numba.njit(parallel=True)(_make_batch(step, numba.prange))
+        _KERNELS["numba"] = (step, batch)
+    return _KERNELS[kernel]
+
+
+def as_kernel_actions(actions):
+    """Actions as the contiguous float64 array the kernels take."""
+    return np.ascontiguousarray(actions, dtype=np.float64)
@@ -118,6 +118,7 @@ class PaperTradingAlpaca:
         self.tech_indicator_list = tech_indicator_list
         self.turbulence_thresh = turbulence_thresh
         self.max_stock = max_stock
+        self.processor = None  # keeps the indicator stream between get_state calls
 
         # initialize account
         self.stocks = np.asarray([0] * len(ticker_list))  # stocks holding
@@ -300,11 +301,13 @@ class PaperTradingAlpaca:
             self.stocks_cd[:] = 0
 
     def get_state(self):
-        alpaca = AlpacaProcessor(api=self.alpaca)
-        price, tech, turbulence = alpaca.fetch_latest_data(
+        if self.processor is None:
+            self.processor = AlpacaProcessor(api=self.alpaca)
+        price, tech, turbulence = self.processor.fetch_latest_data(
             ticker_list=self.stockUniverse,
             time_interval="1Min",
             tech_indicator_list=self.tech_indicator_list,
+            incremental=True,
         )
         turbulence_bool = 1 if turbulence >= self.turbulence_thresh else 0
 
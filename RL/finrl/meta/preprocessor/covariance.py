@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from finrl.meta.env_stock_trading.market_cube import MarketCube
+
+
+def rolling_covariance(returns, lookback, dtype=np.float32, refresh=252):
+    """Sample covariance of every ``lookback``-row window of ``returns``.
+
+    Walks the rows once, keeping the window's column sums and sum of outer
+    products up to date with a rank-1 add of the row entering and a rank-1
+    remove of the row leaving the window. Returns are centered on their
+    overall mean first (covariance is shift invariant), and the sums are
+    recomputed from scratch every ``refresh`` windows, to keep the rounding
+    error of the updates from building up.
+
+    Args:
+        returns: array of shape ``[days, n]``.
+        lookback: window length in rows, at least 2.
+        dtype: dtype of the result.
+        refresh: windows between exact recomputations; None never recomputes.
+
+    Returns:
+        Array of shape ``[days - lookback + 1, n, n]`` whose entry ``k`` is the
+        covariance (``ddof=1``) of rows ``k`` to ``k + lookback - 1``.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    n_days, n = returns.shape
+    if not 2 <= lookback <= n_days:
+        raise ValueError(f"lookback must be between 2 and {n_days}, got {lookback}")
+    x = returns - returns.mean(axis=0)
+    out = np.empty((n_days - lookback + 1, n, n), dtype=dtype)
+    for k in range(len(out)):
+        if k == 0 or (refresh and k % refresh == 0):
+            window = x[k : k + lookback]
+            sums = window.sum(axis=0)
+            products = window.T @ window
+        else:
+            x_in, x_out = x[k + lookback - 1], x[k - 1]
+            sums += x_in - x_out
+            products += np.outer(x_in, x_in)
+            products -= np.outer(x_out, x_out)
+        out[k] = (products - np.outer(sums, sums) / lookback) / (lookback - 1)
+    return out
+
+
+def lookback_covariances(
+    df, lookback=252, price_col="close", date_col="date", tic_col="tic"
+):
+    """Rolling covariance of daily returns for ``StockPortfolioEnv``.
+
+    For each date with ``lookback`` returns behind it, the covariance of the
+    returns of the ``lookback`` previous dates up to and including that date,
+    the same matrices as a per-date ``pivot_table(...).pct_change().cov()``.
+
+    Args:
+        df: long-format frame with one row per date and ticker.
+        lookback: number of returns in each window.
+        price_col: price column the returns are computed from.
+
+    Returns:
+        ``(df, covs)``: the rows of the dates that have a covariance, sorted by
+        date and ticker and indexed by day number like ``data_split``, and a
+        float32 ``[days, n, n]`` array with ``covs[day]`` the covariance of that
+        day, tickers in sorted order.
+    """
+    dates = np.sort(df[date_col].unique())
+    tics = np.sort(df[tic_col].unique())
+    prices = MarketCube.pivot(df, [price_col], date_col, tic_col, dates, tics)
+    prices = prices.data[:, :, 0]
+    returns = prices[1:] / prices[:-1] - 1
+    covs = rolling_covariance(returns, lookback)
+
+    data = df[df[date_col].isin(dates[lookback:])]
+    data = data.sort_values([date_col, tic_col], ignore_index=True)
+    data.index = data[date_col].factorize()[0]
+    return data, covs
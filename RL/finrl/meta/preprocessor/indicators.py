@@ -0,0 +1,282 @@
+"""Technical indicators over ``[time, ticker]`` matrices.
+
+Computes the stockstats (0.5) indicators FinRL uses, for every ticker at
+once, with the same definitions stockstats applies to one ticker's frame:
+
+* ``macd``, ``macds``, ``macdh``: EMA(12) - EMA(26) of close, its EMA(9)
+  signal and their difference.
+* ``boll``, ``boll_ub``, ``boll_lb``: SMA(20) of close -/+ 2 rolling standard
+  deviations (``ddof=1``).
+* ``rsi_N``: ``100 - 100 / (1 + rs)`` with ``rs`` the ratio of the SMMA(N) of
+  up and down moves of close.
+* ``cci_N``: typical price minus its SMA(N), over 0.015 times its rolling mean
+  absolute deviation.
+* ``dx_N``: ``100 * |pdi - ndi| / (pdi + ndi)``, where ``pdi`` and ``ndi``
+  are the EMA(N) of the directional movements over the SMMA(N) of the true
+  range.
+* ``<column>_N_sma``, ``<column>_N_ema`` for close, high and low.
+
+Rolling windows take the partial windows at the start (``min_periods=1``)
+and EWMs are the adjusted pandas ones (``ignore_na=False``); NaN cells (like
+the padding after a ticker's last row) are skipped the way pandas skips them,
+the mean deviation included (stockstats applies it to each window Series).
+The first row follows stockstats too: its change is 0 and its previous close
+is its own close. Later stockstats releases changed several of these
+definitions, so the results match stockstats 0.5 only.
+"""
+from __future__ import annotations
+
+import re
+import warnings
+
+import numpy as np
+import pandas as pd
+
+_COLUMN_STAT = re.compile(r"^(close|high|low)_(\d+)_(sma|ema)$")
+_WINDOWED = re.compile(r"^(rsi|cci|dx)_(\d+)$")
+_FIXED = ("macd", "macds", "macdh", "boll", "boll_ub", "boll_lb")
+
+
+def ewm_step(weighted, old_wt, cur, alpha, adjust=True):
+    """One row of the pandas EWM recursion (``ignore_na=False``).
+
+    ``weighted`` starts as NaN and ``old_wt`` as 1; returns the new
+    ``(weighted, old_wt)``, where ``weighted`` is also the row's mean.
+    """
+    new_wt = 1.0 if adjust else alpha
+    observed = ~np.isnan(cur)
+    started = ~np.isnan(weighted)
+    old_wt = np.where(started, old_wt * (1.0 - alpha), old_wt)
+    with np.errstate(invalid="ignore"):
+        mixed = (old_wt * weighted + new_wt * cur) / (old_wt + new_wt)
+    grow = started & observed
+    weighted = np.where(grow & (weighted != cur), mixed, weighted)
+    old_wt = np.where(grow, old_wt + new_wt if adjust else 1.0, old_wt)
+    weighted = np.where(~started & observed, cur, weighted)
+    return weighted, old_wt
+
+
+def ewm_mean(x, alpha, adjust=True):
+    """``pd.DataFrame(x).ewm(alpha=alpha, adjust=adjust).mean()`` along axis 0,
+    with the same recursion (and rounding) as pandas."""
+    x = np.asarray(x, dtype=np.float64)
+    out = np.empty_like(x)
+    weighted = np.full(x.shape[1:], np.nan)
+    old_wt = np.ones(x.shape[1:])
+    for t in range(len(x)):
+        weighted, old_wt = ewm_step(weighted, old_wt, x[t], alpha, adjust)
+        out[t] = weighted
+    return out
+
+
+def ema(x, window):
+    return ewm_mean(x, 2.0 / (window + 1))
+
+
+def smma(x, window):
+    return ewm_mean(x, 1.0 / window)
+
+
+def _mad(windows):
+    mean = np.nanmean(windows, axis=-1, keepdims=True)
+    return np.nanmean(np.abs(windows - mean), axis=-1)
+
+
+ROLLING_STATS = {
+    "mean": lambda w: np.nanmean(w, axis=-1),
+    "std": lambda w: np.nanstd(w, axis=-1, ddof=1),
+    "mad": _mad,
+}
+
+
+def rolling(x, window, stat, chunk=256):
+    """Rolling ``stat`` ("mean", "std" or "mad") of ``window`` rows along axis
+    0, over the non-NaN cells of each window (``min_periods=1``).
+
+    Windows are strided views of ``x`` padded with ``window - 1`` NaN rows, and
+    are reduced ``chunk`` rows at a time to bound the temporary memory.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    fn = ROLLING_STATS[stat]
+    padded = np.concatenate([np.full((window - 1,) + x.shape[1:], np.nan), x])
+    windows = np.lib.stride_tricks.sliding_window_view(padded, window, axis=0)
+    out = np.empty_like(x)
+    with warnings.catch_warnings(), np.errstate(invalid="ignore", divide="ignore"):
+        warnings.simplefilter("ignore", RuntimeWarning)
+        for start in range(0, len(x), chunk):
+            out[start : start + chunk] = fn(windows[start : start + chunk])
+    return out
+
+
+def _shift(x):
+    # previous row, the first row filled with itself
+    return np.concatenate([x[:1], x[:-1]])
+
+
+def _delta(x):
+    # change from the previous row, 0 where undefined
+    d = np.concatenate([np.zeros_like(x[:1]), np.diff(x, axis=0)])
+    return np.where(np.isnan(d), 0.0, d)
+
+
+def _divide(a, b):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return a / b
+
+
+def rsi_from_smma(up, down):
+    # RSI from the smoothed up and down moves
+    rs = _divide(up, down)
+    with np.errstate(invalid="ignore"):
+        return 100 - 100 / (1.0 + rs)
+
+
+def cci_from_stats(tp, mean, mad):
+    # CCI from the typical price and its rolling mean and mean deviation
+    return _divide(tp - mean, 0.015 * mad)
+
+
+def directional_moves(high_delta, low_delta):
+    # +DM and -DM from the changes of high and low
+    hd, ld = high_delta, -low_delta
+    return ((hd > 0) & (hd > ld)) * hd, ((ld > 0) & (ld > hd)) * ld
+
+
+def true_range(high, low, prev_close):
+    return np.fmax(
+        np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close)
+    )
+
+
+def dx_from_smoothed(pdm, ndm, atr):
+    # DX from the smoothed directional moves and average true range
+    pdi = _divide(pdm, atr) * 100
+    ndi = _divide(ndm, atr) * 100
+    return _divide(np.abs(pdi - ndi), pdi + ndi) * 100
+
+
+def _rsi(close, window):
+    change = _delta(close)
+    up = (change + np.abs(change)) / 2
+    down = (-change + np.abs(change)) / 2
+    return rsi_from_smma(smma(up, window), smma(down, window))
+
+
+def _cci(close, high, low, window):
+    tp = (close + high + low) / 3.0
+    return cci_from_stats(tp, rolling(tp, window, "mean"), rolling(tp, window, "mad"))
+
+
+def _dx(close, high, low, window):
+    pdm, ndm = directional_moves(_delta(high), _delta(low))
+    atr = smma(true_range(high, low, _shift(close)), window)
+    return dx_from_smoothed(ema(pdm, window), ema(ndm, window), atr)
+
+
+def parse_indicator(name):
+    """``(kind, column, window)`` of an indicator name: ``kind`` is the name
+    itself for the macd and boll families, else "rsi", "cci", "dx", "sma" or
+    "ema"; ``column`` is the price column of "sma" and "ema"."""
+    if name in _FIXED:
+        return name, None, None
+    if match := _WINDOWED.match(name):
+        return match.group(1), None, int(match.group(2))
+    if match := _COLUMN_STAT.match(name):
+        return match.group(3), match.group(1), int(match.group(2))
+    raise ValueError(f"unsupported indicator {name!r}")
+
+
+def required_columns(name):
+    """Price columns an indicator is computed from."""
+    kind, column, _ = parse_indicator(name)
+    if kind in ("cci", "dx"):
+        return ("close", "high", "low")
+    return (column or "close",)
+
+
+def compute_indicators(names, close, high=None, low=None) -> dict:
+    """Indicators ``names`` of ``[time, ticker]`` price matrices.
+
+    Args:
+        names: indicator names, see the module docstring.
+        close, high, low: float arrays of the same shape; ``high`` and ``low``
+            are only needed by ``cci_N``, ``dx_N`` and their own columns.
+
+    Returns:
+        Dict of name -> float64 array shaped like ``close``.
+    """
+    columns = {
+        k: None if v is None else np.asarray(v, dtype=np.float64)
+        for k, v in {"close": close, "high": high, "low": low}.items()
+    }
+    for name in names:
+        for column in required_columns(name):
+            if columns[column] is None:
+                raise ValueError(f"indicator {name!r} needs {column} prices")
+    close, high, low = columns["close"], columns["high"], columns["low"]
+    cache = {}
+
+    def cached(key, fn):
+        if key not in cache:
+            cache[key] = fn()
+        return cache[key]
+
+    out = {}
+    for name in names:
+        kind, column, window = parse_indicator(name)
+        if kind in ("macd", "macds", "macdh"):
+            macd = cached("macd", lambda: ema(close, 12) - ema(close, 26))
+            signal = cached("macds", lambda: ema(macd, 9))
+            out[name] = {"macd": macd, "macds": signal, "macdh": macd - signal}[kind]
+        elif kind in ("boll", "boll_ub", "boll_lb"):
+            mean = cached("boll", lambda: rolling(close, 20, "mean"))
+            width = cached("boll_width", lambda: 2 * rolling(close, 20, "std"))
+            out[name] = {"boll": mean, "boll_ub": mean + width, "boll_lb": mean - width}[
+                kind
+            ]
+        elif kind == "rsi":
+            out[name] = _rsi(close, window)
+        elif kind == "cci":
+            out[name] = _cci(close, high, low, window)
+        elif kind == "dx":
+            out[name] = _dx(close, high, low, window)
+        elif kind == "sma":
+            out[name] = rolling(columns[column], window, "mean")
+        else:
+            out[name] = ema(columns[column], window)
+    return out
+
+
+def indicator_frame(df, names, time_col="date", tic_col="tic") -> pd.DataFrame:
+    """Indicators ``names`` of every ticker of a long-format frame.
+
+    Row ``k`` of the time axis is each ticker's ``k``-th row in time order, so
+    tickers with different histories are computed over their own rows only,
+    as stockstats does on one ticker's frame.
+
+    Returns:
+        Frame with one column per indicator, indexed like ``df``.
+    """
+    tic_codes, _ = pd.factorize(df[tic_col])
+    time_codes, _ = pd.factorize(df[time_col], sort=True)
+    order = np.lexsort((time_codes, tic_codes))
+    tics = tic_codes[order]
+    counts = np.bincount(tics)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    rows = np.arange(len(order)) - starts[tics]
+    shape = (int(counts.max(initial=0)), len(counts))
+
+    def matrix(column):
+        if column not in df.columns:
+            return None
+        m = np.full(shape, np.nan)
+        m[rows, tics] = df[column].to_numpy(dtype=np.float64)[order]
+        return m
+
+    values = compute_indicators(
+        names, matrix("close"), high=matrix("high"), low=matrix("low")
+    )
+    result = np.empty((len(df), len(names)))
+    for j, name in enumerate(names):
+        result[order, j] = values[name][rows, tics]
+    return pd.DataFrame(result, index=df.index, columns=list(names))
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import datetime
+import os
+from concurrent.futures import ProcessPoolExecutor
 
 import numpy as np
 import pandas as pd
@@ -10,6 +12,8 @@ from sklearn.preprocessing import MaxAbsScaler
 from stockstats import StockDataFrame as Sdf
 
 from finrl import config
+from finrl.meta.preprocessor.indicators import indicator_frame
+from finrl.meta.preprocessor.turbulence import calculate_turbulence
 from finrl.meta.preprocessor.yahoodownloader import YahooDownloader
 
 
@@ -41,6 +45,19 @@ def convert_to_datetime(time):
         return datetime.datetime.strptime(time, time_fmt)
 
 
+def _ticker_indicators(args):
+    # all indicators of one ticker's rows, indexed like the rows
+    group, indicators = args
+    stock = Sdf.retype(group.copy())
+    out = pd.DataFrame(index=group.index)
+    for indicator in indicators:
+        try:
+            out[indicator] = stock[indicator].to_numpy()
+        except Exception as e:
+            print(e)
+    return out
+
+
 class GroupByScaler(BaseEstimator, TransformerMixin):
     """Sklearn-like scaler that scales considering groups of data.
 
@@ -116,6 +133,11 @@ class FeatureEngineer:
             use turbulence index or not
         user_defined_feature:boolean
             use user defined features or not
+        n_jobs : int or None
+            processes computing technical indicators (None: one per CPU)
+        indicator_engine : str
+            "stockstats", or "native" to compute every ticker at once with
+            finrl.meta.preprocessor.indicators (stockstats 0.5 definitions)
 
     Methods
     -------
@@ -131,12 +153,21 @@ class FeatureEngineer:
         use_vix=False,
         use_turbulence=False,
         user_defined_feature=False,
+        n_jobs=1,
+        indicator_engine="stockstats",
     ):
+        if indicator_engine not in ("stockstats", "native"):
+            raise ValueError(
+                f"indicator_engine must be 'stockstats' or 'native', "
+                f"got {indicator_engine!r}"
+            )
         self.use_technical_indicator = use_technical_indicator
         self.tech_indicator_list = tech_indicator_list
         self.use_vix = use_vix
         self.use_turbulence = use_turbulence
         self.user_defined_feature = user_defined_feature
+        self.n_jobs = n_jobs
+        self.indicator_engine = indicator_engine
 
     def preprocess_data(self, df):
         """main method to do the feature engineering
@@ -201,40 +232,36 @@ class FeatureEngineer:
         """
         calculate technical indicators
         use stockstats package to add technical inidactors
+        every indicator of a ticker is computed on one stockstats frame of
+        that ticker; tickers run in ``n_jobs`` processes. The "native"
+        engine computes them for all tickers at once instead
         :param data: (df) pandas dataframe
         :return: (df) pandas dataframe
         """
-        df = data.copy()
-        df = df.sort_values(by=["tic", "date"])
-        stock = Sdf.retype(df.copy())
-        unique_ticker = stock.tic.unique()
-
-        for indicator in self.tech_indicator_list:
-            indicator_df = pd.DataFrame()
-            for i in range(len(unique_ticker)):
-                try:
-                    temp_indicator = stock[stock.tic == unique_ticker[i]][indicator]
-                    temp_indicator = pd.DataFrame(temp_indicator)
-                    temp_indicator["tic"] = unique_ticker[i]
-                    temp_indicator["date"] = df[df.tic == unique_ticker[i]][
-                        "date"
-                    ].to_list()
-                    # indicator_df = indicator_df.append(
-                    #     temp_indicator, ignore_index=True
-                    # )
-                    indicator_df = pd.concat(
-                        [indicator_df, temp_indicator], axis=0, ignore_index=True
-                    )
-                except Exception as e:
-                    print(e)
-            df = df.merge(
-                indicator_df[["tic", "date", indicator]], on=["tic", "date"], how="left"
-            )
+        df = data.sort_values(by=["tic", "date"]).reset_index(drop=True)
+        if self.indicator_engine == "native":
+            indicators = indicator_frame(df, self.tech_indicator_list)
+            df[self.tech_indicator_list] = indicators.to_numpy()
+            return df.sort_values(by=["date", "tic"])
+        groups = [
+            (group, self.tech_indicator_list)
+            for _, group in df.groupby("tic", sort=False)
+        ]
+        n_jobs = self.n_jobs or os.cpu_count() or 1
+        if n_jobs == 1 or len(groups) < 2:
+            parts = [_ticker_indicators(group) for group in groups]
+        else:
+            with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+                chunksize = max(1, len(groups) // (4 * n_jobs))
+                parts = list(
+                    executor.map(_ticker_indicators, groups, chunksize=chunksize)
+                )
+        indicators = pd.concat(parts).reindex(
+            index=df.index, columns=self.tech_indicator_list
+        )
+        df[self.tech_indicator_list] = indicators.to_numpy()
         df = df.sort_values(by=["date", "tic"])
         return df
-        # df = data.set_index(['date','tic']).sort_index()
-        # df = df.join(df.groupby(level=0, group_keys=False).apply(lambda x, y: Sdf.retype(x)[y], y=self.tech_indicator_list))
-        # return df.reset_index()
 
     def add_user_defined_feature(self, data):
         """
@@ -282,53 +309,4 @@ class FeatureEngineer:
     def calculate_turbulence(self, data):
         """calculate turbulence index based on dow 30"""
         # can add other market assets
-        df = data.copy()
-        df_price_pivot = df.pivot(index="date", columns="tic", values="close")
-        # use returns to calculate turbulence
-        df_price_pivot = df_price_pivot.pct_change()
-
-        unique_date = df.date.unique()
-        # start after a year
-        start = 252
-        turbulence_index = [0] * start
-        # turbulence_index = [0]
-        count = 0
-        for i in range(start, len(unique_date)):
-            current_price = df_price_pivot[df_price_pivot.index == unique_date[i]]
-            # use one year rolling window to calcualte covariance
-            hist_price = df_price_pivot[
-                (df_price_pivot.index < unique_date[i])
-                & (df_price_pivot.index >= unique_date[i - 252])
-            ]
-            # Drop tickers which has number missing values more than the "oldest" ticker
-            filtered_hist_price = hist_price.iloc[
-                hist_price.isna().sum().min() :
-            ].dropna(axis=1)
-
-            cov_temp = filtered_hist_price.cov()
-            current_temp = current_price[[x for x in filtered_hist_price]] - np.mean(
-                filtered_hist_price, axis=0
-            )
-            # cov_temp = hist_price.cov()
-            # current_temp=(current_price - np.mean(hist_price,axis=0))
-
-            temp = current_temp.values.dot(np.linalg.pinv(cov_temp)).dot(
-                current_temp.values.T
-            )
-            if temp > 0:
-                count += 1
-                if count > 2:
-                    turbulence_temp = temp[0][0]
-                else:
-                    # avoid large outlier because of the calculation just begins
-                    turbulence_temp = 0
-            else:
-                turbulence_temp = 0
-            turbulence_index.append(turbulence_temp)
-        try:
-            turbulence_index = pd.DataFrame(
-                {"date": df_price_pivot.index, "turbulence": turbulence_index}
-            )
-        except ValueError:
-            raise Exception("Turbulence information could not be added.")
-        return turbulence_index
+        return calculate_turbulence(data, time_period=252, n_jobs=self.n_jobs)
@@ -0,0 +1,308 @@
+"""Technical indicators updated one bar at a time.
+
+:class:`IndicatorStream` carries, for every ticker, the state the batch
+computation of :mod:`finrl.meta.preprocessor.indicators` passes from one row
+to the next (EWM weights, the last rolling window, the previous prices), so a
+new bar costs O(1) per ticker (O(window) for rolling statistics) and gives
+the values ``compute_indicators`` gives for the last row of the same history.
+:class:`LiveBars` feeds it from the long-format bar frames of the data
+processors, for paper trading.
+"""
+from __future__ import annotations
+
+import copy
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from finrl.meta.preprocessor.indicators import cci_from_stats
+from finrl.meta.preprocessor.indicators import directional_moves
+from finrl.meta.preprocessor.indicators import dx_from_smoothed
+from finrl.meta.preprocessor.indicators import ewm_step
+from finrl.meta.preprocessor.indicators import parse_indicator
+from finrl.meta.preprocessor.indicators import required_columns
+from finrl.meta.preprocessor.indicators import ROLLING_STATS
+from finrl.meta.preprocessor.indicators import rsi_from_smma
+from finrl.meta.preprocessor.indicators import true_range
+
+
+class _Ewm:
+    def __init__(self, alpha, n):
+        self.alpha = alpha
+        self.weighted = np.full(n, np.nan)
+        self.old_wt = np.ones(n)
+
+    def update(self, x):
+        self.weighted, self.old_wt = ewm_step(
+            self.weighted, self.old_wt, x, self.alpha
+        )
+        return self.weighted
+
+
+def _ema(window, n):
+    return _Ewm(2.0 / (window + 1), n)
+
+
+def _smma(window, n):
+    return _Ewm(1.0 / window, n)
+
+
+class _Window:
+    # the last ``window`` rows, in a ring buffer
+    def __init__(self, window, n):
+        self.buffer = np.full((window, n), np.nan)
+        self.pos = 0
+
+    def update(self, x):
+        self.buffer[self.pos] = x
+        self.pos = (self.pos + 1) % len(self.buffer)
+
+    def stat(self, stat):
+        with warnings.catch_warnings(), np.errstate(invalid="ignore", divide="ignore"):
+            warnings.simplefilter("ignore", RuntimeWarning)
+            return ROLLING_STATS[stat](self.buffer.T)
+
+
+class _Delta:
+    # change from the previous bar, 0 where undefined
+    def __init__(self, n):
+        self.prev = np.full(n, np.nan)
+
+    def update(self, x):
+        d = x - self.prev
+        self.prev = x
+        return np.where(np.isnan(d), 0.0, d)
+
+
+class _Macd:
+    def __init__(self, n):
+        self.fast, self.slow, self.signal = _ema(12, n), _ema(26, n), _ema(9, n)
+
+    def update(self, bar):
+        macd = self.fast.update(bar["close"]) - self.slow.update(bar["close"])
+        signal = self.signal.update(macd)
+        return {"macd": macd, "macds": signal, "macdh": macd - signal}
+
+
+class _Boll:
+    def __init__(self, n):
+        self.window = _Window(20, n)
+
+    def update(self, bar):
+        self.window.update(bar["close"])
+        mean = self.window.stat("mean")
+        width = 2 * self.window.stat("std")
+        return {"boll": mean, "boll_ub": mean + width, "boll_lb": mean - width}
+
+
+class _Rsi:
+    def __init__(self, window, n):
+        self.delta = _Delta(n)
+        self.up, self.down = _smma(window, n), _smma(window, n)
+
+    def update(self, bar):
+        change = self.delta.update(bar["close"])
+        up = self.up.update((change + np.abs(change)) / 2)
+        down = self.down.update((-change + np.abs(change)) / 2)
+        return rsi_from_smma(up, down)
+
+
+class _Cci:
+    def __init__(self, window, n):
+        self.window = _Window(window, n)
+
+    def update(self, bar):
+        tp = (bar["close"] + bar["high"] + bar["low"]) / 3.0
+        self.window.update(tp)
+        return cci_from_stats(tp, self.window.stat("mean"), self.window.stat("mad"))
+
+
+class _Dx:
+    def __init__(self, window, n):
+        self.high, self.low = _Delta(n), _Delta(n)
+        self.pdm, self.ndm, self.atr = _ema(window, n), _ema(window, n), _smma(window, n)
+        self.prev_close = None
+
+    def update(self, bar):
+        close, high, low = bar["close"], bar["high"], bar["low"]
+        prev_close = close if self.prev_close is None else self.prev_close
+        self.prev_close = close
+        pdm, ndm = directional_moves(self.high.update(high), self.low.update(low))
+        return dx_from_smoothed(
+            self.pdm.update(pdm),
+            self.ndm.update(ndm),
+            self.atr.update(true_range(high, low, prev_close)),
+        )
+
+
+class _Sma:
+    def __init__(self, column, window, n):
+        self.column = column
+        self.window = _Window(window, n)
+
+    def update(self, bar):
+        self.window.update(bar[self.column])
+        return self.window.stat("mean")
+
+
+class _ColumnEma:
+    def __init__(self, column, window, n):
+        self.column = column
+        self.ewm = _ema(window, n)
+
+    def update(self, bar):
+        return self.ewm.update(bar[self.column])
+
+
+def _component(kind, column, window, n):
+    if kind.startswith("macd"):
+        return _Macd(n)
+    if kind.startswith("boll"):
+        return _Boll(n)
+    if kind == "sma":
+        return _Sma(column, window, n)
+    if kind == "ema":
+        return _ColumnEma(column, window, n)
+    return {"rsi": _Rsi, "cci": _Cci, "dx": _Dx}[kind](window, n)
+
+
+class IndicatorStream:
+    """Indicators of the latest bar of ``n_tics`` tickers.
+
+    Args:
+        names: indicator names, as for ``indicators.compute_indicators``.
+        n_tics: number of tickers; every update takes one bar of each.
+
+    Example
+    -------
+        stream = IndicatorStream(["macd", "rsi_30"], n_tics=2)
+        stream.warm(close_history, high_history, low_history)  # [T, 2]
+        values = stream.update(close, high, low)  # [2, 2]: tickers x names
+    """
+
+    def __init__(self, names, n_tics):
+        self.names = list(names)
+        self.n_tics = n_tics
+        self.columns = sorted({c for name in self.names for c in required_columns(name)})
+        self._components = {}
+        self._outputs = []  # (component key, output field or None)
+        for name in self.names:
+            kind, column, window = parse_indicator(name)
+            if kind.startswith(("macd", "boll")):
+                key, field = kind[:4], kind
+            else:
+                key, field = name, None
+            if key not in self._components:
+                self._components[key] = _component(kind, column, window, n_tics)
+            self._outputs.append((key, field))
+        self.values = np.full((n_tics, len(self.names)), np.nan)
+
+    def update(self, close, high=None, low=None) -> np.ndarray:
+        """Add one bar of every ticker.
+
+        Returns:
+            ``[n_tics, len(names)]`` indicators of this bar (also kept in
+            ``values``).
+        """
+        bar = {"close": close, "high": high, "low": low}
+        for column in self.columns:
+            if bar[column] is None:
+                raise ValueError(f"indicators {self.names} need {column} prices")
+            bar[column] = np.asarray(bar[column], dtype=np.float64)
+        results = {key: c.update(bar) for key, c in self._components.items()}
+        for j, (key, field) in enumerate(self._outputs):
+            result = results[key]
+            self.values[:, j] = result if field is None else result[field]
+        return self.values
+
+    def warm(self, close, high=None, low=None) -> np.ndarray:
+        """Add the bars of ``[time, ticker]`` price histories in time order."""
+        for t in range(len(close)):
+            self.update(
+                close[t],
+                None if high is None else high[t],
+                None if low is None else low[t],
+            )
+        return self.values
+
+
+class LiveBars:
+    """An :class:`IndicatorStream` fed with long-format bar frames.
+
+    ``update`` takes the bars of a frame (columns ``time_col``, "tic" and the
+    prices) that are not older than the last bar fed, so a live loop can warm
+    it with the history once and then pass only the latest download. A ticker
+    without a bar at a timestamp repeats its previous close, as the
+    processors' minute grid does.
+
+    The newest bar may still be forming, so it only enters the stream once a
+    later bar arrives; until then ``price`` and ``tech`` come from a copy of
+    the stream with that bar added, and a later download of the same
+    timestamp replaces it.
+
+    Attributes
+    ----------
+        price: np.ndarray
+            latest close of every ticker, in ``tics`` order
+        last_time:
+            timestamp of the latest bar fed, the one that may still change
+    """
+
+    def __init__(self, tics, names, time_col="timestamp"):
+        self.tics = list(tics)
+        self.names = list(names)
+        self.time_col = time_col
+        self.stream = IndicatorStream(names, len(self.tics))
+        self.price = np.full(len(self.tics), np.nan)
+        self.last_time = None
+        self._close = self.price  # close of the last bar in the stream
+        self._latest = self.stream  # the stream with the newest bar added
+        self._pending = None  # rows of the newest bar
+
+    def matches(self, tics, names) -> bool:
+        return self.tics == list(tics) and self.names == list(names)
+
+    @property
+    def tech(self) -> np.ndarray:
+        """Latest indicators, ticker-major like the processors' ``df_to_array``."""
+        return self._latest.values.ravel().copy()
+
+    def update(self, df):
+        if self.last_time is not None:
+            df = df[df[self.time_col] >= self.last_time]
+        if self._pending is not None:
+            # a newer download of the pending bar comes last and wins
+            df = pd.concat([self._pending, df])
+        if df.empty:
+            return
+        columns = ["close"] + [c for c in ("high", "low") if c in self.stream.columns]
+        wide = df.pivot_table(
+            index=self.time_col, columns="tic", values=columns, aggfunc="last"
+        ).sort_index()
+        close = wide["close"].reindex(columns=self.tics).to_numpy(dtype=np.float64)
+        missing = np.isnan(close)
+        close = (
+            pd.DataFrame(np.vstack([self._close, close])).ffill().to_numpy()[1:]
+        )
+        prices = {"close": close}
+        for column in columns[1:]:
+            values = wide[column].reindex(columns=self.tics).to_numpy(dtype=np.float64)
+            prices[column] = np.where(missing, close, values)
+        high, low = prices.get("high"), prices.get("low")
+        self.stream.warm(
+            close[:-1],
+            None if high is None else high[:-1],
+            None if low is None else low[:-1],
+        )
+        if len(close) > 1:
+            self._close = close[-2]
+        self._latest = copy.deepcopy(self.stream)
+        self._latest.update(
+            close[-1],
+            None if high is None else high[-1],
+            None if low is None else low[-1],
+        )
+        self.price = close[-1]
+        self.last_time = wide.index[-1]
+        self._pending = df[df[self.time_col] == self.last_time]
@@ -0,0 +1,154 @@
+"""Turbulence index shared by ``FeatureEngineer`` and the data processors.
+
+The turbulence of a date is the Mahalanobis distance of its returns from the
+mean returns of the ``time_period`` dates before it, under their covariance.
+As in the original per-date loop, a window first drops its leading rows up to
+the smallest number of missing returns of a ticker, then the tickers that
+still miss a return; the first two positive values are set to 0.
+
+The window sums and sums of outer products are updated as the window slides
+(rows entering and leaving, recomputed every ``refresh`` dates), and each
+distance is solved through a Cholesky factorization of the covariance.
+Covariances that are not positive definite, or whose smallest pivot is below
+``MIN_PIVOT``, fall back to the pseudo-inverse of the covariance computed from
+the window itself, as the loop did.
+"""
+from __future__ import annotations
+
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.linalg import solve_triangular
+
+# smallest squared Cholesky pivot, relative to the largest variance, of a
+# covariance solved through its factorization
+MIN_PIVOT = 1e-10
+
+
+def _pinv_distance(window, current):
+    # the original loop's arithmetic, so pinv cuts the same singular values
+    d = current - window.mean(axis=0)
+    cov = np.atleast_2d(np.cov(window, rowvar=False))
+    return float(d @ np.linalg.pinv(cov) @ d)
+
+
+def _mahalanobis(sums, products, n, current, fallback):
+    if len(sums) == 0:
+        return 0.0
+    if n < 2 or np.isnan(current).any():
+        return np.nan
+    mean = sums / n
+    cov = (products - np.outer(sums, mean)) / (n - 1)
+    d = current - mean
+    if n > len(sums):  # else the covariance is singular by construction
+        try:
+            factor = np.linalg.cholesky(cov)
+        except np.linalg.LinAlgError:
+            factor = None
+        # the smallest eigenvalue is at most the smallest squared pivot; below
+        # MIN_PIVOT the running sums are too coarse for it and pinv may cut it
+        if (
+            factor is not None
+            and np.diag(factor).min() ** 2 > MIN_PIVOT * cov.diagonal().max()
+        ):
+            y = solve_triangular(factor, d, lower=True)
+            return float(y @ y)
+    return fallback()
+
+
+def _window_turbulence(args):
+    # distances of dates [start, stop), before the positive-count rule
+    returns, centered, missing, time_period, start, stop, refresh = args
+    x = np.nan_to_num(centered, nan=0.0)
+    out = np.empty(stop - start)
+    lo = hi = None
+    for i, k in enumerate(range(start, stop)):
+        counts = missing[k] - missing[k - time_period]
+        a = k - time_period + counts.min()
+        cols = np.flatnonzero(missing[k] == missing[a])
+        if lo is None or (refresh and i % refresh == 0):
+            window = x[a:k]
+            sums = window.sum(axis=0)
+            products = window.T @ window
+        else:
+            entering, leaving = x[hi:k], x[lo:a]
+            sums += entering.sum(axis=0) - leaving.sum(axis=0)
+            products += entering.T @ entering - leaving.T @ leaving
+        lo, hi = a, k
+        out[i] = _mahalanobis(
+            sums[cols],
+            products[np.ix_(cols, cols)],
+            k - a,
+            centered[k, cols],
+            lambda: _pinv_distance(returns[a:k, cols], returns[k, cols]),
+        )
+    return out
+
+
+def turbulence_index(returns, time_period=252, n_jobs=1, refresh=252):
+    """Turbulence of every row of a ``[dates, tickers]`` return matrix.
+
+    Args:
+        returns: returns with NaN where a ticker has none.
+        time_period: dates in the window before each date.
+        n_jobs: processes computing contiguous chunks of dates (None: one per
+            CPU).
+        refresh: dates between exact recomputations of the window sums.
+
+    Returns:
+        Array of one value per row, 0 for the first ``time_period`` rows.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    n_dates = len(returns)
+    out = np.zeros(n_dates)
+    if n_dates <= time_period:
+        return out
+    # distances are shift invariant; centering each ticker keeps the running
+    # sums small
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        centered = returns - np.nanmean(returns, axis=0)
+    missing = np.zeros((n_dates + 1, returns.shape[1]), dtype=np.int64)
+    np.cumsum(np.isnan(returns), axis=0, out=missing[1:])
+
+    n_jobs = n_jobs or os.cpu_count() or 1
+    n_chunks = min(n_jobs, n_dates - time_period)
+    bounds = np.linspace(time_period, n_dates, n_chunks + 1).astype(int)
+    chunks = [
+        (returns, centered, missing, time_period, start, stop, refresh)
+        for start, stop in zip(bounds[:-1], bounds[1:])
+    ]
+    if len(chunks) == 1:
+        parts = [_window_turbulence(chunks[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=len(chunks)) as executor:
+            parts = list(executor.map(_window_turbulence, chunks))
+    raw = np.concatenate(parts)
+
+    positive = raw > 0
+    # avoid large outlier because of the calculation just begins
+    keep = positive & (np.cumsum(positive) > 2)
+    out[time_period:] = np.where(keep, raw, 0)
+    return out
+
+
+def calculate_turbulence(
+    data,
+    time_period=252,
+    time_col="date",
+    price_col="close",
+    tic_col="tic",
+    n_jobs=1,
+):
+    """Turbulence of every date of a long-format price frame.
+
+    Returns:
+        Frame with columns ``time_col`` (sorted) and "turbulence".
+    """
+    prices = data.pivot(index=time_col, columns=tic_col, values=price_col)
+    returns = prices.pct_change()
+    turbulence = turbulence_index(returns.to_numpy(), time_period, n_jobs=n_jobs)
+    return pd.DataFrame({time_col: prices.index, "turbulence": turbulence})
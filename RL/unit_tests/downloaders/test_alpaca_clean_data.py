@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from finrl.meta.data_processors.processor_alpaca import AlpacaProcessor
+
+NY = "America/New_York"
+TRADING_DAYS = ["2024-03-08", "2024-03-11"]
+OHLCV = ["open", "high", "low", "close", "volume"]
+
+
+def loop_clean(df, times):
+    # the per-ticker loop clean_data used before, after aligning the dates
+    n_tickers = len(np.unique(df.tic.values))
+    df = df[df.groupby("timestamp")["tic"].transform("count") >= n_tickers]
+    results = []
+    for tic in np.unique(df.tic.values):
+        tmp_df = pd.DataFrame(index=times).merge(
+            df[df.tic == tic].set_index("timestamp")[OHLCV],
+            left_index=True,
+            right_index=True,
+            how="left",
+        )
+        if pd.isna(tmp_df.iloc[0]["close"]):
+            first_valid_index = tmp_df["close"].first_valid_index()
+            if first_valid_index is not None:
+                tmp_df.iloc[0] = [tmp_df.loc[first_valid_index, "close"]] * 4 + [0.0]
+            else:
+                tmp_df.iloc[0] = [0.0] * 5
+        for i in range(1, tmp_df.shape[0]):
+            if pd.isna(tmp_df.iloc[i]["close"]):
+                tmp_df.iloc[i] = [tmp_df.iloc[i - 1]["close"]] * 4 + [0.0]
+        tmp_df = tmp_df.astype(float)
+        tmp_df["tic"] = tic
+        results.append(tmp_df)
+    new_df = pd.concat(results).reset_index()
+    return new_df.rename(columns={"index": "timestamp"})
+
+
+@pytest.fixture
+def processor():
+    processor = AlpacaProcessor(client=object())
+    processor.start, processor.end = TRADING_DAYS[0], TRADING_DAYS[-1]
+    processor.get_trading_days = lambda start, end: TRADING_DAYS
+    return processor
+
+
+@pytest.fixture
+def times():
+    times = []
+    for day in TRADING_DAYS:
+        current_time = pd.Timestamp(day + " 09:30:00").tz_localize(NY)
+        for _ in range(390):
+            times.append(current_time)
+            current_time += pd.Timedelta(minutes=1)
+    return times
+
+
+@pytest.fixture
+def bars(times):
+    rng = np.random.default_rng(0)
+    minutes = pd.DatetimeIndex(times)
+    frames = []
+    for tic in ["AAA", "BBB", "CCC"]:
+        close = 100 + rng.normal(size=len(minutes)).cumsum()
+        frames.append(
+            pd.DataFrame(
+                {
+                    "timestamp": minutes,
+                    "open": close + 0.1,
+                    "high": close + 0.5,
+                    "low": close - 0.5,
+                    "close": close,
+                    "volume": rng.integers(1, 1000, len(minutes)).astype(float),
+                    "tic": tic,
+                }
+            )
+        )
+    df = pd.concat(frames, ignore_index=True)
+    # missing bars, including the first ones of BBB, and a bar without a close
+    drop = rng.uniform(size=len(df)) < 0.2
+    drop |= (df.tic == "BBB") & (df.timestamp < minutes[15])
+    df.loc[100, "close"] = np.nan
+    return df[~drop].sample(frac=1, random_state=0).reset_index(drop=True)
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_matches_row_loop(processor, bars, times, n_jobs):
+    result = processor.clean_data(bars, n_jobs=n_jobs)
+    expected = loop_clean(bars, times)
+    pd.testing.assert_frame_equal(result, expected)
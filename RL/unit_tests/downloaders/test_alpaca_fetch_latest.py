@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from finrl.meta.data_processors.processor_alpaca import AlpacaProcessor
+from finrl.meta.preprocessor.indicators import indicator_frame
+
+TICS = ["AAA", "BBB"]
+INDICATORS = ["macd", "rsi_30", "close_30_sma"]
+
+
+class FakeClient:
+    # serves the minute bars published so far like Alpaca does: from start
+    # on, or the day's first limit bars when there is no start
+    def __init__(self, bars):
+        self.bars = bars
+        self.published = 0
+        self.requests = []
+
+    def get_stock_bars(self, request):
+        self.requests.append(request)
+        if request.symbol_or_symbols == "VIXY":
+            return SimpleNamespace(df=pd.DataFrame({"close": [20.0]}))
+        (tic,) = request.symbol_or_symbols
+        bars = self.bars[self.bars.symbol == tic].iloc[: self.published]
+        if request.start is not None:
+            # the request keeps start as naive UTC
+            bars = bars[bars.timestamp >= pd.Timestamp(request.start, tz="UTC")]
+        if request.limit is not None:
+            bars = bars.iloc[: request.limit]
+        return SimpleNamespace(df=bars.set_index(["symbol", "timestamp"]))
+
+
+def make_bars(n_bars=150):
+    rng = np.random.default_rng(0)
+    times = pd.date_range("2024-01-02 14:30", periods=n_bars, freq="min", tz="UTC")
+    frames = []
+    for tic in TICS:
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.001, n_bars)))
+        frames.append(
+            pd.DataFrame(
+                {
+                    "symbol": tic,
+                    "timestamp": times,
+                    "open": close,
+                    "high": close * 1.001,
+                    "low": close * 0.999,
+                    "close": close,
+                    "volume": 100.0,
+                    "trade_count": 10.0,
+                    "vwap": close,
+                }
+            )
+        )
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_incremental_follows_the_latest_bars():
+    bars = make_bars()
+    client = FakeClient(bars)
+    processor = AlpacaProcessor(client=client)
+    client.published = 100
+    processor.fetch_latest_data(TICS, "1Min", INDICATORS, incremental=True)
+    for published in [103, 110, 111]:
+        client.published = published
+        price, tech, _ = processor.fetch_latest_data(
+            TICS, "1Min", INDICATORS, incremental=True
+        )
+        history = bars.groupby("symbol").head(published).rename(columns={"symbol": "tic"})
+        expected = indicator_frame(history, INDICATORS, time_col="timestamp")
+        latest = expected[history.timestamp == history.timestamp.max()]
+        np.testing.assert_allclose(tech, latest.to_numpy().ravel(), rtol=1e-9)
+        np.testing.assert_array_equal(
+            price, history[history.timestamp == history.timestamp.max()].close
+        )
+    assert client.requests[-2].start is not None
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from finrl.meta.data_processors.processor_yahoofinance import YahooFinanceProcessor
+
+NY = "America/New_York"
+TRADING_DAYS = ["2024-03-08", "2024-03-11"]  # across the DST change
+OHLCV = ["open", "high", "low", "close", "volume"]
+
+
+def loop_clean(df, times):
+    # the row by row loop clean_data used before, for 1m bars
+    new_df = pd.DataFrame()
+    for tic in np.unique(df.tic.values):
+        tmp_df = pd.DataFrame(columns=OHLCV, index=times)
+        tic_df = df[df.tic == tic]
+        for i in range(tic_df.shape[0]):
+            tmp_timestamp = tic_df.iloc[i]["timestamp"].tz_convert(NY)
+            tmp_df.loc[tmp_timestamp] = tic_df.iloc[i][OHLCV]
+        if str(tmp_df.iloc[0]["close"]) == "nan":
+            for i in range(tmp_df.shape[0]):
+                if str(tmp_df.iloc[i]["close"]) != "nan":
+                    first_valid_close = tmp_df.iloc[i]["close"]
+                    tmp_df.iloc[0] = [first_valid_close] * 4 + [0.0]
+                    break
+        if str(tmp_df.iloc[0]["close"]) == "nan":
+            tmp_df.iloc[0] = [0.0] * 5
+        for i in range(tmp_df.shape[0]):
+            if str(tmp_df.iloc[i]["close"]) == "nan":
+                previous_close = tmp_df.iloc[i - 1]["close"]
+                tmp_df.iloc[i] = [previous_close] * 4 + [0.0]
+        tmp_df = tmp_df.astype(float)
+        tmp_df["tic"] = tic
+        new_df = pd.concat([new_df, tmp_df])
+    new_df = new_df.reset_index()
+    return new_df.rename(columns={"index": "timestamp"})
+
+
+@pytest.fixture
+def processor():
+    processor = YahooFinanceProcessor()
+    processor.start, processor.end = TRADING_DAYS[0], TRADING_DAYS[-1]
+    processor.time_interval = "1m"
+    processor.get_trading_days = lambda start, end: TRADING_DAYS
+    return processor
+
+
+@pytest.fixture
+def bars():
+    rng = np.random.default_rng(0)
+    opens = pd.DatetimeIndex(TRADING_DAYS) + pd.Timedelta("09:30:00")
+    minutes = opens.tz_localize(NY).repeat(390) + pd.to_timedelta(
+        np.tile(np.arange(390), 2), unit="min"
+    )
+    frames = []
+    for tic, keep in [("AAA", 0.9), ("BBB", 0.5), ("CCC", 0.0)]:
+        sampled = minutes[rng.uniform(size=len(minutes)) < keep]
+        if tic == "BBB":
+            sampled = sampled[sampled > minutes[30]]  # leading gap
+        close = 100 + rng.normal(size=len(sampled)).cumsum()
+        frame = pd.DataFrame(
+            {
+                "timestamp": sampled.tz_convert("UTC"),
+                "open": close + 0.1,
+                "high": close + 0.5,
+                "low": close - 0.5,
+                "close": close,
+                "volume": rng.integers(1, 1000, len(sampled)).astype(float),
+                "tic": tic,
+            }
+        )
+        frames.append(frame)
+    df = pd.concat(frames, ignore_index=True)
+    # a repeated bar, a bar after the close and a bar without a close
+    repeated = df.iloc[[5]].assign(close=1.0)
+    after_close = df.iloc[[10]].assign(
+        timestamp=pd.Timestamp("2024-03-08 16:00", tz=NY).tz_convert("UTC")
+    )
+    df.loc[20, "close"] = np.nan
+    df = pd.concat([df, repeated, after_close], ignore_index=True)
+    df = df.sample(frac=1, random_state=0)
+    # CCC only has the after-close bar
+    ccc = after_close.assign(tic="CCC")
+    return pd.concat([df, ccc], ignore_index=True)
+
+
+def test_matches_row_loop(processor, bars):
+    result = processor.clean_data(bars)
+    times = []
+    for day in TRADING_DAYS:
+        current_time = pd.Timestamp(day + " 09:30:00").tz_localize(NY)
+        for _ in range(390):
+            times.append(current_time)
+            current_time += pd.Timedelta(minutes=1)
+    expected = loop_clean(bars, times)
+    pd.testing.assert_frame_equal(result, expected)
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from finrl.meta.array_store import load_array_store
+from finrl.meta.array_store import RepeatedSeries
+from finrl.meta.array_store import save_array_store
+from finrl.meta.env_cryptocurrency_trading.env_btc_ccxt import BitcoinEnv
+
+
+def test_repeated_series_matches_repeat():
+    daily = np.arange(10, dtype=np.float32)
+    expected = daily.repeat(7)[-60:]
+    series = RepeatedSeries(daily, 7, start=70 - 60, length=60)
+    assert len(series) == 60
+    np.testing.assert_array_equal(np.asarray(series), expected)
+    for key in [slice(3, 50, 4), slice(None, None, 3), slice(-20, None)]:
+        np.testing.assert_array_equal(np.asarray(series[key]), expected[key])
+    view = series[5:55:4]
+    assert view[2] == expected[5:55:4][2]
+    assert view[-1] == expected[5:55:4][-1]
+    np.testing.assert_array_equal(
+        np.asarray(view.apply(lambda a: a > 4)), expected[5:55:4] > 4
+    )
+
+
+def test_store_round_trip(tmp_path):
+    rng = np.random.default_rng(0)
+    price = rng.uniform(1, 100, (50, 3))
+    daily = rng.uniform(0, 60, 4)
+    save_array_store(
+        tmp_path,
+        {"price_ary": price, "turb_ary": daily},
+        repeats={"turb_ary": 15},
+        lengths={"turb_ary": 50},
+        chunk_rows=8,
+    )
+    arrays = load_array_store(tmp_path)
+    assert isinstance(arrays["price_ary"], np.memmap)
+    np.testing.assert_array_equal(arrays["price_ary"], price.astype(np.float32))
+    np.testing.assert_array_equal(
+        np.asarray(arrays["turb_ary"]), daily.astype(np.float32).repeat(15)[-50:]
+    )
+
+
+@pytest.mark.parametrize("mode", ["train", "test", "trade"])
+def test_bitcoin_env_strided_views(tmp_path, mode):
+    rng = np.random.default_rng(1)
+    price, tech = rng.uniform(1, 2, (200, 1)), rng.uniform(0, 1, (200, 7))
+    np.save(tmp_path / "price_ary.npy", price)
+    np.save(tmp_path / "tech_ary.npy", tech)
+    kwargs = dict(time_frequency=15, start=0, mid1=97, mid2=150, end=None, mode=mode)
+    env = BitcoinEnv(data_cwd=str(tmp_path), **kwargs)
+    begin, stop = {"train": (0, 97), "test": (97, 150), "trade": (150, None)}[mode]
+    x = len(price[begin:stop]) // 15
+    ind = [15 * i for i in range(x)]
+    np.testing.assert_array_equal(env.price_ary, price[begin:stop][ind])
+    np.testing.assert_array_equal(env.tech_ary, tech[begin:stop][ind])
+    assert isinstance(env.price_ary, np.memmap)
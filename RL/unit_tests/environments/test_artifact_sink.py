@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from finrl.meta.artifact_sink import ArtifactSink
+
+
+def gated_sink(**kwargs):
+    # the first job holds the worker until ``gate`` is set, so the rest queue up
+    sink = ArtifactSink(batch_size=1, **kwargs)
+    gate, started = threading.Event(), threading.Event()
+
+    def hold():
+        started.set()
+        gate.wait(10)
+
+    sink.submit(hold)
+    started.wait(10)
+    return sink, gate
+
+
+def test_jobs_run_in_order_after_flush():
+    sink = ArtifactSink(batch_size=3)
+    done = []
+    for i in range(10):
+        assert sink.submit(done.append, i)
+    assert sink.flush(timeout=10)
+    assert done == list(range(10))
+    sink.close()
+
+
+@pytest.mark.parametrize(
+    "overflow, expected",
+    [("drop_oldest", [2, 3]), ("drop_newest", [0, 1]), ("block", [0, 1, 2, 3])],
+)
+def test_overflow_policies(overflow, expected):
+    sink, gate = gated_sink(max_pending=2, overflow=overflow)
+    done = []
+    if overflow == "block":
+        threading.Timer(0.2, gate.set).start()
+    for i in range(4):
+        sink.submit(done.append, i)
+    gate.set()
+    assert sink.flush(timeout=10)
+    assert done == expected
+    assert sink.dropped == 4 - len(expected)
+    sink.close()
+
+
+def test_failed_job_does_not_stop_the_worker():
+    sink = ArtifactSink()
+    done = []
+    with pytest.warns(UserWarning):
+        sink.submit(lambda: 1 / 0)
+        sink.submit(done.append, 1)
+        sink.flush(timeout=10)
+    assert done == [1]
+    assert sink.failed == 1
+    sink.close()
+
+
+def test_csv_and_plot(tmp_path):
+    sink = ArtifactSink()
+    df = pd.DataFrame({"a": [1.0, 2.0]})
+    sink.csv(df, tmp_path / "a.csv", index=False)
+    sink.plot(tmp_path / "a.png", np.arange(5.0), title="t", xlabel="x", ylabel="y")
+    sink.close()
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / "a.csv"), df)
+    assert (tmp_path / "a.png").stat().st_size > 0
+    with pytest.raises(RuntimeError):
+        sink.submit(print)
+
+
+def test_default_overflow_blocks():
+    # results must not be dropped unless a caller opts in
+    assert ArtifactSink(background=False).overflow == "block"
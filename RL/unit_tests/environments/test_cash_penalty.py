@@ -1,11 +1,15 @@
 from __future__ import annotations
 
 import numpy as np
+import pandas as pd
 import pytest
 
 from finrl.meta.env_stock_trading.env_stocktrading_cashpenalty import (
     StockTradingEnvCashpenalty,
 )
+from finrl.meta.env_stock_trading.env_stocktrading_stoploss import (
+    StockTradingEnvStopLoss,
+)
 from finrl.meta.preprocessor.yahoodownloader import YahooDownloader
 
 
@@ -110,3 +114,43 @@ def test_validate_caching(data):
 
         assert un_state == ca_state
         assert un_reward == ca_reward
+
+
+def legacy_date_vector(env, df, date, cols):
+    # the per-asset DataFrame filter get_date_vector used before the cube
+    trunc_df = df.set_index("date").loc[[env.dates[date]]]
+    v = []
+    for a in env.assets:
+        subset = trunc_df[trunc_df["tic"] == a]
+        v += subset.loc[env.dates[date], cols].tolist()
+    return v
+
+
+@pytest.mark.parametrize("env_class", [StockTradingEnvCashpenalty, StockTradingEnvStopLoss])
+@pytest.mark.parametrize("cache", [False, True])
+def test_date_vector_matches_dataframe(env_class, cache):
+    # Prove that cube slices equal the old DataFrame lookups, whatever the row order
+    rng = np.random.default_rng(0)
+    n_days, tics = 12, ["MSFT", "AAPL", "GOOG"]
+    df = pd.DataFrame(
+        {
+            "date": np.repeat(pd.bdate_range("2020-01-01", periods=n_days), len(tics)),
+            "tic": np.tile(tics, n_days),
+            "open": rng.uniform(50, 150, n_days * len(tics)),
+            "close": rng.uniform(50, 150, n_days * len(tics)),
+            "high": rng.uniform(50, 150, n_days * len(tics)),
+            "low": rng.uniform(50, 150, n_days * len(tics)),
+            "volume": rng.integers(1e5, 1e6, n_days * len(tics)).astype(float),
+            "turbulence": np.repeat(rng.uniform(0, 100, n_days), len(tics)),
+        }
+    ).sample(frac=1, random_state=0)
+    env = env_class(df, cache_indicator_data=cache, print_verbosity=10**9)
+    for date in range(n_days):
+        for cols in [None, ["close"], ["turbulence"], ["low", "open"]]:
+            expected = legacy_date_vector(
+                env, df, date, env.daily_information_cols if cols is None else cols
+            )
+            assert env.get_date_vector(date, cols=cols) == expected
+
+    with pytest.raises(ValueError):
+        env_class(df.iloc[1:], print_verbosity=10**9)
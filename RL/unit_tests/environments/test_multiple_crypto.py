@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from finrl.meta.env_cryptocurrency_trading.env_multiple_crypto import CryptoEnv
+
+
+def make_env(lookback, n_steps=50, seed=0):
+    rng = np.random.default_rng(seed)
+    price = np.exp(np.cumsum(rng.normal(0, 0.01, (n_steps, 3)), axis=0))
+    price *= [40000.0, 2000.0, 0.5]
+    tech = rng.normal(0, 100, (n_steps, 6))
+    config = {"price_array": price, "tech_array": tech}
+    return CryptoEnv(config, lookback=lookback)
+
+
+def loop_state(env):
+    # the hstack loop CryptoEnv.get_state used before the window view
+    state = np.hstack((env.cash * 2**-18, env.stocks * 2**-3))
+    for i in range(env.lookback):
+        tech_i = env.tech_array[env.time - i]
+        state = np.hstack((state, tech_i * 2**-15)).astype(np.float32)
+    return state
+
+
+@pytest.mark.parametrize("lookback", [1, 5, 20])
+def test_state_matches_loop(lookback):
+    env = make_env(lookback)
+    rng = np.random.default_rng(1)
+    state = env.reset()
+    done = False
+    while not done:
+        expected = loop_state(env)
+        assert state.dtype == np.float32
+        assert state.shape == (env.state_dim,)
+        np.testing.assert_array_equal(state, expected)
+        state, _, done, _ = env.step(rng.uniform(-1, 1, env.action_dim))
+    assert env.time == env.max_step
+
+
+def test_action_normalizer():
+    env = make_env(1)
+    env.price_array = np.array([[45321.0, 1.5, 0.0, 123.25]])
+    env._generate_action_normalizer()
+    np.testing.assert_array_equal(env.action_norm_vector, [1.0, 1e4, 1.0, 100.0])
+    actions = np.array([0.5, -0.5, 1.0], dtype=np.float32)
+    env2 = make_env(1)
+    expected = actions * env2.action_norm_vector
+    env2.step(actions)
+    np.testing.assert_allclose(actions, expected, rtol=1e-6)
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("quantstats")
+
+from finrl.agents.portfolio_optimization.utils import PVM  # noqa: E402
+from finrl.meta.artifact_sink import ArtifactSink  # noqa: E402
+from finrl.meta.env_portfolio_optimization.commission import trf_mu_batch  # noqa: E402
+from finrl.meta.env_portfolio_optimization.commission import wvm_batch  # noqa: E402
+from finrl.meta.env_portfolio_optimization.env_portfolio_optimization import (  # noqa: E402
+    PortfolioOptimizationEnv,
+)
+from finrl.meta.env_portfolio_optimization.env_portfolio_optimization_batch import (  # noqa: E402
+    PortfolioOptimizationBatchEnv,
+)
+
+
+@pytest.fixture(scope="session")
+def data():
+    rng = np.random.default_rng(0)
+    n_days, tics = 30, ["AAA", "BBB", "CCC"]
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (n_days, len(tics))), axis=0))
+    return pd.DataFrame(
+        {
+            "date": np.repeat(
+                pd.bdate_range("2020-01-01", periods=n_days).strftime("%Y-%m-%d"),
+                len(tics),
+            ),
+            "tic": np.tile(tics, n_days),
+            "close": close.ravel(),
+            "high": close.ravel() * 1.01,
+            "low": close.ravel() * 0.98,
+        }
+    )
+
+
+def make_env(df, tmp_path, **kwargs):
+    return PortfolioOptimizationEnv(
+        df,
+        initial_amount=1000,
+        comission_fee_pct=0.0025,
+        time_window=5,
+        cwd=str(tmp_path),
+        **kwargs,
+    )
+
+
+def legacy_state_and_variation(env, time_index):
+    # the per-step dataframe filters the environment used before its arrays
+    end_time = env._sorted_times[time_index]
+    start_time = env._sorted_times[time_index - (env._time_window - 1)]
+    data = env._window_data(start_time, end_time)
+    variation = env._df_price_variation[
+        env._df_price_variation[env._time_column] == end_time
+    ][env._valuation_feature].to_numpy()
+    state = None
+    for tic in env._tic_list:
+        tic_data = data[data[env._tic_column] == tic][env._features].to_numpy().T
+        tic_data = tic_data[..., np.newaxis]
+        state = tic_data if state is None else np.append(state, tic_data, axis=2)
+    return state.transpose((0, 2, 1)), np.insert(variation, 0, 1)
+
+
+@pytest.mark.parametrize("normalize_df", ["by_previous_time", None])
+def test_windows_match_dataframe(data, tmp_path, normalize_df):
+    # Prove that window views serve the states the dataframe filters produced
+    env = make_env(data, tmp_path, normalize_df=normalize_df)
+    state = env.reset()
+    rng = np.random.default_rng(0)
+    for _ in range(10):
+        expected_state, expected_variation = legacy_state_and_variation(
+            env, env._time_index
+        )
+        np.testing.assert_array_equal(state, expected_state)
+        assert state.dtype == np.float32
+        assert np.shares_memory(state, env._feature_array)
+        state, _, _, info = env.step(rng.uniform(0, 1, env.portfolio_size + 1))
+        _, expected_variation = legacy_state_and_variation(env, env._time_index)
+        np.testing.assert_array_equal(info["price_variation"], expected_variation)
+        assert "data" not in info
+
+
+def test_data_in_info(data, tmp_path):
+    env = make_env(data, tmp_path, data_in_info=True)
+    env.reset()
+    _, _, _, info = env.step(np.ones(env.portfolio_size + 1))
+    assert len(info["data"]) == 5 * 3
+    assert info["data"]["date"].max() == info["end_time"]
+
+
+def test_terminal_artifacts(data, tmp_path):
+    sink = ArtifactSink()
+    env = make_env(data, tmp_path, artifact_sink=sink)
+    env.reset()
+    terminal = False
+    while not terminal:
+        _, _, terminal, _ = env.step(np.ones(env.portfolio_size + 1))
+    sink.close()
+    assert sink.failed == 0
+    for name in ["portfolio_value", "reward", "actions", "portfolio_summary"]:
+        assert (tmp_path / "results" / "rl" / f"{name}.png").stat().st_size > 0
+
+
+def scalar_trf_mu(weights, last_weights, c):
+    # the loop of PortfolioOptimizationEnv.step
+    last_mu = 1
+    mu = 1 - 2 * c + c**2
+    while abs(mu - last_mu) > 1e-10:
+        last_mu = mu
+        mu = (
+            1
+            - c * weights[0]
+            - (2 * c - c**2) * np.sum(np.maximum(last_weights[1:] - mu * weights[1:], 0))
+        ) / (1 - c * weights[0])
+    return mu
+
+
+def random_weights(rng, shape):
+    weights = rng.uniform(0, 1, shape) * rng.integers(0, 2, shape)
+    weights[:, 0] += 1e-3
+    return weights / weights.sum(axis=1, keepdims=True)
+
+
+@pytest.mark.parametrize("c", [0.0, 0.0025, 0.05])
+def test_trf_mu_batch_matches_scalar_loop(c):
+    rng = np.random.default_rng(0)
+    weights, last_weights = random_weights(rng, (64, 6)), random_weights(rng, (64, 6))
+    expected = [scalar_trf_mu(w, lw, c) for w, lw in zip(weights, last_weights)]
+    np.testing.assert_array_equal(trf_mu_batch(weights, last_weights, c), expected)
+
+
+def test_wvm_batch_matches_scalar():
+    rng = np.random.default_rng(1)
+    weights, last_weights = random_weights(rng, (64, 6)), random_weights(rng, (64, 6))
+    values = rng.uniform(100, 2000, 64)
+    new_weights, new_values = wvm_batch(weights, last_weights, values)
+    for i in range(64):
+        fees = np.sum(np.abs((weights[i] - last_weights[i])[1:] * values[i]))
+        if fees > weights[i, 0] * values[i]:
+            np.testing.assert_array_equal(new_weights[i], last_weights[i])
+            assert new_values[i] == values[i]
+        else:
+            portfolio = weights[i] * values[i]
+            portfolio[0] -= fees
+            assert new_values[i] == pytest.approx(np.sum(portfolio), rel=1e-12)
+            np.testing.assert_allclose(new_weights[i], portfolio / np.sum(portfolio))
+
+
+@pytest.mark.parametrize("model", ["trf", "wvm"])
+def test_batch_env_matches_single_envs(data, tmp_path, model):
+    # Prove that B batched portfolios follow B PortfolioOptimizationEnvs
+    num_envs = 4
+    kwargs = dict(comission_fee_model=model)
+    batch = PortfolioOptimizationBatchEnv(
+        data,
+        num_envs,
+        initial_amount=1000,
+        comission_fee_pct=0.0025,
+        time_window=5,
+        cwd=str(tmp_path),
+        **kwargs,
+    )
+    singles = [make_env(data, tmp_path, **kwargs) for _ in range(num_envs)]
+    state = batch.reset()
+    for env in singles:
+        np.testing.assert_array_equal(state[0], env.reset())
+    rng = np.random.default_rng(2)
+    for _ in range(batch.episode_length - 1):
+        actions = rng.normal(size=(num_envs, batch.portfolio_size + 1))
+        actions[::2] = random_weights(rng, (len(actions[::2]), actions.shape[1]))
+        state, rewards, done, info = batch.step(actions)
+        assert not done
+        for i, env in enumerate(singles):
+            single_state, reward, _, single_info = env.step(actions[i])
+            np.testing.assert_array_equal(state[i], single_state)
+            assert rewards[i] == pytest.approx(reward, rel=1e-4, abs=1e-6)
+            np.testing.assert_array_equal(
+                info["price_variation"][i], single_info["price_variation"]
+            )
+            if model == "trf":
+                assert info["trf_mu"][i] == pytest.approx(single_info["trf_mu"], rel=1e-6)
+            assert batch.portfolio_values[batch._step, i] == pytest.approx(
+                env._portfolio_value, rel=1e-5
+            )
+    assert batch.step(actions)[2]
+
+
+def test_pvm_keeps_one_action_per_portfolio():
+    pvm = PVM(3, 2, num_envs=4)
+    initial = pvm.retrieve()
+    assert initial.shape == (4, 3)
+    np.testing.assert_array_equal(initial, [[1, 0, 0]] * 4)
+    actions = random_weights(np.random.default_rng(3), (4, 3))
+    pvm.add(actions)
+    np.testing.assert_array_equal(pvm.retrieve(), actions)
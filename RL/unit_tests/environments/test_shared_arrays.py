@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import multiprocessing as mp
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from finrl.meta.env_stock_trading.env_stocktrading_cashpenalty import (
+    StockTradingEnvCashpenalty,
+)
+from finrl.meta.env_stock_trading.env_stocktrading_stoploss import (
+    StockTradingEnvStopLoss,
+)
+from finrl.meta.env_stock_trading.shared_arrays import attach_arrays
+from finrl.meta.env_stock_trading.shared_arrays import make_shared_env_fns
+from finrl.meta.env_stock_trading.shared_arrays import SharedArrays
+
+
+@pytest.fixture(scope="session")
+def data():
+    rng = np.random.default_rng(0)
+    n_days, tics = 30, ["AAPL", "GOOG", "MSFT"]
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (n_days, len(tics))), axis=0))
+    df = pd.DataFrame(
+        {
+            "date": np.repeat(
+                pd.bdate_range("2020-01-01", periods=n_days).strftime("%Y-%m-%d"),
+                len(tics),
+            ),
+            "tic": np.tile(tics, n_days),
+            "open": close.ravel() * 0.99,
+            "close": close.ravel(),
+            "high": close.ravel() * 1.01,
+            "low": close.ravel() * 0.98,
+            "volume": rng.integers(1e5, 1e6, close.size).astype(float),
+            "turbulence": np.repeat(rng.uniform(0, 100, n_days), len(tics)),
+        }
+    )
+    return df
+
+
+def rollout(env, seed=1, steps=25):
+    rng = np.random.default_rng(seed)
+    trajectory = [np.asarray(env.reset(), dtype=np.float64)]
+    for _ in range(steps):
+        state, reward, done, _ = env.step(rng.uniform(-1, 1, len(env.assets)))
+        trajectory.append((np.asarray(state, dtype=np.float64), float(reward), done))
+        if done:
+            break
+    return pickle.dumps(trajectory)
+
+
+def rollout_in_child(env_fn, queue):
+    queue.put(rollout(env_fn()))
+
+
+def test_attach_is_zero_copy_and_read_only():
+    arrays = {"a": np.arange(12.0).reshape(3, 4), "b": np.arange(5, dtype=np.int32)}
+    shared = SharedArrays(arrays)
+    try:
+        views = attach_arrays(shared.handle)
+        np.testing.assert_array_equal(views["a"], arrays["a"])
+        np.testing.assert_array_equal(views["b"], arrays["b"])
+        assert views["b"].ctypes.data % 64 == 0
+        assert not views["a"].flags.writeable
+        # both attachments read the same bytes
+        shared.arrays["a"].flags.writeable = True
+        shared.arrays["a"][0, 0] = -1
+        assert views["a"][0, 0] == -1
+        del views
+    finally:
+        shared.close()
+
+
+@pytest.mark.parametrize("env_class", [StockTradingEnvCashpenalty, StockTradingEnvStopLoss])
+@pytest.mark.parametrize("memmap", [False, True])
+def test_shared_worker_matches_original(data, env_class, memmap, tmp_path):
+    # Prove that a worker rebuilt from shared arrays, without the DataFrame,
+    # steps exactly like the env it was made from, in and out of process
+    env = env_class(
+        data, hmax=1000, turbulence_threshold=60, random_start=False, print_verbosity=10**9
+    )
+    expected = rollout(env)
+    path = str(tmp_path / "market.bin") if memmap else None
+    env_fns, shared = make_shared_env_fns(env, env._market_arrays(), 2, path=path)
+    try:
+        worker = env_fns[0]()
+        assert worker.df is None
+        assert rollout(worker) == expected
+        del worker
+
+        ctx = mp.get_context("spawn")
+        queue = ctx.Queue()
+        process = ctx.Process(target=rollout_in_child, args=(env_fns[1], queue))
+        process.start()
+        result = queue.get(timeout=120)
+        process.join()
+        assert result == expected
+    finally:
+        shared.close()
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from finrl.meta.env_stock_trading.env_stocktrading_np import StockTradingEnv
+from finrl.meta.env_stock_trading.step_kernel import get_step_kernel
+
+COSTS = dict(min_action=10, buy_cost_pct=1e-3, sell_cost_pct=2e-3)
+
+
+def loop_step(price, actions, stocks, cooldown, amount, liquidate, cap_with_cost):
+    # the per-ticker loop of env_stocktrading_np.StockTradingEnv.step, in float64
+    min_action = COSTS["min_action"]
+    buy, sell = COSTS["buy_cost_pct"], COSTS["sell_cost_pct"]
+    if liquidate:
+        amount += sum(float(s) * float(p) for s, p in zip(stocks, price)) * (1 - sell)
+        stocks[:] = 0
+        cooldown[:] = 0
+        return amount
+    for index in np.where(actions < -min_action)[0]:
+        if price[index] > 0:
+            shares = min(float(stocks[index]), -float(actions[index]))
+            stocks[index] = float(stocks[index]) - shares
+            amount += float(price[index]) * shares * (1 - sell)
+            cooldown[index] = 0
+    for index in np.where(actions > min_action)[0]:
+        if price[index] > 0:
+            unit = float(price[index]) * (1 + buy) if cap_with_cost else float(price[index])
+            shares = min(amount // unit, float(actions[index]))
+            stocks[index] = float(stocks[index]) + shares
+            amount -= float(price[index]) * shares * (1 + buy)
+            cooldown[index] = 0
+    return amount
+
+
+def random_batch(rng, n_envs=16, n_tics=12):
+    price = rng.uniform(1, 300, (n_envs, n_tics)).astype(np.float32)
+    price[rng.uniform(size=price.shape) < 0.1] = 0
+    actions = rng.integers(-100, 101, (n_envs, n_tics)).astype(np.float64)
+    stocks = rng.integers(0, 64, (n_envs, n_tics)).astype(np.float32)
+    cooldown = rng.integers(0, 5, (n_envs, n_tics)).astype(np.float32)
+    amount = rng.uniform(0, 5e4, n_envs)
+    liquidate = rng.uniform(size=n_envs) < 0.2
+    return price, actions, stocks, cooldown, amount, liquidate
+
+
+def kernels():
+    backends = ["numpy"]
+    try:
+        import numba  # noqa: F401
+
+        backends.append("numba")
+    except ImportError:
+        pass
+    return backends
+
+
+@pytest.mark.parametrize("backend", kernels())
+@pytest.mark.parametrize("cap_with_cost", [False, True])
+def test_kernel_matches_loop(backend, cap_with_cost):
+    step, _ = get_step_kernel(backend)
+    rng = np.random.default_rng(0)
+    for row in zip(*random_batch(rng, n_envs=50)):
+        price, actions, stocks, cooldown, amount, liquidate = row
+        expected = [stocks.copy(), cooldown.copy()]
+        expected_amount = loop_step(
+            price, actions, *expected, amount, liquidate, cap_with_cost
+        )
+        amount = step(
+            price,
+            actions,
+            stocks,
+            cooldown,
+            amount,
+            COSTS["min_action"],
+            COSTS["buy_cost_pct"],
+            COSTS["sell_cost_pct"],
+            cap_with_cost,
+            liquidate,
+        )
+        assert amount == expected_amount
+        np.testing.assert_array_equal(stocks, expected[0])
+        np.testing.assert_array_equal(cooldown, expected[1])
+
+
+@pytest.mark.parametrize("backend", kernels())
+def test_batch_matches_single(backend):
+    step, step_batch = get_step_kernel(backend)
+    rng = np.random.default_rng(1)
+    price, actions, stocks, cooldown, amount, liquidate = random_batch(rng)
+    args = (COSTS["min_action"], COSTS["buy_cost_pct"], COSTS["sell_cost_pct"], False)
+    single_stocks, single_cooldown = stocks.copy(), cooldown.copy()
+    single_amount = [
+        step(price[i], actions[i], single_stocks[i], single_cooldown[i], amount[i], *args, liquidate[i])
+        for i in range(len(amount))
+    ]
+    step_batch(price, actions, stocks, cooldown, amount, *args, liquidate)
+    np.testing.assert_array_equal(amount, single_amount)
+    np.testing.assert_array_equal(stocks, single_stocks)
+    np.testing.assert_array_equal(cooldown, single_cooldown)
+
+
+def test_numba_matches_numpy_env():
+    pytest.importorskip("numba")
+    rng = np.random.default_rng(2)
+    n_days, n_tics = 40, 5
+    config = {
+        "price_array": rng.uniform(10, 100, (n_days, n_tics)),
+        "tech_array": rng.normal(size=(n_days, 3 * n_tics)),
+        "turbulence_array": rng.uniform(0, 150, n_days),
+        "if_train": False,
+    }
+    envs = [StockTradingEnv(config, step_kernel=k) for k in ("numpy", "numba")]
+    states = [env.reset()[0] for env in envs]
+    np.testing.assert_array_equal(*states)
+    done = False
+    while not done:
+        action = rng.uniform(-1, 1, n_tics)
+        results = [env.step(action) for env in envs]
+        np.testing.assert_array_equal(results[0][0], results[1][0])
+        assert results[0][1] == results[1][1]
+        done = results[0][2]
+
+
+def test_unknown_kernel():
+    with pytest.raises(ValueError):
+        get_step_kernel("cuda")
@@ -0,0 +1,328 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from stable_baselines3.common.vec_env import DummyVecEnv
+
+from finrl.meta.env_stock_trading.env_stocktrading import StockTradingEnv
+from finrl.meta.env_stock_trading.env_stocktrading_vec import StockTradingVecEnv
+from finrl.meta.env_stock_trading.market_cube import MarketCube
+from finrl.meta.env_stock_trading.recorder import EpisodeRecorder
+
+
+@pytest.fixture(scope="session")
+def indicator_list():
+    return ["macd", "rsi_30"]
+
+
+def make_frame(tics, indicator_list, n_days=40, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (n_days, len(tics))), axis=0))
+    df = pd.DataFrame(
+        {
+            "date": np.repeat(pd.bdate_range("2020-01-01", periods=n_days), len(tics)),
+            "tic": np.tile(tics, n_days),
+            "close": close.ravel(),
+            "turbulence": np.repeat(rng.uniform(0, 100, n_days), len(tics)),
+        }
+    )
+    for tech in indicator_list:
+        df[tech] = rng.normal(size=len(df))
+    df.index = np.repeat(np.arange(n_days), len(tics))
+    return df
+
+
+@pytest.fixture(scope="session")
+def data(indicator_list):
+    return make_frame(["AAPL", "GOOG", "MSFT"], indicator_list)
+
+
+@pytest.fixture(scope="session")
+def wide_data(indicator_list):
+    return make_frame([f"T{i}" for i in range(25)], indicator_list, n_days=5)
+
+
+def make_env(df, indicator_list, **kwargs):
+    stock_dim = df.tic.nunique()
+    return StockTradingEnv(
+        df=df,
+        stock_dim=stock_dim,
+        hmax=100,
+        initial_amount=1e6,
+        num_stock_shares=[0] * stock_dim,
+        buy_cost_pct=[0.001] * stock_dim,
+        sell_cost_pct=[0.001] * stock_dim,
+        reward_scaling=1e-4,
+        state_space=1 + 2 * stock_dim + len(indicator_list) * stock_dim,
+        action_space=stock_dim,
+        tech_indicator_list=indicator_list,
+        print_verbosity=10**9,
+        **kwargs,
+    )
+
+
+def test_market_cube_layout(data, indicator_list):
+    cube = MarketCube.from_df(data, ["close"] + indicator_list)
+    assert cube.data.shape == (40, 3, 3)
+    assert cube.data.flags["C_CONTIGUOUS"]
+    assert list(cube.tics) == ["AAPL", "GOOG", "MSFT"]
+    np.testing.assert_array_equal(cube.column("close")[5], data.loc[5, "close"])
+    assert cube.dates[5] == data.loc[5, "date"].iloc[0]
+
+
+def test_market_cube_rejects_ragged_days(data):
+    with pytest.raises(ValueError):
+        MarketCube.from_df(data.iloc[:-1], ["close"])
+
+
+def test_market_cube_pivot(data, indicator_list):
+    tics = ["GOOG", "MSFT", "AAPL"]
+    shuffled = data.sample(frac=1, random_state=0)
+    cube = MarketCube.pivot(shuffled, ["close"] + indicator_list, tics=tics)
+    assert cube.data.shape == (40, 3, 3)
+    np.testing.assert_array_equal(cube.dates, np.sort(data.date.unique()))
+    np.testing.assert_array_equal(
+        cube.data[5, :, cube.col("close")], data.loc[5].set_index("tic").close[tics]
+    )
+    with pytest.raises(ValueError):
+        MarketCube.pivot(pd.concat([shuffled, shuffled.iloc[:1]]), ["close"])
+
+
+def test_state_matches_dataframe(data, indicator_list):
+    # Prove that the cube-backed state is what the DataFrame lookups produced
+    env = make_env(data, indicator_list, turbulence_threshold=50)
+    rng = np.random.default_rng(1)
+    state, _ = env.reset()
+    done = False
+    while not done:
+        rows = data.loc[env.day, :]
+        expected_market = rows.close.values.tolist() + sum(
+            (rows[tech].values.tolist() for tech in indicator_list), []
+        )
+        np.testing.assert_array_equal(state[1:4], expected_market[:3])
+        np.testing.assert_array_equal(state[7:], expected_market[3:])
+        assert env._get_date() == rows.date.unique()[0]
+        state, _, done, _, _ = env.step(rng.uniform(-1, 1, 3))
+        if not done:
+            assert env.turbulence == data.loc[env.day, "turbulence"].values[0]
+    assert env.day == 39
+
+
+def test_returned_states_are_not_aliased(data, indicator_list):
+    env = make_env(data, indicator_list)
+    state, _ = env.reset()
+    before = state.copy()
+    next_state, _, _, _, _ = env.step(np.ones(3))
+    np.testing.assert_array_equal(state, before)
+    assert next_state is not env.state
+    next_state[0] = -1
+    assert env.state[0] != -1
+
+
+def test_float32_cube(data, indicator_list):
+    env = make_env(data, indicator_list, cube_dtype=np.float32)
+    assert env.cube.data.dtype == np.float32
+    state, _ = env.reset()
+    assert state.dtype == np.float64
+    np.testing.assert_allclose(state[1:4], data.loc[0, "close"], rtol=1e-6)
+
+
+def reference_trades(env, actions):
+    # the per-index loop StockTradingEnv.step used before vectorization
+    argsort_actions = np.argsort(actions)
+    sell_index = argsort_actions[: np.where(actions < 0)[0].shape[0]]
+    buy_index = argsort_actions[::-1][: np.where(actions > 0)[0].shape[0]]
+    for index in sell_index:
+        actions[index] = env._sell_stock(index, actions[index]) * (-1)
+    for index in buy_index:
+        actions[index] = env._buy_stock(index, actions[index])
+
+
+@pytest.mark.parametrize("seed", range(200))
+@pytest.mark.parametrize("frame", ["data", "wide_data"])
+def test_execute_trades_matches_reference(request, frame, indicator_list, seed):
+    # Prove that the vectorized kernel reproduces the loop bit for bit on
+    # random portfolios, including tight cash, disabled tickers and turbulence
+    rng = np.random.default_rng(seed)
+    env = make_env(request.getfixturevalue(frame), indicator_list, turbulence_threshold=50)
+    env.reset()
+    n = env.stock_dim
+    env.buy_cost_pct = list(rng.uniform(0, 0.01, n))
+    env.sell_cost_pct = list(rng.uniform(0, 0.01, n))
+
+    state = env.state.copy()
+    state[0] = rng.choice([0.0, rng.uniform(0, 500), rng.uniform(0, 1e5)])
+    state[1 : n + 1] = rng.uniform(1, 300, n)
+    state[n + 1 : 2 * n + 1] = rng.integers(0, 50, n) * rng.integers(0, 2, n)
+    state[2 * n + 1 : 3 * n + 1] = rng.choice([0.0, 1.0, 0.3], n)
+    turbulence = rng.choice([0.0, 50.0, 80.0])
+    actions = (rng.uniform(-1, 1, n) * env.hmax).astype(int)
+    if turbulence >= env.turbulence_threshold:
+        actions = np.array([-env.hmax] * n)
+
+    results = []
+    for run in (reference_trades, StockTradingEnv._execute_trades):
+        env.state = state.copy()
+        env.turbulence = turbulence
+        env.cost, env.trades = 1.5, 3
+        executed = actions.copy()
+        run(env, executed)
+        results.append((env.state.copy(), env.cost, env.trades, executed))
+
+    (ref_state, ref_cost, ref_trades, ref_actions), result = results
+    np.testing.assert_array_equal(result[0], ref_state)
+    assert result[1] == ref_cost
+    assert result[2] == ref_trades
+    np.testing.assert_array_equal(result[3], ref_actions)
+
+
+def make_vec_env(df, indicator_list, num_envs, **kwargs):
+    stock_dim = df.tic.nunique()
+    return StockTradingVecEnv(
+        df,
+        num_envs=num_envs,
+        stock_dim=stock_dim,
+        hmax=100,
+        initial_amount=1e6,
+        num_stock_shares=[0] * stock_dim,
+        buy_cost_pct=[0.001] * stock_dim,
+        sell_cost_pct=[0.001] * stock_dim,
+        reward_scaling=1e-4,
+        tech_indicator_list=indicator_list,
+        **kwargs,
+    )
+
+
+@pytest.mark.parametrize("turbulence_threshold", [None, 50])
+def test_vec_env_matches_dummy_vec_env(wide_data, indicator_list, turbulence_threshold):
+    # Prove that N batched portfolios step exactly like N StockTradingEnvs,
+    # across episode boundaries
+    num_envs = 3
+    dummy = DummyVecEnv(
+        [
+            lambda: make_env(wide_data, indicator_list, turbulence_threshold=turbulence_threshold)
+            for _ in range(num_envs)
+        ]
+    )
+    vec = make_vec_env(
+        wide_data, indicator_list, num_envs, turbulence_threshold=turbulence_threshold
+    )
+    np.testing.assert_array_equal(dummy.reset(), vec.reset())
+    rng = np.random.default_rng(0)
+    for _ in range(12):
+        actions = rng.uniform(-1, 1, (num_envs, 25)).astype(np.float32)
+        expected, result = dummy.step(actions.copy()), vec.step(actions.copy())
+        for e, r in zip(expected[:3], result[:3]):
+            np.testing.assert_array_equal(e, r)
+
+
+def test_vec_env_random_start(data, indicator_list):
+    vec = make_vec_env(data, indicator_list, 64, random_start=True)
+    vec.seed(7)
+    vec.reset()
+    first = vec.day.copy()
+    assert len(np.unique(first)) > 1
+    assert first.max() < vec.cube.n_days - 1
+    vec.seed(7)
+    vec.reset()
+    np.testing.assert_array_equal(first, vec.day)
+
+
+def run_episode(env, seed=1):
+    rng = np.random.default_rng(seed)
+    env.reset()
+    states, done = [], False
+    while not done:
+        state, _, done, _, _ = env.step(rng.uniform(-1, 1, env.stock_dim))
+        if not done:
+            states.append(state.copy())
+    return np.array(states)
+
+
+@pytest.mark.parametrize("level", ["none", "summary", "full"])
+def test_record_levels(data, indicator_list, level):
+    # Prove that every level reports the same episode and keeps only its share
+    full = make_env(data, indicator_list, turbulence_threshold=50)
+    env = make_env(data, indicator_list, turbulence_threshold=50, record_level=level)
+    states = run_episode(full)
+    run_episode(env)
+    np.testing.assert_array_equal(env.state, full.state)
+    assert env.recorder.n_steps == 39
+    assert env.recorder.last_asset == full.asset_memory[-1]
+
+    np.testing.assert_array_equal(full.state_memory, states)
+    assert list(full.date_memory) == list(data.date.unique())
+    returns = full.save_asset_memory().account_value.pct_change(1)
+    expected_sharpe = (252**0.5) * returns.mean() / returns.std()
+    assert full.recorder.sharpe() == pytest.approx(expected_sharpe, rel=1e-12)
+    if level == "none":
+        np.testing.assert_array_equal(env.asset_memory, full.asset_memory[:1])
+        assert env.recorder.sharpe() is None
+    else:
+        np.testing.assert_array_equal(env.asset_memory, full.asset_memory)
+    if level != "full":
+        with pytest.raises(ValueError):
+            env.save_action_memory()
+
+
+def test_recorder_grows_past_capacity():
+    recorder = EpisodeRecorder("full", 2, action_dim=2, state_dim=3)
+    recorder.reset(100.0, "d0")
+    for i in range(1, 6):
+        recorder.record(100.0 + i, f"d{i}", float(i), [i, -i], np.full(3, i))
+    np.testing.assert_array_equal(recorder.assets, 100.0 + np.arange(6))
+    assert list(recorder.dates) == [f"d{i}" for i in range(6)]
+    np.testing.assert_array_equal(recorder.actions[:, 1], -np.arange(1, 6))
+    np.testing.assert_array_equal(recorder.states[-1], [5, 5, 5])
+
+
+def test_snapshot_restore_resumes_episode(data, indicator_list):
+    env = make_env(data, indicator_list, turbulence_threshold=50)
+    rng = np.random.default_rng(3)
+    actions = rng.uniform(-1, 1, (30, env.stock_dim))
+    env.reset()
+    for action in actions[:10]:
+        env.step(action)
+    snapshot = env.snapshot()
+    expected = [env.step(action)[:2] for action in actions[10:]]
+
+    state = env.restore(snapshot)
+    assert env.day == snapshot.day
+    assert state[0] == snapshot.cash
+    for action, (expected_state, expected_reward) in zip(actions[10:], expected):
+        state, reward, _, _, _ = env.step(action)
+        np.testing.assert_array_equal(state, expected_state)
+        assert reward == expected_reward
+
+
+def test_window_handoff_matches_previous_state(data, indicator_list):
+    # Prove that moving one env to the next window replaces rebuilding it
+    # from a previous_state list on the window's rows
+    rng = np.random.default_rng(4)
+    env = make_env(data, indicator_list)
+    actions = rng.uniform(-1, 1, (40, env.stock_dim))
+    env.set_window(0, 19)
+    env.reset()
+    for action in actions[:19]:
+        env.step(action)
+    snapshot, last_state = env.snapshot(), list(env.render())
+
+    env.set_window(20, 39)
+    state = env.restore(snapshot, day=20)
+    window = data[data.date >= data.date.unique()[20]].copy()
+    window.index = window.date.factorize()[0]
+    rebuilt = make_env(window, indicator_list, initial=False, previous_state=last_state)
+    expected, _ = rebuilt.reset()
+    np.testing.assert_array_equal(state, expected)
+    assert env.recorder.initial_asset == rebuilt.recorder.initial_asset
+    for action in actions[20:]:
+        state, reward, terminal, _, _ = env.step(action)
+        expected, expected_reward, expected_terminal, _, _ = rebuilt.step(action)
+        np.testing.assert_array_equal(state, expected)
+        assert (reward, terminal) == (expected_reward, expected_terminal)
+    assert terminal and env.day == 39
+    assert (env.cost, env.trades) == (rebuilt.cost, rebuilt.trades)
+    with pytest.raises(ValueError):
+        env.set_window(10, 40)
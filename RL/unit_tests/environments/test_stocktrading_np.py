@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from finrl.meta.env_stock_trading.env_stocktrading_np import StockTradingEnv
+
+
+def make_env(if_train=True, n_days=60, **kwargs):
+    rng = np.random.default_rng(0)
+    config = {
+        "price_array": rng.uniform(10, 100, (n_days, 4)),
+        "tech_array": rng.normal(size=(n_days, 8)),
+        "turbulence_array": rng.uniform(0, 50, n_days),
+        "if_train": if_train,
+    }
+    return StockTradingEnv(config, step_kernel="numpy", **kwargs)
+
+
+def run_episode(env, seed=None, options=None):
+    state, _ = env.reset(seed=seed, options=options)
+    start, steps = env.day, 0
+    while True:
+        state, _, terminated, truncated, _ = env.step(np.full(env.action_dim, 0.5))
+        steps += 1
+        if terminated or truncated:
+            return start, steps, terminated, truncated, state
+
+
+def test_full_episode_by_default():
+    env = make_env()
+    assert run_episode(env, seed=0)[:4] == (0, env.max_step, True, False)
+
+
+def test_truncated_random_episodes():
+    env = make_env(episode_length=10, random_start=True)
+    starts = set()
+    for seed in range(20):
+        start, steps, terminated, truncated, _ = run_episode(env, seed=seed)
+        assert 0 <= start <= env.max_step - 10
+        assert (steps, terminated, truncated) == (10, start + 10 == env.max_step, start + 10 != env.max_step)
+        starts.add(start)
+    assert len(starts) > 1
+
+
+def test_seeding_is_deterministic():
+    env_a, env_b = make_env(random_start=True), make_env(random_start=True)
+    for seed in (3, 4):
+        a, b = run_episode(env_a, seed=seed), run_episode(env_b, seed=seed)
+        assert a[:4] == b[:4]
+        np.testing.assert_array_equal(a[4], b[4])
+
+
+def test_start_day_option_and_evaluation():
+    env = make_env(episode_length=5)
+    assert run_episode(env, options={"start_day": 20})[:4] == (20, 5, False, True)
+    env = make_env(if_train=False, episode_length=5, random_start=True)
+    assert run_episode(env, seed=1)[:4] == (0, env.max_step, True, False)
+
+
+def test_invalid_episode_length():
+    with pytest.raises(ValueError):
+        make_env(episode_length=0)
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from finrl.meta.env_stock_trading.env_stocktrading import StockTradingEnv
+from finrl.meta.env_stock_trading.env_stocktrading_sparse import (
+    StockTradingSparseEnv,
+)
+from finrl.meta.env_stock_trading.market_cube import SparseMarket
+
+INDICATORS = ["macd", "rsi_30"]
+
+
+def make_frame(tics, n_days=30, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (n_days, len(tics))), axis=0))
+    df = pd.DataFrame(
+        {
+            "date": np.repeat(pd.bdate_range("2020-01-01", periods=n_days), len(tics)),
+            "tic": np.tile(tics, n_days),
+            "close": close.ravel(),
+            "turbulence": np.repeat(rng.uniform(0, 100, n_days), len(tics)),
+        }
+    )
+    for tech in INDICATORS:
+        df[tech] = rng.normal(size=len(df))
+    df.index = np.repeat(np.arange(n_days), len(tics))
+    return df
+
+
+@pytest.fixture(scope="session")
+def ragged():
+    # CCC lists on day 10, AAA delists after day 19
+    df = make_frame(["AAA", "BBB", "CCC"])
+    day = df.index
+    keep = ~((df.tic == "CCC") & (day < 10)) & ~((df.tic == "AAA") & (day >= 20))
+    return df[keep].sample(frac=1, random_state=0)
+
+
+def make_env(df, **kwargs):
+    return StockTradingSparseEnv(
+        df,
+        hmax=100,
+        initial_amount=1e6,
+        buy_cost_pct=0.001,
+        sell_cost_pct=0.001,
+        reward_scaling=1e-4,
+        tech_indicator_list=INDICATORS,
+        print_verbosity=10**9,
+        **kwargs,
+    )
+
+
+def test_sparse_market_index(ragged):
+    market = SparseMarket.from_df(ragged, ["close"] + INDICATORS)
+    assert list(market.tics) == ["AAA", "BBB", "CCC"]
+    assert market.max_active == 3
+    counts = np.diff(market.indptr)
+    np.testing.assert_array_equal(counts, [2] * 10 + [3] * 10 + [2] * 10)
+    ids, values = market.day(25)
+    np.testing.assert_array_equal(ids, [1, 2])
+    rows = ragged[ragged.index == 25].sort_values("tic")
+    np.testing.assert_array_equal(values, rows[["close"] + INDICATORS].to_numpy())
+    with pytest.raises(ValueError):
+        SparseMarket.from_df(pd.concat([ragged, ragged.iloc[:1]]), ["close"])
+
+
+def test_dense_universe_matches_stocktrading_env():
+    # Prove that with every ticker active the sparse env trades like
+    # StockTradingEnv
+    df = make_frame(["AAA", "BBB", "CCC"])
+    sparse = make_env(df, turbulence_threshold=60)
+    dense = StockTradingEnv(
+        df=df,
+        stock_dim=3,
+        hmax=100,
+        initial_amount=1e6,
+        num_stock_shares=[0] * 3,
+        buy_cost_pct=[0.001] * 3,
+        sell_cost_pct=[0.001] * 3,
+        reward_scaling=1e-4,
+        state_space=1 + 2 * 3 + len(INDICATORS) * 3,
+        action_space=3,
+        tech_indicator_list=INDICATORS,
+        turbulence_threshold=60,
+        print_verbosity=10**9,
+    )
+    state, _ = sparse.reset()
+    expected, _ = dense.reset()
+    rng = np.random.default_rng(1)
+    for _ in range(29):
+        np.testing.assert_array_equal(state[: len(expected)], expected)
+        np.testing.assert_array_equal(state[len(expected) :], 1)
+        action = rng.uniform(-1, 1, 3)
+        state, reward, terminal, _, _ = sparse.step(action)
+        expected, expected_reward, _, _, _ = dense.step(action)
+        assert reward == pytest.approx(expected_reward, rel=1e-9, abs=1e-12)
+    assert sparse.step(action)[2]
+
+
+def test_padding_and_delisting(ragged):
+    env = make_env(ragged)
+    k = env.max_active
+    state, _ = env.reset()
+    assert list(env.active_tics) == ["AAA", "BBB"]
+    np.testing.assert_array_equal(state[-k:], [1, 1, 0])
+    np.testing.assert_array_equal(state[1:].reshape(-1, k)[:, 2], 0)
+    for day in range(19):
+        state, _, _, _, _ = env.step(np.ones(k))
+        assert len(env.active_tics) == (2 if day < 9 else 3)
+    held = env.holdings[0]
+    assert held > 0
+    cash, price = env.cash, env._price[0]
+    state, _, _, _, _ = env.step(np.zeros(k))
+    assert list(env.active_tics) == ["BBB", "CCC"]
+    assert env.holdings[0] == 0
+    assert env.cash == pytest.approx(cash + held * price * (1 - 0.001))
+    np.testing.assert_array_equal(state[-k:], [1, 1, 0])
+
+
+def test_max_active_too_small(ragged):
+    with pytest.raises(ValueError):
+        make_env(ragged, max_active=2)
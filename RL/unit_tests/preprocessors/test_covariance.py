@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from finrl.meta.env_portfolio_allocation.env_portfolio import StockPortfolioEnv
+from finrl.meta.preprocessor.covariance import lookback_covariances
+from finrl.meta.preprocessor.covariance import rolling_covariance
+
+
+@pytest.fixture(scope="session")
+def data():
+    rng = np.random.default_rng(0)
+    n_days, tics = 60, ["GOOG", "AAPL", "MSFT", "AMZN"]
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (n_days, len(tics))), axis=0))
+    return pd.DataFrame(
+        {
+            "date": np.repeat(
+                pd.bdate_range("2020-01-01", periods=n_days).strftime("%Y-%m-%d"),
+                len(tics),
+            ),
+            "tic": np.tile(tics, n_days),
+            "close": close.ravel(),
+            "macd": rng.normal(size=close.size),
+        }
+    ).sample(frac=1, random_state=0)
+
+
+def notebook_covariances(df, lookback):
+    # the per-date loop the portfolio allocation notebooks use
+    df = df.sort_values(["date", "tic"], ignore_index=True)
+    df.index = df.date.factorize()[0]
+    cov_list = []
+    for i in range(lookback, len(df.index.unique())):
+        data_lookback = df.loc[i - lookback : i, :]
+        price_lookback = data_lookback.pivot_table(
+            index="date", columns="tic", values="close"
+        )
+        return_lookback = price_lookback.pct_change().dropna()
+        cov_list.append(return_lookback.cov().values)
+    df_cov = pd.DataFrame({"date": df.date.unique()[lookback:], "cov_list": cov_list})
+    df = df.merge(df_cov, on="date")
+    df = df.sort_values(["date", "tic"]).reset_index(drop=True)
+    df.index = df.date.factorize()[0]
+    return df
+
+
+@pytest.mark.parametrize("refresh", [None, 7])
+def test_rolling_covariance_matches_numpy(refresh):
+    returns = np.random.default_rng(1).normal(0.001, 0.02, (200, 5))
+    covs = rolling_covariance(returns, 30, dtype=np.float64, refresh=refresh)
+    assert covs.shape == (171, 5, 5)
+    for k in [0, 1, 50, 170]:
+        np.testing.assert_allclose(
+            covs[k], np.cov(returns[k : k + 30], rowvar=False), rtol=1e-9, atol=1e-15
+        )
+
+
+def test_lookback_covariances_match_notebook_loop(data):
+    expected = notebook_covariances(data, 20)
+    df, covs = lookback_covariances(data, lookback=20)
+    assert covs.dtype == np.float32
+    assert covs.shape == (40, 4, 4)
+    pd.testing.assert_frame_equal(df, expected.drop(columns="cov_list"))
+    for day in range(40):
+        np.testing.assert_allclose(
+            covs[day], expected.loc[day, "cov_list"].values[0], rtol=1e-5, atol=1e-9
+        )
+
+
+def test_env_reads_cov_array(data):
+    expected = notebook_covariances(data, 20)
+    df, covs = lookback_covariances(data, lookback=20)
+    kwargs = dict(
+        stock_dim=4,
+        hmax=100,
+        initial_amount=1e6,
+        transaction_cost_pct=0,
+        reward_scaling=1e-4,
+        state_space=4,
+        action_space=4,
+        tech_indicator_list=["macd"],
+    )
+    env = StockPortfolioEnv(df, cov_array=covs, **kwargs)
+    reference = StockPortfolioEnv(expected, **kwargs)
+    state, _ = env.reset()
+    reference_state, _ = reference.reset()
+    actions = np.random.default_rng(2).normal(size=(5, 4))
+    for a in actions:
+        np.testing.assert_allclose(state, reference_state, rtol=1e-5, atol=1e-9)
+        state, *_ = env.step(a)
+        reference_state, *_ = reference.step(a)
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from importlib import metadata
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("stockstats")
+
+from stockstats import StockDataFrame as Sdf  # noqa: E402
+
+from finrl.meta.preprocessor.preprocessors import FeatureEngineer  # noqa: E402
+
+INDICATORS = ["macd", "boll_ub", "rsi_30", "close_30_sma"]
+
+
+@pytest.fixture(scope="session")
+def data():
+    rng = np.random.default_rng(0)
+    n_days, tics = 80, ["MSFT", "AAPL", "GOOG"]
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (n_days, len(tics))), axis=0))
+    return pd.DataFrame(
+        {
+            "date": np.repeat(
+                pd.bdate_range("2020-01-01", periods=n_days).strftime("%Y-%m-%d"),
+                len(tics),
+            ),
+            "tic": np.tile(tics, n_days),
+            "open": close.ravel(),
+            "high": close.ravel() * 1.01,
+            "low": close.ravel() * 0.99,
+            "close": close.ravel(),
+            "volume": rng.integers(1e5, 1e6, close.size).astype(float),
+        }
+    )
+
+
+def loop_indicators(data, indicators):
+    # the indicator x ticker loop add_technical_indicator used before
+    df = data.copy()
+    df = df.sort_values(by=["tic", "date"])
+    stock = Sdf.retype(df.copy())
+    unique_ticker = stock.tic.unique()
+    for indicator in indicators:
+        indicator_df = pd.DataFrame()
+        for tic in unique_ticker:
+            temp_indicator = pd.DataFrame(stock[stock.tic == tic][indicator])
+            temp_indicator["tic"] = tic
+            temp_indicator["date"] = df[df.tic == tic]["date"].to_list()
+            indicator_df = pd.concat(
+                [indicator_df, temp_indicator], axis=0, ignore_index=True
+            )
+        df = df.merge(
+            indicator_df[["tic", "date", indicator]], on=["tic", "date"], how="left"
+        )
+    return df.sort_values(by=["date", "tic"])
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_matches_indicator_loop(data, n_jobs):
+    fe = FeatureEngineer(tech_indicator_list=INDICATORS, n_jobs=n_jobs)
+    result = fe.add_technical_indicator(data)
+    expected = loop_indicators(data, INDICATORS)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+@pytest.mark.skipif(
+    not metadata.version("stockstats").startswith("0.5."),
+    reason="the native engine follows stockstats 0.5",
+)
+def test_native_engine_matches_indicator_loop(data):
+    fe = FeatureEngineer(tech_indicator_list=INDICATORS, indicator_engine="native")
+    result = fe.add_technical_indicator(data)
+    expected = loop_indicators(data, INDICATORS)
+    pd.testing.assert_frame_equal(result, expected, check_exact=False, rtol=1e-9)
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+from importlib import metadata
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from finrl.meta.preprocessor.indicators import compute_indicators
+from finrl.meta.preprocessor.indicators import ewm_mean
+from finrl.meta.preprocessor.indicators import indicator_frame
+from finrl.meta.preprocessor.indicators import rolling
+
+INDICATORS = [
+    "macd",
+    "boll_ub",
+    "boll_lb",
+    "rsi_30",
+    "cci_30",
+    "dx_30",
+    "close_30_sma",
+    "close_60_sma",
+]
+
+
+def stockstats_05():
+    pytest.importorskip("stockstats")
+    if not metadata.version("stockstats").startswith("0.5."):
+        pytest.skip("the native indicators follow stockstats 0.5")
+    from stockstats import StockDataFrame
+
+    return StockDataFrame
+
+
+def make_frame(n_days=120, tics=("MSFT", "AAPL", "GOOG", "AMZN"), seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (n_days, len(tics))), axis=0))
+    spread = rng.uniform(0, 0.02, close.shape)
+    df = pd.DataFrame(
+        {
+            "date": np.repeat(
+                pd.bdate_range("2020-01-01", periods=n_days).strftime("%Y-%m-%d"),
+                len(tics),
+            ),
+            "tic": np.tile(tics, n_days),
+            "open": close.ravel(),
+            "high": (close * (1 + spread)).ravel(),
+            "low": (close * (1 - spread)).ravel(),
+            "close": close.ravel(),
+            "volume": rng.integers(1e5, 1e6, close.size).astype(float),
+        }
+    )
+    # AMZN lists late, GOOG delists early
+    day = np.repeat(np.arange(n_days), len(tics))
+    keep = ~((df.tic == "AMZN") & (day < 30)) & ~((df.tic == "GOOG") & (day >= 90))
+    return df[keep].sample(frac=1, random_state=0)
+
+
+@pytest.mark.parametrize("alpha", [2 / 13, 1 / 30])
+def test_ewm_matches_pandas(alpha):
+    rng = np.random.default_rng(1)
+    x = rng.normal(size=(50, 4))
+    x[:5, 1] = np.nan
+    x[20:23, 2] = np.nan
+    x[40:, 3] = np.nan
+    expected = pd.DataFrame(x).ewm(alpha=alpha, adjust=True).mean().to_numpy()
+    np.testing.assert_allclose(ewm_mean(x, alpha), expected, rtol=1e-12)
+
+
+def test_rolling_matches_pandas():
+    rng = np.random.default_rng(2)
+    x = rng.normal(size=(40, 3))
+    x[:4, 1] = np.nan
+    x[30:, 2] = np.nan
+    frame = pd.DataFrame(x).rolling(7, min_periods=1)
+    np.testing.assert_allclose(rolling(x, 7, "mean", chunk=6), frame.mean(), rtol=1e-12)
+    np.testing.assert_allclose(rolling(x, 7, "std", chunk=6), frame.std(), rtol=1e-12)
+    # stockstats applies the mean deviation to each window Series, whose
+    # means skip NaN
+    mad = frame.apply(lambda w: np.fabs(w - w.mean()).mean())
+    np.testing.assert_allclose(rolling(x, 7, "mad", chunk=6), mad, rtol=1e-12)
+
+
+@pytest.mark.parametrize("gaps", [False, True])
+def test_matches_stockstats(gaps):
+    Sdf = stockstats_05()
+    df = make_frame()
+    if gaps:
+        # missing prices inside a ticker's history
+        df.loc[df.sample(12, random_state=1).index, "close"] = np.nan
+        df.loc[df.sample(12, random_state=2).index, ["high", "low"]] = np.nan
+    result = indicator_frame(df, INDICATORS)
+    for tic, group in df.groupby("tic"):
+        group = group.sort_values("date")
+        stock = Sdf.retype(group.copy())
+        for indicator in INDICATORS:
+            np.testing.assert_allclose(
+                result.loc[group.index, indicator],
+                stock[indicator].to_numpy(),
+                rtol=1e-9,
+                atol=1e-9,
+                err_msg=f"{tic} {indicator}",
+            )
+
+
+def test_ragged_tickers_use_their_own_rows():
+    df = make_frame()
+    result = indicator_frame(df, INDICATORS)
+    for tic, group in df.groupby("tic"):
+        alone = indicator_frame(group, INDICATORS)
+        pd.testing.assert_frame_equal(result.loc[group.index], alone.loc[group.index])
+
+
+def test_unknown_indicator():
+    close = np.ones((5, 2))
+    with pytest.raises(ValueError):
+        compute_indicators(["kdjk"], close)
+    with pytest.raises(ValueError):
+        compute_indicators(["dx_30"], close)
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+from importlib import metadata
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from finrl.meta.preprocessor.indicators import compute_indicators
+from finrl.meta.preprocessor.indicators import indicator_frame
+from finrl.meta.preprocessor.streaming import IndicatorStream
+from finrl.meta.preprocessor.streaming import LiveBars
+
+INDICATORS = [
+    "macd",
+    "macdh",
+    "boll_ub",
+    "boll_lb",
+    "rsi_30",
+    "cci_30",
+    "dx_30",
+    "close_30_sma",
+    "high_10_ema",
+]
+
+
+def make_prices(n_bars=150, n_tics=3, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (n_bars, n_tics)), axis=0))
+    spread = rng.uniform(0, 0.01, close.shape)
+    return close, close * (1 + spread), close * (1 - spread)
+
+
+def test_stream_matches_batch():
+    close, high, low = make_prices()
+    close[:10, 2] = np.nan  # a ticker that starts late
+    high[:10, 2] = low[:10, 2] = np.nan
+    expected = compute_indicators(INDICATORS, close, high=high, low=low)
+    stream = IndicatorStream(INDICATORS, close.shape[1])
+    for t in range(len(close)):
+        values = stream.update(close[t], high[t], low[t])
+        for j, name in enumerate(INDICATORS):
+            np.testing.assert_allclose(
+                values[:, j], expected[name][t], rtol=1e-9, atol=1e-9, err_msg=name
+            )
+
+
+def test_stream_dx_matches_stockstats():
+    pytest.importorskip("stockstats")
+    if not metadata.version("stockstats").startswith("0.5."):
+        pytest.skip("the native indicators follow stockstats 0.5")
+    from stockstats import StockDataFrame as Sdf
+
+    close, high, low = make_prices(n_tics=1)
+    stream = IndicatorStream(["dx_30"], 1)
+    values = [stream.update(close[t], high[t], low[t])[0, 0] for t in range(len(close))]
+    stock = Sdf.retype(
+        pd.DataFrame({"close": close[:, 0], "high": high[:, 0], "low": low[:, 0]})
+    )
+    np.testing.assert_allclose(values, stock["dx_30"], rtol=1e-9, atol=1e-9)
+
+
+def test_warm_then_update():
+    close, high, low = make_prices()
+    a = IndicatorStream(INDICATORS, 3)
+    b = IndicatorStream(INDICATORS, 3)
+    a.warm(close, high, low)
+    b.warm(close[:100], high[:100], low[:100])
+    for t in range(100, len(close)):
+        b.update(close[t], high[t], low[t])
+    np.testing.assert_array_equal(a.values, b.values)
+
+
+def test_missing_columns():
+    stream = IndicatorStream(["dx_30"], 2)
+    with pytest.raises(ValueError):
+        stream.update(np.ones(2))
+
+
+def test_live_bars_match_batch_frame():
+    tics = ["AAA", "BBB", "CCC"]
+    close, high, low = make_prices(n_tics=len(tics))
+    times = pd.date_range("2024-01-02 09:30", periods=len(close), freq="min")
+    df = pd.DataFrame(
+        {
+            "timestamp": np.repeat(times, len(tics)),
+            "tic": np.tile(tics, len(times)),
+            "close": close.ravel(),
+            "high": high.ravel(),
+            "low": low.ravel(),
+        }
+    )
+    live = LiveBars(tics, INDICATORS)
+    live.update(df[df.timestamp < times[100]])
+    for t in range(100, len(times), 4):
+        # overlapping downloads: only the bars after the last one are added
+        live.update(df[(df.timestamp > times[t - 5]) & (df.timestamp <= times[t])])
+        history = df[df.timestamp <= times[t]]
+        expected = indicator_frame(history, INDICATORS, time_col="timestamp")
+        latest = expected[history.timestamp == times[t]]
+        np.testing.assert_allclose(live.tech, latest.to_numpy().ravel(), rtol=1e-9)
+        np.testing.assert_array_equal(live.price, close[t])
+
+
+def test_live_bars_repeat_close_of_missing_bar():
+    tics = ["AAA", "BBB"]
+    times = pd.date_range("2024-01-02 09:30", periods=3, freq="min")
+    df = pd.DataFrame(
+        {
+            "timestamp": [times[0], times[0], times[1], times[2], times[2]],
+            "tic": ["AAA", "BBB", "AAA", "AAA", "BBB"],
+            "close": [1.0, 2.0, 1.5, 1.2, 2.5],
+        }
+    )
+    live = LiveBars(tics, ["close_2_sma"])
+    live.update(df[df.timestamp <= times[1]])
+    np.testing.assert_array_equal(live.price, [1.5, 2.0])
+    live.update(df)
+    np.testing.assert_allclose(live.tech, [1.35, 2.25])
+
+
+def test_live_bars_replace_forming_bar():
+    tics = ["AAA", "BBB"]
+    close, high, low = make_prices(n_bars=60, n_tics=len(tics))
+    times = pd.date_range("2024-01-02 09:30", periods=len(close), freq="min")
+    df = pd.DataFrame(
+        {
+            "timestamp": np.repeat(times, len(tics)),
+            "tic": np.tile(tics, len(times)),
+            "close": close.ravel(),
+            "high": high.ravel(),
+            "low": low.ravel(),
+        }
+    )
+    # the last minute of the first download is still forming
+    forming = df[df.timestamp <= times[40]].copy()
+    forming.loc[forming.timestamp == times[40], ["close", "high", "low"]] *= 1.05
+    live = LiveBars(tics, INDICATORS)
+    live.update(forming)
+    tech = live.tech
+    kept = tech.copy()
+    live.update(df[df.timestamp >= times[40]])
+    expected = indicator_frame(df, INDICATORS, time_col="timestamp")
+    latest = expected[df.timestamp == times[-1]]
+    np.testing.assert_allclose(live.tech, latest.to_numpy().ravel(), rtol=1e-9)
+    # earlier results are not overwritten by later updates
+    np.testing.assert_array_equal(tech, kept)
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from finrl.meta.preprocessor.turbulence import calculate_turbulence
+from finrl.meta.preprocessor.turbulence import turbulence_index
+
+TIME_PERIOD = 40
+
+
+def loop_turbulence(data, time_period):
+    # the per-date loop calculate_turbulence used before
+    df = data.copy()
+    df_price_pivot = df.pivot(index="date", columns="tic", values="close")
+    df_price_pivot = df_price_pivot.pct_change()
+    unique_date = df.date.unique()
+    turbulence_index = [0] * time_period
+    count = 0
+    for i in range(time_period, len(unique_date)):
+        current_price = df_price_pivot[df_price_pivot.index == unique_date[i]]
+        hist_price = df_price_pivot[
+            (df_price_pivot.index < unique_date[i])
+            & (df_price_pivot.index >= unique_date[i - time_period])
+        ]
+        filtered_hist_price = hist_price.iloc[
+            hist_price.isna().sum().min() :
+        ].dropna(axis=1)
+        cov_temp = filtered_hist_price.cov()
+        current_temp = current_price[[x for x in filtered_hist_price]] - np.mean(
+            filtered_hist_price, axis=0
+        )
+        temp = current_temp.values.dot(np.linalg.pinv(cov_temp)).dot(
+            current_temp.values.T
+        )
+        if temp > 0:
+            count += 1
+            turbulence_temp = temp[0][0] if count > 2 else 0
+        else:
+            turbulence_temp = 0
+        turbulence_index.append(turbulence_temp)
+    return pd.DataFrame({"date": df_price_pivot.index, "turbulence": turbulence_index})
+
+
+@pytest.fixture(scope="session")
+def data():
+    rng = np.random.default_rng(0)
+    n_days, tics = 160, ["AAA", "BBB", "CCC", "DDD", "EEE"]
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (n_days, len(tics))), axis=0))
+    df = pd.DataFrame(
+        {
+            "date": np.repeat(
+                pd.bdate_range("2020-01-01", periods=n_days).strftime("%Y-%m-%d"),
+                len(tics),
+            ),
+            "tic": np.tile(tics, n_days),
+            "close": close.ravel(),
+        }
+    )
+    # DDD lists on day 60, EEE misses a few days
+    day = np.repeat(np.arange(n_days), len(tics))
+    df.loc[(df.tic == "DDD") & (day < 60), "close"] = np.nan
+    df.loc[(df.tic == "EEE") & (day >= 100) & (day < 103), "close"] = np.nan
+    return df.dropna().reset_index(drop=True)
+
+
+@pytest.mark.parametrize("n_jobs", [1, 3])
+def test_matches_loop(data, n_jobs):
+    result = calculate_turbulence(data, time_period=TIME_PERIOD, n_jobs=n_jobs)
+    expected = loop_turbulence(data, TIME_PERIOD)
+    pd.testing.assert_series_equal(result.date, expected.date)
+    np.testing.assert_allclose(
+        result.turbulence, expected.turbulence.astype(float), rtol=1e-7, atol=1e-9
+    )
+    assert (result.turbulence[TIME_PERIOD:] > 0).sum() > 50
+
+
+def test_singular_window_matches_pinv():
+    # more tickers than returns in a window, and a ticker that never moves
+    rng = np.random.default_rng(1)
+    n_days, n_tics = 40, 12
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (n_days, n_tics)), axis=0))
+    close[:, 3] = 100
+    data = pd.DataFrame(
+        {
+            "date": np.repeat(np.arange(n_days), n_tics),
+            "tic": np.tile(np.arange(n_tics), n_days),
+            "close": close.ravel(),
+        }
+    )
+    result = calculate_turbulence(data, time_period=8)
+    expected = loop_turbulence(data, time_period=8)
+    np.testing.assert_allclose(
+        result.turbulence, expected.turbulence.astype(float), rtol=1e-6, atol=1e-9
+    )
+
+
+def test_short_history():
+    np.testing.assert_array_equal(turbulence_index(np.ones((5, 2)), 10), 0)
+
+
+def test_near_collinear_window_matches_pinv():
+    # one ticker repeats another up to noise far below pinv's cutoff
+    rng = np.random.default_rng(2)
+    n_days, n_tics = 160, 5
+    returns = rng.normal(0, 0.02, (n_days, n_tics))
+    returns[:, 1] = returns[:, 0] + 1e-9 * rng.normal(size=n_days)
+    close = 100 * np.exp(np.cumsum(returns, axis=0))
+    data = pd.DataFrame(
+        {
+            "date": np.repeat(np.arange(n_days), n_tics),
+            "tic": np.tile(np.arange(n_tics), n_days),
+            "close": close.ravel(),
+        }
+    )
+    result = calculate_turbulence(data, time_period=TIME_PERIOD)
+    expected = loop_turbulence(data, TIME_PERIOD)
+    np.testing.assert_allclose(
+        result.turbulence, expected.turbulence.astype(float), rtol=1e-7, atol=1e-9
+    )
@@ -76,7 +76,14 @@ class KalshiPolicy:
         rewards = torch.FloatTensor(rewards)
         next_states = torch.FloatTensor(np.array(next_states))
         dones = torch.FloatTensor(dones)
+        self.update(states, actions, rewards, next_states, dones)
 
+        if done:
+            self.epsilon = max(self.epsilon_min, self.epsilon * self.epsilon_decay)
+            self.bet_placed = False  # reset for next episode
+
+    def update(self, states, actions, rewards, next_states, dones):
+        # One gradient step on a batch of tensors; actions has shape [B, 1]
         current_q_values = self.q_network(states).gather(1, actions)
         with torch.no_grad():
             max_next_q = self.q_network(next_states).max(1)[0]
@@ -87,7 +94,4 @@ class KalshiPolicy:
         self.optimizer.zero_grad()
         loss.backward()
         self.optimizer.step()
-
-        if done:
-            self.epsilon = max(self.epsilon_min, self.epsilon * self.epsilon_decay)
-            self.bet_placed = False  # reset for next episode
+        return loss.item()
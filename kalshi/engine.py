@@ -0,0 +1,106 @@
+# Event-level decision engine: every strike of a Kalshi event (e.g. one
+# hourly KXBTC event) is scored together, since they all share the same
+# underlying price at decision time.
+import re
+import time
+
+import numpy as np
+import torch
+
+from training import featurize_batch, STATE_DIM
+
+NUMBER = re.compile(r'\$?[\d,]+(?:\.\d+)?')
+
+
+def parse_strikes(subtitles):
+    # "$94,750 to 94,999.99" -> (94750.0, 94999.99). Open-ended ranges such as
+    # "$95,000 or above" get an infinite upper/lower bound; subtitles without
+    # a number get NaN bounds.
+    low = np.empty(len(subtitles))
+    high = np.empty(len(subtitles))
+    for i, text in enumerate(subtitles):
+        nums = [float(n.replace('$', '').replace(',', '')) for n in NUMBER.findall(text)]
+        if not nums:
+            low[i], high[i] = np.nan, np.nan
+        elif len(nums) >= 2:
+            low[i], high[i] = nums[0], nums[1]
+        elif 'below' in text or 'less' in text:
+            low[i], high[i] = -np.inf, nums[0]
+        else:
+            low[i], high[i] = nums[0], np.inf
+    return low, high
+
+
+class EventEngine:
+    # Holds the strike ladder of one event and turns a tick (quotes for every
+    # strike plus the underlying price) into one action per strike with a
+    # single feature build and a single batched forward pass.
+    #
+    # Exposure limits are per event: at most max_bets open bets and at most
+    # max_cost cents spent across all strikes. Candidate bets are ranked by
+    # their Q-value edge over holding and accepted greedily within budget.
+    # Strikes whose subtitle could not be parsed always hold.
+    def __init__(self, q_network, markets, n_steps=60, max_cost=500, max_bets=3):
+        self.q_network = q_network
+        self.q_network.eval()
+        self.tickers = [m['ticker'] for m in markets]
+        low, high = parse_strikes([m['yes_sub_title'] for m in markets])
+        self.parsed = ~(np.isnan(low) | np.isnan(high))
+        # Open-ended strikes are clipped to a finite band for the features
+        finite = np.concatenate([low[np.isfinite(low)], high[np.isfinite(high)]])
+        if len(finite) == 0:
+            finite = np.zeros(1)
+        pad = np.ptp(finite) if len(finite) > 1 else 1.0
+        self.low = np.where(np.isinf(low), finite.min() - pad, low)
+        self.high = np.where(np.isinf(high), finite.max() + pad, high)
+        self.n_steps = n_steps
+        self.max_cost = max_cost
+        self.max_bets = max_bets
+
+        m = len(markets)
+        self.features = np.empty((m, STATE_DIM), dtype=np.float32)
+        self.features_t = torch.from_numpy(self.features)  # shares memory
+        self.reset()
+
+    def reset(self):
+        m = len(self.tickers)
+        self.bet = np.zeros(m, dtype=np.int64)  # 0 = none, 1 = YES, 2 = NO
+        self.cost = np.zeros(m)
+        self.last_latency = 0.0
+
+    @property
+    def spent(self):
+        return self.cost.sum()
+
+    def decide(self, j, yes_bid, yes_ask, underlying):
+        # yes_bid / yes_ask are [M] arrays in cents (NaN for no quote).
+        # Returns an [M] int array of actions: 0 hold, 1 buy YES, 2 buy NO.
+        start = time.perf_counter()
+        yes_bid = np.asarray(yes_bid, dtype=np.float64)
+        yes_ask = np.asarray(yes_ask, dtype=np.float64)
+        featurize_batch(j, self.n_steps, yes_bid, yes_ask, self.low, self.high, underlying, out=self.features)
+
+        with torch.inference_mode():
+            q = self.q_network(self.features_t).numpy()
+
+        actions = q.argmax(axis=1)
+        edge = q[np.arange(len(actions)), actions] - q[:, 0]
+        price = np.where(actions == 1, yes_ask, 100 - yes_bid)
+
+        # Strikes already bet on, or without a usable quote or strike, must hold
+        candidate = (actions != 0) & (self.bet == 0) & np.isfinite(price) & self.parsed
+        actions = np.where(candidate, actions, 0)
+
+        idx = np.flatnonzero(candidate)
+        if len(idx):
+            idx = idx[np.argsort(-edge[idx], kind="stable")]
+            slots = self.max_bets - np.count_nonzero(self.bet)
+            within = np.cumsum(price[idx]) <= self.max_cost - self.spent
+            rejected = idx[~within | (np.arange(len(idx)) >= slots)]
+            actions[rejected] = 0
+            accepted = actions != 0
+            self.bet[accepted] = actions[accepted]
+            self.cost[accepted] = price[accepted]
+
+        self.last_latency = time.perf_counter() - start
+        return actions
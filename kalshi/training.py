@@ -0,0 +1,277 @@
+# Training loops for KalshiPolicy on the recorded episodes in may.json.
+# workers=0 keeps the original single-process act/learn loop; workers>0 runs
+# actor processes that fill a shared-memory replay store while this process
+# acts as the learner.
+import argparse
+import json
+import random
+import time
+
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+from torch.nn.utils import parameters_to_vector, vector_to_parameters
+
+from agent import KalshiPolicy
+
+STATE_DIM = 5
+ACTION_DIM = 3  # 0 = hold, 1 = buy YES, 2 = buy NO
+
+
+def featurize(raw, n_steps):
+    # raw = [minute, yes_bid, yes_ask, low, high, truth]
+    j, yes_bid, yes_ask, low, high, truth = raw
+    width = (high - low) or 1.0
+    truth = (low + high) / 2 if truth is None else truth
+    return np.array([
+        j / max(n_steps - 1, 1),
+        (yes_bid or 0) / 100,
+        (yes_ask or 100) / 100,
+        (truth - low) / width,
+        (high - truth) / width,
+    ], dtype=np.float32)
+
+
+def featurize_batch(j, n_steps, yes_bid, yes_ask, low, high, truth, out=None):
+    # Vectorized featurize over M markets that share a minute and an
+    # underlying price; out is an optional [M, STATE_DIM] float32 buffer
+    yes_bid = np.nan_to_num(yes_bid, nan=0.0)
+    yes_ask = np.nan_to_num(yes_ask, nan=100.0)
+    width = high - low
+    width = np.where(width == 0, 1.0, width)
+    if out is None:
+        out = np.empty((len(low), STATE_DIM), dtype=np.float32)
+    out[:, 0] = j / max(n_steps - 1, 1)
+    out[:, 1] = yes_bid / 100
+    out[:, 2] = yes_ask / 100
+    out[:, 3] = (truth - low) / width
+    out[:, 4] = (high - truth) / width
+    return out
+
+
+class EpisodeEnv:
+    # Replays one recorded market. A bet settles at 100c on the winning side;
+    # the episode ends once a bet is placed or the tape runs out.
+    def __init__(self, episode):
+        self.result = episode['result']
+        raw = episode['states']
+        self.states = np.stack([featurize(s, len(raw)) for s in raw])
+        self.yes_bid = np.array([s[1] or 0 for s in raw], dtype=np.float32)
+        self.yes_ask = np.array([s[2] or 100 for s in raw], dtype=np.float32)
+        self.t = 0
+
+    def reset(self):
+        self.t = 0
+        return self.states[0]
+
+    def step(self, action):
+        t = self.t
+        reward = 0.0
+        if action == 1:  # buy YES at the ask
+            cost = self.yes_ask[t]
+            reward = ((100 if self.result == 'yes' else 0) - cost) / 100
+        elif action == 2:  # buy NO at 100 - yes_bid
+            cost = 100 - self.yes_bid[t]
+            reward = ((100 if self.result == 'no' else 0) - cost) / 100
+        self.t += 1
+        done = action != 0 or self.t >= len(self.states) - 1
+        return self.states[min(self.t, len(self.states) - 1)], reward, done
+
+
+def load_episodes(path="may.json"):
+    with open(path) as f:
+        return [e for e in json.load(f) if len(e['states']) > 1]
+
+
+class SharedReplay:
+    # Fixed-size ring buffer in shared memory. Actors reserve a block of slots
+    # under a lock and then write without it; once written, a block is
+    # published by advancing count in reservation order, so the learner only
+    # samples slots whose writes have finished. Once the ring wraps, a
+    # reserved block overwrites the oldest slots, so sample skips them and
+    # retries if a block was reserved over its slots while it read them.
+    def __init__(self, capacity, state_dim, ctx=mp):
+        self.capacity = capacity
+        self.states = torch.zeros(capacity, state_dim).share_memory_()
+        self.next_states = torch.zeros(capacity, state_dim).share_memory_()
+        self.actions = torch.zeros(capacity, 1, dtype=torch.long).share_memory_()
+        self.rewards = torch.zeros(capacity).share_memory_()
+        self.dones = torch.zeros(capacity).share_memory_()
+        self.reserved = ctx.Value('q', 0)  # slots handed out to writers
+        self.count = ctx.Value('q', 0)  # slots written and visible to sample
+
+    def add_batch(self, states, actions, rewards, next_states, dones, stop=None):
+        # Returns False without publishing if stop is set while the block
+        # waits for an earlier one, e.g. one whose actor died mid-write
+        n = len(actions)
+        if n > self.capacity:
+            raise ValueError(f"{n} transitions do not fit a replay of {self.capacity} slots")
+        with self.reserved.get_lock():
+            start = self.reserved.value
+            self.reserved.value += n
+        idx = torch.arange(start, start + n) % self.capacity
+        self.states[idx] = torch.from_numpy(states)
+        self.next_states[idx] = torch.from_numpy(next_states)
+        self.actions[idx, 0] = torch.from_numpy(actions)
+        self.rewards[idx] = torch.from_numpy(rewards)
+        self.dones[idx] = torch.from_numpy(dones)
+        # wait for the blocks reserved before this one, then publish it
+        while self.count.value != start:
+            if stop is not None and stop.is_set():
+                return False
+            time.sleep(0)
+        with self.count.get_lock():
+            self.count.value = start + n
+        return True
+
+    def __len__(self):
+        return min(self.count.value, self.capacity)
+
+    def sample(self, batch_size):
+        while True:
+            # absolute positions that are published and not reserved again
+            low = max(self.reserved.value - self.capacity, 0)
+            high = self.count.value
+            if low >= high:
+                time.sleep(0)
+                continue
+            pos = torch.randint(low, high, (batch_size,))
+            idx = pos % self.capacity
+            batch = (self.states[idx], self.actions[idx], self.rewards[idx],
+                     self.next_states[idx], self.dones[idx])
+            # writers reserve before writing, so if no slot read here has
+            # been reserved since, none of them was being overwritten
+            if self.reserved.value - self.capacity <= pos.min().item():
+                return batch
+
+
+def rollout(env, policy):
+    # Runs one episode and returns its transitions as stacked arrays
+    states, actions, rewards, next_states, dones = [], [], [], [], []
+    state = env.reset()
+    policy.bet_placed = False
+    done = False
+    while not done:
+        action = policy.sample_action(state)
+        next_state, reward, done = env.step(action)
+        states.append(state)
+        actions.append(action)
+        rewards.append(reward)
+        next_states.append(next_state)
+        dones.append(float(done))
+        state = next_state
+    return (np.stack(states), np.array(actions, dtype=np.int64), np.array(rewards, dtype=np.float32),
+            np.stack(next_states), np.array(dones, dtype=np.float32))
+
+
+def actor(rank, episodes, replay, weights, version, stop, epsilon, refresh_every):
+    torch.set_num_threads(1)
+    random.seed(rank)
+    np.random.seed(rank)
+    policy = KalshiPolicy(STATE_DIM, ACTION_DIM, epsilon=epsilon)
+    seen = -1
+    n = 0
+    while not stop.is_set():
+        if n % refresh_every == 0 and version.value != seen:
+            # the learner writes weights under the same lock, so the copy
+            # never mixes two versions
+            with version.get_lock():
+                seen = version.value
+                snapshot = weights.clone()
+            vector_to_parameters(snapshot, policy.q_network.parameters())
+        env = EpisodeEnv(random.choice(episodes))
+        # epsilon stays at this actor's rate, as in Ape-X
+        replay.add_batch(*rollout(env, policy), stop=stop)
+        n += 1
+
+
+def train_single(episodes, n_episodes, policy=None):
+    # Today's behaviour: act and learn in one thread, one transition at a time
+    policy = policy or KalshiPolicy(STATE_DIM, ACTION_DIM)
+    transitions = 0
+    start = time.time()
+    for _ in range(n_episodes):
+        env = EpisodeEnv(random.choice(episodes))
+        state = env.reset()
+        done = False
+        while not done:
+            action = policy.sample_action(state)
+            next_state, reward, done = env.step(action)
+            policy(state, action, reward, next_state, done)
+            state = next_state
+            transitions += 1
+    return policy, transitions / (time.time() - start)
+
+
+def check_actors(procs):
+    # An actor that died can hold back every block reserved after its own
+    for rank, p in enumerate(procs):
+        if p.exitcode is not None:
+            raise RuntimeError(f"actor {rank} exited with code {p.exitcode}")
+
+
+def train_distributed(episodes, n_updates, workers, policy=None, capacity=100000,
+                      sync_every=50, refresh_every=5, join_timeout=10.0):
+    # Actor/learner mode. Returns the policy and actor throughput in
+    # transitions/sec measured over the learner's run.
+    policy = policy or KalshiPolicy(STATE_DIM, ACTION_DIM)
+    # every actor can hold one episode in flight; sample needs the rest
+    in_flight = workers * max(len(e['states']) for e in episodes)
+    if capacity <= in_flight + policy.batch_size:
+        raise ValueError(f"capacity {capacity} leaves no room to sample past "
+                         f"{in_flight} transitions in flight")
+    ctx = mp.get_context("spawn")
+    replay = SharedReplay(capacity, STATE_DIM, ctx)
+    weights = parameters_to_vector(policy.q_network.parameters()).detach().clone().share_memory_()
+    version = ctx.Value('q', 0)
+    stop = ctx.Event()
+
+    # Spread exploration rates across actors (Ape-X style)
+    procs = []
+    for rank in range(workers):
+        eps = 0.4 ** (1 + 7 * rank / max(workers - 1, 1))
+        p = ctx.Process(target=actor, args=(rank, episodes, replay, weights, version, stop, eps, refresh_every))
+        p.start()
+        procs.append(p)
+
+    try:
+        while len(replay) < policy.batch_size:
+            check_actors(procs)
+            time.sleep(0.01)
+        start_count, start = replay.count.value, time.time()
+        for step in range(1, n_updates + 1):
+            policy.update(*replay.sample(policy.batch_size))
+            if step % sync_every == 0:
+                check_actors(procs)
+                with version.get_lock():
+                    weights.copy_(parameters_to_vector(policy.q_network.parameters()).detach())
+                    version.value += 1
+        throughput = (replay.count.value - start_count) / (time.time() - start)
+    finally:
+        stop.set()
+        for p in procs:
+            p.join(timeout=join_timeout)
+            if p.is_alive():
+                p.terminate()
+                p.join()
+    return policy, throughput
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train KalshiPolicy on recorded episodes")
+    parser.add_argument("--data", default="may.json")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Actor processes; 0 runs the single-process loop")
+    parser.add_argument("--episodes", type=int, default=500,
+                        help="Episodes to play in single-process mode")
+    parser.add_argument("--updates", type=int, default=5000,
+                        help="Learner updates in actor/learner mode")
+    args = parser.parse_args()
+
+    episodes = load_episodes(args.data)
+    if args.workers > 0:
+        policy, tps = train_distributed(episodes, args.updates, args.workers)
+    else:
+        policy, tps = train_single(episodes, args.episodes)
+    print(f"transitions/sec: {tps:.0f}")
+    torch.save(policy.q_network.state_dict(), "kalshi_policy.pth")
@@ -1,59 +1,142 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
+
+
+def lttb(x, y, n_out):
+    # Largest-Triangle-Three-Buckets: keeps the visual shape of a series while
+    # reducing it to n_out points. Returns the indices of the kept points.
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+
+    idx = np.empty(n_out, dtype=np.int64)
+    idx[0] = 0
+    idx[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point) is the third vertex
+        nlo, nhi = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        cx = x[nlo:nhi].mean()
+        cy = y[nlo:nhi].mean()
+        area = np.abs(
+            (x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        idx[i + 1] = a
+    return idx
+
+
+def minmax(x, y, n_out):
+    # Keep the min and max of each of n_out // 2 buckets, in time order.
+    # Cheaper than LTTB and never hides a spike.
+    n = len(x)
+    n_buckets = n_out // 2
+    if n_buckets < 1 or n_out >= n:
+        return np.arange(n)
+
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(0, n, n_buckets + 1).astype(np.int64)
+    starts = edges[:-1]
+    bucket = np.repeat(np.arange(n_buckets), np.diff(edges))
+
+    # argmin/argmax per bucket via a lexsort on (bucket, value)
+    order = np.lexsort((y, bucket))
+    counts = np.diff(edges)
+    first = np.cumsum(counts) - counts
+    lo = order[first]
+    hi = order[first + counts - 1]
+    idx = np.unique(np.concatenate([lo, hi, starts[:1], [n - 1]]))
+    return idx
+
+
+DOWNSAMPLERS = {"lttb": lttb, "minmax": minmax}
+
+
+def to_arrays(df, time_col="created_time", price_col="yes_price"):
+    # Typed, sorted, NaN-free arrays for the plotting path. The input frame is
+    # never modified; only the two needed columns are read.
+    t = df[time_col]
+    if not np.issubdtype(t.dtype, np.datetime64):
+        t = pd.to_datetime(t, errors="coerce")
+    t = t.to_numpy(dtype="datetime64[ns]")
+    p = df[price_col].to_numpy(dtype=np.float64)
+
+    valid = ~(np.isnat(t) | np.isnan(p))
+    t, p = t[valid], p[valid]
+    order = np.argsort(t, kind="stable")
+    return t[order], p[order]
+
+
+def _render_one(job):
+    # Worker entry point for render_markets; runs with the Agg backend
+    import matplotlib
+
+    matplotlib.use("Agg")
+    kind, times, prices, title, path, max_points, method = job
+    vis = Visualizer(max_points=max_points, method=method, headless=True)
+    if kind == "percentages":
+        vis.plot_market_percentages(times=times, prices=prices, title=title, path=path)
+    else:
+        vis.plot_yes_price(times=times, prices=prices, title=title, path=path)
+    return path
+
+
 class Visualizer:
-    def __init__(self):
-        pass
+    def __init__(self, max_points=None, method="lttb", headless=False):
+        # max_points=None draws every trade, as before
+        self.max_points = max_points
+        self.method = method
+        self.headless = headless
 
-    def plot_yes_price(self, df, title="Yes Price Over Time"):
-        df["created_time"] = pd.to_datetime(df["created_time"], errors='coerce')
-        df = df.sort_values("created_time")
-        
-        # Filter out any missing or invalid entries
-        df = df[df["yes_price"].notnull() & df["created_time"].notnull()]
+    def _series(self, df, times, prices):
+        if times is None or prices is None:
+            times, prices = to_arrays(df)
+        if self.max_points is not None and len(times) > self.max_points:
+            idx = DOWNSAMPLERS[self.method](
+                times.astype(np.int64), prices, self.max_points
+            )
+            times, prices = times[idx], prices[idx]
+        return times, prices
 
-        # Plot
-        plt.figure(figsize=(10, 5))
-        plt.plot(df["created_time"], df["yes_price"], marker='o', linestyle='-', alpha=0.7)
-        plt.title(title)
-        plt.xlabel("Time")
-        plt.ylabel("Yes Price")
-        plt.grid(True)
-        plt.tight_layout()
-        plt.show()
+    def _finish(self, fig, path):
+        if path is not None:
+            fig.savefig(path)
+        if not self.headless:
+            plt.show()
+        plt.close(fig)
 
-    def plot_yes_price(self, df, title="Yes Price Over Time"):
-        df["created_time"] = pd.to_datetime(df["created_time"], errors='coerce')
-        df = df.sort_values("created_time")
-        
-        # Filter out any missing or invalid entries
-        df = df[df["yes_price"].notnull() & df["created_time"].notnull()]
+    def plot_yes_price(self, df=None, title="Yes Price Over Time", times=None, prices=None, path=None):
+        times, prices = self._series(df, times, prices)
 
         # Plot
-        plt.figure(figsize=(10, 5))
-        plt.plot(df["created_time"], df["yes_price"], marker='o', linestyle='-', alpha=0.7)
+        fig = plt.figure(figsize=(10, 5))
+        marker = 'o' if self.max_points is None else None
+        plt.plot(times, prices, marker=marker, linestyle='-', alpha=0.7)
         plt.title(title)
         plt.xlabel("Time")
         plt.ylabel("Yes Price")
         plt.grid(True)
         plt.tight_layout()
-        plt.show()
-    
-    import pandas as pd
-
-    def plot_market_percentages(self, df, yes_label="YES", no_label="NO", title="Market Probability Over Time"):
-        # Ensure datetime format
-        df["created_time"] = pd.to_datetime(df["created_time"], errors="coerce")
-        df = df.sort_values("created_time")
+        self._finish(fig, path)
 
-        # Convert price to percentage
-        df["yes_pct"] = df["yes_price"]
-        df["no_pct"] = 100 - df["yes_pct"]
+    def plot_market_percentages(self, df=None, yes_label="YES", no_label="NO", title="Market Probability Over Time",
+                                times=None, prices=None, path=None):
+        times, yes_pct = self._series(df, times, prices)
+        no_pct = 100 - yes_pct
 
         # Plot
-        plt.figure(figsize=(10, 5))
-        plt.plot(df["created_time"], df["yes_pct"], label=yes_label, color="blue", linewidth=2)
-        plt.plot(df["created_time"], df["no_pct"], label=no_label, color="gray", linewidth=2, linestyle="--")
+        fig = plt.figure(figsize=(10, 5))
+        plt.plot(times, yes_pct, label=yes_label, color="blue", linewidth=2)
+        plt.plot(times, no_pct, label=no_label, color="gray", linewidth=2, linestyle="--")
 
         # Optional: horizontal reference lines
         for level in [30, 50, 70]:
@@ -65,4 +148,24 @@ class Visualizer:
         plt.legend()
         plt.grid(True)
         plt.tight_layout()
-        plt.show()
+        self._finish(fig, path)
+
+    def render_markets(self, markets, out_dir, kind="yes_price", processes=None):
+        # Write one chart per market to out_dir in parallel, without a display.
+        # markets maps ticker -> DataFrame or (times, prices) arrays.
+        os.makedirs(out_dir, exist_ok=True)
+        max_points = self.max_points if self.max_points is not None else 2000
+
+        jobs = []
+        for ticker, data in markets.items():
+            if isinstance(data, pd.DataFrame):
+                times, prices = to_arrays(data)
+            else:
+                times, prices = data
+            # Downsample before pickling so workers receive small arrays
+            idx = DOWNSAMPLERS[self.method](times.astype(np.int64), prices, max_points)
+            path = os.path.join(out_dir, f"{ticker}.png")
+            jobs.append((kind, times[idx], prices[idx], ticker, path, max_points, self.method))
+
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            return list(pool.map(_render_one, jobs, chunksize=max(1, len(jobs) // 64)))